@@ -0,0 +1,384 @@
+"""
+Load-test the backend against local stand-ins for mstarpy, Gemini and Firestore.
+
+Starts uvicorn in a subprocess with the fakes from benchmark_fakes installed,
+then drives each scenario at each concurrency level for a fixed duration and
+reports requests/second, error count, p50/p95/p99 latency and server memory.
+Results can be saved as a JSON baseline and later runs compared against it.
+
+Usage:
+    cd backend
+    python benchmark.py                                   # all scenarios at 1, 8, 32
+    python benchmark.py --scenarios fund,save --concurrency 16 --duration 5
+    python benchmark.py --gemini-ms 500 --failure-rate 0.05
+    python benchmark.py --output benchmark_baseline.json  # save a baseline
+    python benchmark.py --compare benchmark_baseline.json # exit 1 on regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Callable, Tuple
+
+BACKEND_DIR = Path(__file__).parent
+
+TICKERS = ["VOO", "VTI", "QQQ", "SPY", "BND", "VXUS", "SCHD", "VIG", "AGG", "IWM"]
+CODES = ["LHCS", "LHCU", "LLCS", "SHXU", "SLXS", "LHXU", "SHCS", "LLXU"]
+
+
+# === Request generators ===
+# Each returns (method, path, JSON body or None) for one request.
+
+def _scores(rng: random.Random) -> Dict[str, float]:
+    return {
+        "shortTermVsLongTerm": rng.randint(-15, 15),
+        "highRiskVsLowRisk": rng.randint(-15, 15),
+        "clarityVsComplexity": rng.randint(-15, 15),
+        "consistentVsLumpSum": rng.randint(-15, 15),
+    }
+
+
+def _personality(rng: random.Random) -> Dict[str, str]:
+    code = rng.choice(CODES)
+    return {"code": code, "name": f"Investor {code}", "description": "Benchmark investor"}
+
+
+def _fund(rng: random.Random) -> Tuple[str, str, Optional[dict]]:
+    return "GET", f"/api/fund/{rng.choice(TICKERS)}", None
+
+
+def _nav(rng: random.Random) -> Tuple[str, str, Optional[dict]]:
+    return "GET", f"/api/fund/{rng.choice(TICKERS)}/nav", None
+
+
+def _holdings(rng: random.Random) -> Tuple[str, str, Optional[dict]]:
+    return "GET", f"/api/fund/{rng.choice(TICKERS)}/holdings", None
+
+
+def _report(rng: random.Random) -> Tuple[str, str, Optional[dict]]:
+    body = {"personality": _personality(rng), "scores": _scores(rng), "role": rng.choice(["investor", "advisor"])}
+    return "POST", "/generate_investor_report", body
+
+
+def _save(rng: random.Random) -> Tuple[str, str, Optional[dict]]:
+    role = rng.choice(["investor", "advisor"])
+    body = {
+        "userId": f"bench-user-{rng.randrange(10000)}",
+        "role": role,
+        "quizAnswers": [
+            {"questionIndex": i, "value": rng.randint(1, 7)} for i in range(20 if role == "investor" else 8)
+        ],
+        "personalityScores": _scores(rng),
+        "personalityType": _personality(rng),
+    }
+    return "POST", "/save_quiz_result", body
+
+
+SCENARIOS: Dict[str, Callable[[random.Random], Tuple[str, str, Optional[dict]]]] = {
+    "fund": _fund,
+    "nav": _nav,
+    "holdings": _holdings,
+    "report": _report,
+    "save": _save,
+}
+
+
+# === HTTP client ===
+# A minimal keep-alive HTTP/1.1 client, so the benchmark needs nothing beyond
+# the backend's own requirements.
+
+class _Connection:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: Optional[dict]) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(payload)}\r\n"
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode() + b"\r\n" + payload)
+        try:
+            return await self._read_response()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            raise
+
+    async def _read_response(self) -> int:
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection") == "close":
+            self.close()
+        return status
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(port: int, scenario: str, concurrency: int, duration: float, warmup: float, seed: int) -> Dict[str, Any]:
+    """
+    Keep `concurrency` requests in flight for `duration` seconds after a warmup
+    """
+    make_request = SCENARIOS[scenario]
+    latencies: List[float] = []
+    errors = 0
+    statuses: Dict[str, int] = {}
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def worker(index: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed * 1000 + index)
+        connection = _Connection("127.0.0.1", port)
+        while time.perf_counter() < stop_at:
+            method, path, body = make_request(rng)
+            request_started = time.perf_counter()
+            try:
+                status = await connection.request(method, path, body)
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                status = 0
+            if request_started < measure_from:
+                continue
+            latencies.append(time.perf_counter() - request_started)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if not 200 <= status < 400:
+                errors += 1
+        connection.close()
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50Ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p95Ms": round(_percentile(latencies, 0.95) * 1000, 2),
+        "p99Ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "meanMs": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+# === Server process ===
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_mb(pid: int) -> Dict[str, Optional[float]]:
+    """
+    Current (VmRSS) and peak (VmHWM) resident memory of `pid`; None off Linux
+    """
+    result: Dict[str, Optional[float]] = {"rssMb": None, "peakRssMb": None}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    result["rssMb"] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith("VmHWM:"):
+                    result["peakRssMb"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return result
+
+
+def start_server(args: argparse.Namespace) -> Tuple[subprocess.Popen, int]:
+    port = _free_port()
+    env = dict(os.environ)
+    # No on-disk caches, so every run starts cold and runs don't share state
+    env.update({"REPORT_CACHE_DB_PATH": "", "NAV_STORE_DB_PATH": ":memory:", "LOG_LEVEL": "WARNING"})
+    # Every simulated user comes from one address, so per-client limits would throttle the run
+    env["RATE_LIMIT_ENABLED"] = "false"
+    env.pop("FUND_CACHE_DB_PATH", None)
+    server = subprocess.Popen(
+        [
+            sys.executable, __file__, "--serve", "--port", str(port),
+            "--mstarpy-ms", str(args.mstarpy_ms), "--gemini-ms", str(args.gemini_ms),
+            "--firestore-ms", str(args.firestore_ms), "--failure-rate", str(args.failure_rate),
+            "--seed", str(args.seed),
+        ],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Benchmark server exited:\n" + server.stderr.read().decode())
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return server, port
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("Benchmark server did not start")
+
+
+def serve(args: argparse.Namespace) -> None:
+    """
+    Run the app with the fakes installed (the --serve subprocess)
+    """
+    from benchmark_fakes import UpstreamProfile, install
+
+    install(
+        mstarpy=UpstreamProfile(args.mstarpy_ms, failure_rate=args.failure_rate),
+        gemini=UpstreamProfile(args.gemini_ms, failure_rate=args.failure_rate),
+        firestore=UpstreamProfile(args.firestore_ms, failure_rate=args.failure_rate),
+        seed=args.seed,
+    )
+    import uvicorn
+    from main import app
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+# === Baselines ===
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Describe every scenario/concurrency pair that is `threshold` worse than the baseline
+    """
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        label = f"{result['scenario']} @ {result['concurrency']}"
+        if before["rps"] and result["rps"] < before["rps"] * (1 - threshold):
+            regressions.append(f"{label}: {result['rps']} rps < {before['rps']} rps")
+        for key in ("p95Ms", "p99Ms"):
+            if before[key] and result[key] > before[key] * (1 + threshold):
+                regressions.append(f"{label}: {key} {result[key]} > {before[key]}")
+        if result["errors"] > before["errors"] and result["errors"] > result["requests"] * 0.01:
+            regressions.append(f"{label}: {result['errors']} errors (was {before['errors']})")
+    return regressions
+
+
+def _print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'scenario':<10}{'conc':>6}{'reqs':>8}{'errs':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rss MB':>9}")
+    for r in results:
+        print(
+            f"{r['scenario']:<10}{r['concurrency']:>6}{r['requests']:>8}{r['errors']:>6}{r['rps']:>10}"
+            f"{r['p50Ms']:>10}{r['p95Ms']:>10}{r['p99Ms']:>10}{r['memory']['rssMb'] or '-':>9}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated in-flight request counts")
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per scenario and concurrency")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds before each run")
+    parser.add_argument("--mstarpy-ms", type=float, default=150, help="fake mstarpy latency per call")
+    parser.add_argument("--gemini-ms", type=float, default=2000, help="fake Gemini latency per report")
+    parser.add_argument("--firestore-ms", type=float, default=40, help="fake Firestore latency per call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of fake upstream calls that raise")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results to this JSON file (e.g. a baseline)")
+    parser.add_argument("--compare", help="baseline JSON to compare against; exits non-zero on regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed fractional slowdown before --compare fails")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    results = []
+    for scenario in scenarios:
+        # A fresh server per scenario, so caches and memory don't carry over
+        server, port = start_server(args)
+        try:
+            for concurrency in levels:
+                result = asyncio.run(run_scenario(port, scenario, concurrency, args.duration, args.warmup, args.seed))
+                result["memory"] = memory_mb(server.pid)
+                results.append(result)
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report = {
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "mstarpyMs": args.mstarpy_ms,
+            "geminiMs": args.gemini_ms,
+            "firestoreMs": args.firestore_ms,
+            "failureRate": args.failure_rate,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    _print_table(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if baseline.get("config") != report["config"]:
+            print("Warning: baseline was recorded with different settings", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            raise SystemExit("Regressions against baseline:\n  " + "\n  ".join(regressions))
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
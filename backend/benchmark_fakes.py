@@ -0,0 +1,276 @@
+"""
+Local stand-ins for mstarpy, Gemini and Firestore, for benchmarks.
+
+Each fake sleeps for a configurable latency (with jitter) and fails at a
+configurable rate, so the backend can be load-tested without network access
+or API keys. install() swaps them in through the LazySubsystem hooks.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional, Dict, List, Any, Iterator
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import types
+
+
+@dataclass
+class UpstreamProfile:
+    """Latency (milliseconds, +/- jitter fraction) and failure rate for one fake upstream"""
+    latency_ms: float = 0.0
+    jitter: float = 0.2
+    failure_rate: float = 0.0
+
+    def wait(self) -> None:
+        if random.random() < self.failure_rate:
+            time.sleep(self.latency_ms / 1000)
+            raise ConnectionError("injected upstream failure")
+        if self.latency_ms:
+            spread = self.latency_ms * self.jitter
+            time.sleep(max(0.0, random.uniform(self.latency_ms - spread, self.latency_ms + spread)) / 1000)
+
+
+# === mstarpy ===
+
+class FakeFunds:
+    """Stands in for mstarpy.Funds: resolve on construction, then nav()/holdings()"""
+
+    profile = UpstreamProfile(latency_ms=150)
+
+    def __init__(self, term: str, *args: Any, **kwargs: Any):
+        self.profile.wait()
+        self.ticker = term.upper()
+        self._seed = sum(ord(c) for c in self.ticker)
+
+    def nav(self, start_date: date, end_date: date, frequency: str = "daily") -> List[Dict[str, Any]]:
+        self.profile.wait()
+        points = []
+        day = start_date
+        while day <= end_date:
+            if day.weekday() < 5:
+                t = day.toordinal()
+                value = 100 * 1.0002 ** (t - 730000) * (1 + 0.03 * math.sin(t / (5 + self._seed % 11)))
+                points.append({"nav": round(value, 4), "totalReturn": round(value * 1.05, 4), "date": day.isoformat()})
+            day += timedelta(days=1)
+        return points
+
+    def holdings(self, holdingType: str = "all") -> List[Dict[str, Any]]:
+        self.profile.wait()
+        return [
+            {"ticker": f"{self.ticker}{i}", "securityName": f"Holding {i}", "weighting": round(10 / (i + 1), 3), "marketValue": 1e6 / (i + 1)}
+            for i in range(25)
+        ]
+
+
+fake_mstarpy = types.SimpleNamespace(Funds=FakeFunds)
+
+
+# === Gemini ===
+
+_REPORT = {
+    "strengths": ["Patient", "Disciplined"],
+    "weaknesses": ["May miss short-term opportunities"],
+    "strategies": ["Dollar-cost average into broad index funds"],
+    "behaviors": ["Reviews the portfolio quarterly"],
+    "advisorTips": ["Lead with long-term projections"],
+    "dimensions": {
+        axis: {
+            "dominantLabel": label,
+            "description": "Benchmark stand-in text. " * 4,
+            "strengths": ["One", "Two"],
+            "weaknesses": ["One", "Two"],
+            "blindSpots": ["One"],
+        }
+        for axis, label in (
+            ("timeHorizon", "Long-Term"),
+            ("riskTolerance", "Low Risk"),
+            ("complexity", "Simple"),
+            ("consistency", "Consistent"),
+        )
+    },
+}
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Stands in for genai.GenerativeModel; streams the report in small chunks"""
+
+    profile = UpstreamProfile(latency_ms=2000)
+    chunk_chars = 64
+
+    def __init__(self, model_name: str, *args: Any, **kwargs: Any):
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        text = json.dumps(_REPORT, indent=2)
+        if not stream:
+            self.profile.wait()
+            return _Response(text)
+        return self._stream(text)
+
+    def _stream(self, text: str) -> Iterator[_Response]:
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+        per_chunk = UpstreamProfile(self.profile.latency_ms / len(chunks), self.profile.jitter, 0.0)
+        if random.random() < self.profile.failure_rate:
+            raise ConnectionError("injected upstream failure")
+        for chunk in chunks:
+            per_chunk.wait()
+            yield _Response(chunk)
+
+
+fake_genai = types.SimpleNamespace(GenerativeModel=FakeGenerativeModel)
+
+
+# === Firestore ===
+
+class _FakeSnapshot:
+    def __init__(self, doc_id: str, data: Optional[Dict[str, Any]]):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._data or {})
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+class _FakeDocument:
+    _ids = itertools.count()
+
+    def __init__(self, client: "FakeFirestoreClient", doc_id: Optional[str] = None):
+        self._client = client
+        self.id = doc_id or f"bench{next(self._ids):012d}"
+
+    def get(self) -> _FakeSnapshot:
+        self._client.profile.wait()
+        return _FakeSnapshot(self.id, self._client.docs.get(self.id))
+
+
+_COMPARE = {
+    "==": lambda a, b: a == b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+}
+
+
+class _FakeQuery:
+    def __init__(self, client: "FakeFirestoreClient", filters=(), order=None, after=None, limit=None):
+        self._client = client
+        self._filters = filters
+        self._order = order
+        self._after = after
+        self._limit = limit
+
+    def _with(self, **changes: Any) -> "_FakeQuery":
+        fields = {"filters": self._filters, "order": self._order, "after": self._after, "limit": self._limit}
+        fields.update(changes)
+        return _FakeQuery(self._client, **fields)
+
+    def where(self, field: str, op: str, value: Any) -> "_FakeQuery":
+        # "__name__" filters compare document IDs (the value is a document reference)
+        return self._with(filters=self._filters + ((field, op, getattr(value, "id", value)),))
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "_FakeQuery":
+        return self._with(order=(field, direction))
+
+    def start_after(self, snapshot: _FakeSnapshot) -> "_FakeQuery":
+        return self._with(after=snapshot.id)
+
+    def limit(self, count: int) -> "_FakeQuery":
+        return self._with(limit=count)
+
+    def select(self, fields: List[str]) -> "_FakeQuery":
+        return self
+
+    def stream(self) -> Iterator[_FakeSnapshot]:
+        self._client.profile.wait()
+        with self._client.lock:
+            rows = [
+                (k, v) for k, v in self._client.docs.items()
+                if all(_COMPARE[op](k if f == "__name__" else v.get(f), x) for f, op, x in self._filters)
+            ]
+        if self._order:
+            field, direction = self._order
+            sort_key = (lambda kv: kv[0]) if field == "__name__" else (lambda kv: kv[1].get(field) or 0)
+            rows.sort(key=sort_key, reverse=direction == "DESCENDING")
+        if self._after:
+            ids = [k for k, _ in rows]
+            rows = rows[ids.index(self._after) + 1:] if self._after in ids else []
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return iter([_FakeSnapshot(k, v) for k, v in rows])
+
+
+class _FakeCollection(_FakeQuery):
+    def document(self, doc_id: Optional[str] = None) -> _FakeDocument:
+        return _FakeDocument(self._client, doc_id)
+
+
+class _FakeBatch:
+    def __init__(self, client: "FakeFirestoreClient"):
+        self._client = client
+        self._writes: List[Any] = []
+
+    def set(self, doc: _FakeDocument, data: Dict[str, Any]) -> None:
+        self._writes.append((doc.id, data))
+
+    def commit(self) -> None:
+        self._client.profile.wait()
+        now = time.time()
+        with self._client.lock:
+            for doc_id, data in self._writes:
+                # SERVER_TIMESTAMP sentinels become the commit time
+                self._client.docs[doc_id] = {k: (now if k in ("createdAt", "updatedAt") else v) for k, v in data.items()}
+
+
+class FakeFirestoreClient:
+    """In-memory Firestore client covering the calls firebase_service makes"""
+
+    def __init__(self, profile: Optional[UpstreamProfile] = None):
+        self.profile = profile or UpstreamProfile(latency_ms=40)
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def collection(self, name: str) -> _FakeCollection:
+        return _FakeCollection(self)
+
+    def batch(self) -> _FakeBatch:
+        return _FakeBatch(self)
+
+
+def install(
+    mstarpy: UpstreamProfile,
+    gemini: UpstreamProfile,
+    firestore: UpstreamProfile,
+    seed: int = 0,
+) -> FakeFirestoreClient:
+    """
+    Point fund_service, report_service and firebase_service at the fakes
+    """
+    import os
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+    import firebase_config
+    import fund_service
+    import report_service
+
+    random.seed(seed)
+    FakeFunds.profile = mstarpy
+    FakeGenerativeModel.profile = gemini
+    client = FakeFirestoreClient(firestore)
+
+    fund_service.mstarpy_lib.override(fake_mstarpy)
+    report_service.gemini_lib.override(fake_genai)
+    firebase_config.firebase.override(client)
+    return client
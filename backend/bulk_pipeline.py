@@ -0,0 +1,612 @@
+"""
+Bulk export and import of quiz results and fund data, for analytics and backfills
+
+Usage:
+    cd backend
+    python bulk_pipeline.py export quiz-results --out exports/quiz --format parquet --partitions 8
+    python bulk_pipeline.py export funds --out exports/funds --tickers VOO,QQQ --days 3650
+    python bulk_pipeline.py import quiz-results --in exports/quiz
+    python bulk_pipeline.py import quiz-results --in exports/quiz --rescore
+    python bulk_pipeline.py import funds --in exports/funds
+
+Exports read the whole collection with keyset-paginated queries, split into
+document ID ranges that are read in parallel, and write gzip NDJSON or
+zstd Parquet part files of at most --part-rows rows each. Imports stream
+the part files back in Firestore-sized batches. Memory stays flat however
+large the collection is. Progress is checkpointed in the directory after
+each part file (export) or batch (import), so re-running the same
+command after an interruption picks up where it stopped; --restart
+starts over. --rescore re-scores quiz results from their stored answers
+with the current question table as they are imported.
+
+Fund imports load NAV history into NAV_STORE_DB_PATH and holdings into
+FUND_CACHE_DB_PATH (as already-expired entries, served while refreshed).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Optional, Dict, List, Any, Callable, Iterator, Tuple
+import argparse
+import glob
+import gzip
+import itertools
+import json
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+try:
+    # Optional: only needed for --format parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+FORMATS = ("ndjson", "parquet")
+EXTENSIONS = {"ndjson": ".ndjson.gz", "parquet": ".parquet"}
+QUIZ_COLLECTION = "quizResults"
+# Firestore timestamps (ISO strings in NDJSON) are turned back into datetimes on import
+TIMESTAMP_FIELDS = ("createdAt", "updatedAt")
+# Firestore auto-IDs are 20 characters from this alphabet (in sort order),
+# so splitting it evenly gives partitions of about equal size
+AUTO_ID_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+PARQUET_ROW_GROUP_ROWS = 10000
+# Parquet columns for fields the first row group didn't have
+EXTRA_COLUMN = "_extra"
+JSON_COLUMNS_KEY = b"bulk_pipeline.json_columns"
+NAV_IMPORT_BATCH = 5000
+CHECKPOINT_SAVE_SECONDS = 2.0
+
+
+class Interrupted(Exception):
+    """Raised in workers once Ctrl-C has been pressed"""
+
+
+# === Values ===
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    # numpy/pandas scalars from DataFrame.to_dict()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=_json_value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _restore_timestamps(data: Dict[str, Any]) -> Dict[str, Any]:
+    for field in TIMESTAMP_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str):
+            try:
+                data[field] = datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    return data
+
+
+# === Part files ===
+# Written to <name>.tmp and renamed when closed, so a part file on disk is
+# always complete and an interrupted one is simply written again.
+
+class NdjsonPartWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._file = gzip.open(path + ".tmp", "wt", encoding="utf-8", compresslevel=6)
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._file.write(_dumps(row) + "\n")
+        self.rows += 1
+
+    def close(self) -> None:
+        self._file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+    def abort(self) -> None:
+        self._file.close()
+        os.remove(self.path + ".tmp")
+
+
+class ParquetPartWriter:
+    """
+    Buffers PARQUET_ROW_GROUP_ROWS rows at a time; the schema comes from the
+    first row group. Nested values (maps, lists) are stored as JSON strings,
+    and fields missing from the schema go in a JSON "_extra" column.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._writer = None
+        self._schema = None
+        self._json_columns: List[str] = []
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._buffer.append(row)
+        self.rows += 1
+        if len(self._buffer) >= PARQUET_ROW_GROUP_ROWS:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self.path + ".tmp", self.path)
+
+    def abort(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            os.remove(self.path + ".tmp")
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        if self._schema is None:
+            self._schema, self._json_columns = self._infer_schema(self._buffer)
+            self._writer = pq.ParquetWriter(self.path + ".tmp", self._schema, compression="zstd")
+        columns = set(self._schema.names) - {EXTRA_COLUMN}
+        rows = []
+        for row in self._buffer:
+            out = {name: self._column_value(name, row.get(name)) for name in columns}
+            extra = {k: v for k, v in row.items() if k not in columns}
+            out[EXTRA_COLUMN] = _dumps(extra) if extra else None
+            rows.append(out)
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self._schema))
+        self._buffer = []
+
+    def _column_value(self, name: str, value: Any) -> Any:
+        if value is None:
+            return None
+        if name in self._json_columns:
+            return _dumps(value)
+        if isinstance(value, datetime) and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+    @staticmethod
+    def _infer_schema(rows: List[Dict[str, Any]]) -> Tuple[Any, List[str]]:
+        names = list(dict.fromkeys(k for row in rows for k in row))
+        fields, json_columns = [], []
+        for name in names:
+            values = [row.get(name) for row in rows if row.get(name) is not None]
+            if not values or any(isinstance(v, (dict, list, tuple)) for v in values):
+                json_columns.append(name)
+                fields.append(pa.field(name, pa.string()))
+            elif all(isinstance(v, datetime) for v in values):
+                fields.append(pa.field(name, pa.timestamp("us", tz="UTC")))
+            else:
+                try:
+                    fields.append(pa.field(name, pa.array(values).type))
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    # Mixed types: keep them all as JSON
+                    json_columns.append(name)
+                    fields.append(pa.field(name, pa.string()))
+        fields.append(pa.field(EXTRA_COLUMN, pa.string()))
+        metadata = {JSON_COLUMNS_KEY: json.dumps(json_columns).encode("utf-8")}
+        return pa.schema(fields, metadata=metadata), json_columns
+
+
+def open_part(path: str, fmt: str):
+    if fmt == "parquet":
+        return ParquetPartWriter(path)
+    return NdjsonPartWriter(path)
+
+
+def iter_part_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Rows of a part file, read a batch at a time
+    """
+    if path.endswith(EXTENSIONS["parquet"]):
+        parquet = pq.ParquetFile(path)
+        metadata = parquet.schema_arrow.metadata or {}
+        json_columns = set(json.loads(metadata.get(JSON_COLUMNS_KEY, b"[]")))
+        for batch in parquet.iter_batches(batch_size=PARQUET_ROW_GROUP_ROWS):
+            for row in batch.to_pylist():
+                extra = row.pop(EXTRA_COLUMN, None)
+                for name in json_columns:
+                    if row.get(name) is not None:
+                        row[name] = json.loads(row[name])
+                row = {k: v for k, v in row.items() if v is not None}
+                if extra:
+                    row.update(json.loads(extra))
+                yield row
+    else:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def part_files(directory: str) -> List[str]:
+    return sorted(
+        path for ext in EXTENSIONS.values() for path in glob.glob(os.path.join(directory, "**", "*" + ext), recursive=True)
+    )
+
+
+# === Checkpoints ===
+
+class Checkpoint:
+    """
+    Per-partition progress in a JSON file in the export directory, saved atomically
+
+    `settings` must match the run that wrote the checkpoint, so resuming
+    with different partitions or formats fails instead of mixing outputs.
+    """
+
+    def __init__(self, directory: str, settings: Dict[str, Any], restart: bool = False, filename: str = "checkpoint.json"):
+        self.path = os.path.join(directory, filename)
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self.state: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.path) and not restart:
+            with open(self.path) as f:
+                saved = json.load(f)
+            if saved.get("settings") != settings:
+                raise SystemExit(
+                    f"{self.path} is from a run with different settings {saved.get('settings')}; "
+                    "use the same arguments to resume, or --restart"
+                )
+            self.state = saved.get("state", {})
+        self.settings = settings
+
+    def get(self, name: str, default: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.state.get(name) or default)
+
+    def update(self, name: str, state: Dict[str, Any], force: bool = True) -> None:
+        """
+        Record a partition's progress; with force=False the file is rewritten
+        at most every CHECKPOINT_SAVE_SECONDS
+        """
+        with self._lock:
+            self.state[name] = dict(state)
+            now = time.monotonic()
+            if not force and now - self._last_save < CHECKPOINT_SAVE_SECONDS:
+                return
+            self._last_save = now
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"settings": self.settings, "state": self.state}, f, indent=1)
+            os.replace(tmp, self.path)
+
+
+class Progress:
+    """Thread-safe row counter that prints a line every few seconds"""
+
+    def __init__(self, label: str, interval: float = 5.0):
+        self.label = label
+        self.interval = interval
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._started = self._last = time.monotonic()
+
+    def add(self, rows: int) -> None:
+        with self._lock:
+            self.rows += rows
+            now = time.monotonic()
+            if now - self._last < self.interval:
+                return
+            self._last = now
+            rate = self.rows / max(now - self._started, 1e-9)
+        print(f"  {self.label}: {self.rows} rows ({rate:.0f}/s)")
+
+    def done(self) -> None:
+        elapsed = time.monotonic() - self._started
+        print(f"{self.label}: {self.rows} rows in {elapsed:.1f}s")
+
+
+def run_partitions(jobs: List[Tuple[str, Callable[[threading.Event], None]]], parallelism: int) -> None:
+    """
+    Run (name, job) pairs on `parallelism` threads; Ctrl-C stops them at the
+    next page or batch, leaving the checkpoint at the last completed step
+    """
+    stop = threading.Event()
+    failures: List[Tuple[str, BaseException]] = []
+
+    def run(name: str, job: Callable[[threading.Event], None]) -> None:
+        if stop.is_set():
+            return
+        try:
+            job(stop)
+        except Interrupted:
+            pass
+        except Exception as e:
+            failures.append((name, e))
+            print(f"  {name} failed: {e}")
+
+    with ThreadPoolExecutor(max_workers=max(1, parallelism), thread_name_prefix="bulk") as pool:
+        futures = [pool.submit(run, name, job) for name, job in jobs]
+        try:
+            for future in futures:
+                while not future.done():
+                    time.sleep(0.2)
+        except KeyboardInterrupt:
+            print("Stopping after the current page; re-run the same command to resume")
+            stop.set()
+            raise SystemExit(130)
+    if failures:
+        raise SystemExit(f"{len(failures)} partition(s) failed; re-run the same command to retry them")
+
+
+def id_ranges(partitions: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Split the document ID space into `partitions` [start, end) ranges; the
+    first and last are open-ended so IDs outside the auto-ID alphabet are kept
+    """
+    partitions = max(1, min(partitions, len(AUTO_ID_ALPHABET)))
+    bounds = [AUTO_ID_ALPHABET[len(AUTO_ID_ALPHABET) * i // partitions] for i in range(1, partitions)]
+    starts = [None] + bounds
+    ends = bounds + [None]
+    return list(zip(starts, ends))
+
+
+def _require_format(fmt: str) -> None:
+    if fmt == "parquet" and pa is None:
+        raise SystemExit("Parquet needs pyarrow: pip install pyarrow (or use --format ndjson)")
+
+
+def _write_manifest(directory: str, manifest: Dict[str, Any]) -> None:
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+
+
+def _read_manifest(directory: str) -> Dict[str, Any]:
+    path = os.path.join(directory, "manifest.json")
+    if not os.path.exists(path):
+        raise SystemExit(f"{path} not found; is {directory} a bulk_pipeline export?")
+    with open(path) as f:
+        return json.load(f)
+
+
+# === Export ===
+
+def export_quiz_results(args: argparse.Namespace) -> None:
+    from firebase_config import get_db
+    from firebase_service import iter_collection_pages
+
+    if get_db() is None:
+        raise SystemExit("Firebase is not configured")
+    os.makedirs(args.out, exist_ok=True)
+    settings = {"dataset": "quiz-results", "format": args.format, "partitions": args.partitions, "partRows": args.part_rows}
+    checkpoint = Checkpoint(args.out, settings, restart=args.restart)
+    _write_manifest(args.out, {**settings, "collection": QUIZ_COLLECTION})
+    progress = Progress(f"export {QUIZ_COLLECTION}")
+
+    def partition(index: int, start: Optional[str], end: Optional[str]) -> Callable[[threading.Event], None]:
+        name = f"p{index:03d}"
+
+        def job(stop: threading.Event) -> None:
+            state = checkpoint.get(name, {"after": None, "part": 0, "rows": 0, "done": False})
+            if state["done"]:
+                return
+            writer = None
+            last_id = None
+            try:
+                for page in iter_collection_pages(QUIZ_COLLECTION, start_id=start, after_id=state["after"], before_id=end, page_size=args.page_size):
+                    if stop.is_set():
+                        raise Interrupted()
+                    for doc_id, data in page:
+                        if writer is None:
+                            writer = open_part(os.path.join(args.out, f"{name}-{state['part']:05d}{EXTENSIONS[args.format]}"), args.format)
+                        writer.write({"id": doc_id, **data})
+                        last_id = doc_id
+                        if writer.rows >= args.part_rows:
+                            writer.close()
+                            state.update(after=last_id, part=state["part"] + 1, rows=state["rows"] + writer.rows)
+                            checkpoint.update(name, state)
+                            writer = None
+                    progress.add(len(page))
+                if writer is not None:
+                    writer.close()
+                    state.update(after=last_id, part=state["part"] + 1, rows=state["rows"] + writer.rows)
+                    writer = None
+            finally:
+                if writer is not None:
+                    writer.abort()
+            state["done"] = True
+            checkpoint.update(name, state)
+
+        return job
+
+    jobs = [(f"p{i:03d}", partition(i, start, end)) for i, (start, end) in enumerate(id_ranges(args.partitions))]
+    run_partitions(jobs, args.partitions)
+    progress.done()
+
+
+def export_funds(args: argparse.Namespace) -> None:
+    from fund_service import fill_fund_nav_history, iter_fund_nav, refresh_fund_holdings, get_fund_holdings, mstarpy_lib
+    from fund_prewarmer import PREWARM_TICKERS
+
+    if mstarpy_lib.get() is None:
+        raise SystemExit("mstarpy is not available")
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()] if args.tickers else PREWARM_TICKERS
+    for dataset in ("fund_nav", "fund_holdings"):
+        os.makedirs(os.path.join(args.out, dataset), exist_ok=True)
+    settings = {"dataset": "funds", "format": args.format, "days": args.days, "holdingsLimit": args.holdings_limit}
+    checkpoint = Checkpoint(args.out, settings, restart=args.restart)
+    _write_manifest(args.out, settings)
+    progress = Progress("export funds")
+
+    def ticker_job(ticker: str) -> Callable[[threading.Event], None]:
+        def job(stop: threading.Event) -> None:
+            state = checkpoint.get(ticker, {"nav": False, "holdings": False})
+            if not state["nav"]:
+                # A failed fill leaves the history short; fail the ticker so a re-run retries it
+                if not fill_fund_nav_history(ticker, args.days):
+                    raise RuntimeError(f"couldn't fetch NAV history for {ticker}")
+                writer = open_part(os.path.join(args.out, "fund_nav", ticker + EXTENSIONS[args.format]), args.format)
+                try:
+                    for point in iter_fund_nav(ticker, args.days):
+                        writer.write({"fund": ticker, **point})
+                except BaseException:
+                    writer.abort()
+                    raise
+                writer.close()
+                progress.add(writer.rows)
+                state["nav"] = True
+                checkpoint.update(ticker, state)
+            if stop.is_set():
+                raise Interrupted()
+            if not state["holdings"]:
+                # Fetched fresh so Morningstar errors propagate instead of exporting a stale fallback
+                refresh_fund_holdings(ticker, args.holdings_limit)
+                holdings = get_fund_holdings(ticker, args.holdings_limit)
+                writer = open_part(os.path.join(args.out, "fund_holdings", ticker + EXTENSIONS[args.format]), args.format)
+                for rank, holding in enumerate(holdings, start=1):
+                    writer.write({"fund": ticker, "rank": rank, **holding})
+                writer.close()
+                progress.add(writer.rows)
+                state["holdings"] = True
+                checkpoint.update(ticker, state)
+        return job
+
+    run_partitions([(ticker, ticker_job(ticker)) for ticker in tickers], args.partitions)
+    progress.done()
+
+
+# === Import ===
+
+def _file_jobs(
+    files: List[str],
+    checkpoint: Checkpoint,
+    directory: str,
+    load_batch: Callable[[List[Dict[str, Any]]], None],
+    batch_size: int,
+    progress: Progress,
+) -> List[Tuple[str, Callable[[threading.Event], None]]]:
+    """
+    One job per part file: stream its rows in batches to load_batch, skipping
+    rows a previous run already loaded
+    """
+    def file_job(path: str) -> Callable[[threading.Event], None]:
+        name = os.path.relpath(path, directory)
+
+        def job(stop: threading.Event) -> None:
+            state = checkpoint.get(name, {"rows": 0, "done": False})
+            if state["done"]:
+                return
+            rows = itertools.islice(iter_part_rows(path), state["rows"], None)
+            while True:
+                if stop.is_set():
+                    checkpoint.update(name, state)
+                    raise Interrupted()
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                load_batch(batch)
+                state["rows"] += len(batch)
+                progress.add(len(batch))
+                checkpoint.update(name, state, force=False)
+            state["done"] = True
+            checkpoint.update(name, state)
+
+        return job
+
+    return [(os.path.relpath(path, directory), file_job(path)) for path in files]
+
+
+def import_quiz_results(args: argparse.Namespace) -> None:
+    from firebase_config import get_db
+    from firebase_service import commit_documents, FIRESTORE_BATCH_SIZE
+    from quiz_scoring import rescore_documents
+
+    if get_db() is None:
+        raise SystemExit("Firebase is not configured")
+    manifest = _read_manifest(args.input)
+    collection = manifest.get("collection", QUIZ_COLLECTION)
+    files = part_files(args.input)
+    if any(path.endswith(EXTENSIONS["parquet"]) for path in files):
+        _require_format("parquet")
+    # Kept apart from the export's checkpoint in the same directory
+    checkpoint = Checkpoint(args.input, {"dataset": "quiz-results", "files": len(files), "rescore": args.rescore}, args.restart, "import-checkpoint.json")
+    progress = Progress(f"import {collection}")
+
+    def load_batch(rows: List[Dict[str, Any]]) -> None:
+        if args.rescore:
+            # One matrix product per batch and role
+            rescore_documents(rows)
+        commit_documents(collection, [(row.pop("id"), _restore_timestamps(row)) for row in rows])
+
+    run_partitions(_file_jobs(files, checkpoint, args.input, load_batch, FIRESTORE_BATCH_SIZE, progress), args.partitions)
+    progress.done()
+
+
+def import_funds(args: argparse.Namespace) -> None:
+    from fund_service import nav_store, fund_cache
+
+    manifest = _read_manifest(args.input)
+    if nav_store.db_path == ":memory:" or not fund_cache.db_path:
+        raise SystemExit("Set NAV_STORE_DB_PATH and FUND_CACHE_DB_PATH to the files the server uses")
+    files = part_files(args.input)
+    if any(path.endswith(EXTENSIONS["parquet"]) for path in files):
+        _require_format("parquet")
+    checkpoint = Checkpoint(args.input, {"dataset": "funds", "files": len(files)}, args.restart, "import-checkpoint.json")
+    progress = Progress("import funds")
+    holdings_limit = manifest.get("holdingsLimit", 10)
+
+    def load_nav(rows: List[Dict[str, Any]]) -> None:
+        for ticker, points in itertools.groupby(rows, key=lambda row: row["fund"]):
+            points = list(points)
+            start = date.fromisoformat(str(points[0]["date"])[:10])
+            end = date.fromisoformat(str(points[-1]["date"])[:10])
+            nav_store.import_points(ticker, start, end, points)
+
+    def load_holdings(rows: List[Dict[str, Any]]) -> None:
+        for ticker, holdings in itertools.groupby(rows, key=lambda row: row["fund"]):
+            holdings = [{k: v for k, v in h.items() if k not in ("fund", "rank")} for h in holdings]
+            # Already expired: served (and refreshed) like any stale entry, and
+            # kept as the last-known-good fallback
+            fund_cache.set((ticker, "holdings", holdings_limit), holdings, 0)
+
+    nav_files = [path for path in files if os.sep + "fund_nav" + os.sep in path]
+    holdings_files = [path for path in files if os.sep + "fund_holdings" + os.sep in path]
+    jobs = _file_jobs(nav_files, checkpoint, args.input, load_nav, NAV_IMPORT_BATCH, progress)
+    # A fund's holdings are one small file, loaded in a single batch
+    jobs += _file_jobs(holdings_files, checkpoint, args.input, load_holdings, 1_000_000, progress)
+    run_partitions(jobs, args.partitions)
+    progress.done()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("dataset", choices=("quiz-results", "funds"))
+    parser.add_argument("--out", help="directory to export into")
+    parser.add_argument("--in", dest="input", help="directory to import from (an export's --out)")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--partitions", type=int, default=4, help="partitions (or files) processed in parallel")
+    parser.add_argument("--page-size", type=int, default=500, help="documents per Firestore query")
+    parser.add_argument("--part-rows", type=int, default=250000, help="rows per output file")
+    parser.add_argument("--tickers", help="comma-separated tickers for funds (default: PREWARM_TICKERS)")
+    parser.add_argument("--days", type=int, default=3650, help="days of NAV history for funds")
+    parser.add_argument("--holdings-limit", type=int, default=10, help="top holdings per fund")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and start over")
+    parser.add_argument("--rescore", action="store_true", help="re-score quiz results from their answers on import")
+    args = parser.parse_args()
+
+    if args.action == "export" and not args.out:
+        parser.error("export needs --out")
+    if args.action == "import" and not args.input:
+        parser.error("import needs --in")
+    _require_format(args.format if args.action == "export" else "ndjson")
+
+    load_dotenv()
+    handlers = {
+        ("export", "quiz-results"): export_quiz_results,
+        ("export", "funds"): export_funds,
+        ("import", "quiz-results"): import_quiz_results,
+        ("import", "funds"): import_funds,
+    }
+    handlers[(args.action, args.dataset)](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+from typing import Optional, Dict, Any, Awaitable, Callable, Tuple
+from collections import OrderedDict
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+from observability import get_logger
+
+logger = get_logger("caching")
+
+# Bytes of each SQLite file read through mmap
+SQLITE_MMAP_BYTES = 256 * 1024 * 1024
+
+
+def _json_default(value: Any) -> Any:
+    # numpy/pandas scalars from DataFrame.to_dict() aren't JSON serializable
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class TieredCache:
+    """
+    Two-tier cache: an in-process LRU in front of an optional SQLite file so
+    warm entries survive restarts.
+
+    Keys are tuples, e.g. (ticker, kind, window). Entries past their TTL are still
+    returned for up to `stale_seconds` while a background refresh replaces them.
+    `submit` schedules that refresh; it may return None to skip it (e.g. when the
+    worker pool is busy), in which case the next stale hit tries again.
+
+    Several processes can share one SQLite file (it runs in WAL mode). A stale
+    memory entry is re-read from disk first, in case another process already
+    refreshed it, and `delegate(key)` may return True to hand the refresh to
+    another process (see workers.WorkerCoordinator) instead of running it here.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        db_path: Optional[str] = None,
+        stale_seconds: float = 3 * 86400,
+        submit: Optional[Callable[[Callable[[], None]], Any]] = None,
+        table: str = "cache_entries",
+        delegate: Optional[Callable[[Tuple], bool]] = None,
+    ):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+        self.table = table
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self.db_path = db_path
+        self._submit = submit or self._start_thread
+        self._delegate = delegate
+        self._entries: "OrderedDict[Tuple, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._refreshing: set = set()
+        self._stats = {
+            "hits": 0,
+            "staleHits": 0,
+            "diskHits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "refreshes": 0,
+            "refreshErrors": 0,
+            "refreshesSkipped": 0,
+            "refreshesDelegated": 0,
+        }
+        if db_path:
+            self._init_db()
+
+    def get_or_load(self, key: Tuple, loader: Callable[[], Any], ttl_seconds: float) -> Any:
+        """
+        Return the cached value for `key`, calling `loader` on a miss
+
+        Empty results (which the fetchers return on upstream errors) are not cached.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            value, expires_at = entry
+            now = time.time()
+            if now < expires_at:
+                self._count("hits")
+                return value
+            if now < expires_at + self.stale_seconds:
+                newer = self._newer_on_disk(key, expires_at, now)
+                if newer is not None:
+                    self._count("hits")
+                    return newer
+                self._count("staleHits")
+                self._refresh_in_background(key, loader, ttl_seconds)
+                return value
+
+        self._count("misses")
+        value = loader()
+        if value:
+            self.set(key, value, ttl_seconds)
+        return value
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """
+        Return the cached value for `key` if it hasn't expired, without loading
+        """
+        entry = self._lookup(key)
+        if entry is not None and time.time() < entry[1]:
+            self._count("hits")
+            return entry[0]
+        self._count("misses")
+        return None
+
+    def peek(self, key: Tuple) -> Optional[Any]:
+        """
+        Return the last value stored for `key`, however old (a last-known-good fallback)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.db_path:
+            entry = self._read_disk(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key: Tuple, value: Any, ttl_seconds: float) -> None:
+        expires_at = time.time() + ttl_seconds
+        self._set_memory(key, value, expires_at)
+        if self.db_path:
+            self._write_disk(key, value, expires_at)
+
+    def refresh(self, key: Tuple, loader: Callable[[], Any], ttl_seconds: float) -> None:
+        """
+        Reload `key` in the background here, unless the stored entry is already fresh
+
+        Used by the process that refreshes on behalf of others; never delegates.
+        """
+        entry = self._read_disk(key) if self.db_path else self._lookup(key)
+        if entry is not None and time.time() < entry[1]:
+            self._set_memory(key, entry[0], entry[1])
+            return
+        self._refresh_in_background(key, loader, ttl_seconds, delegate=False)
+
+    def invalidate(self, prefix: Tuple) -> int:
+        """
+        Drop every entry whose key starts with `prefix`; returns how many were in memory
+        """
+        with self._lock:
+            doomed = [key for key in self._entries if key[:len(prefix)] == prefix]
+            for key in doomed:
+                del self._entries[key]
+        if self.db_path:
+            disk_prefix = self._disk_key(prefix)
+            with self._db_lock, self._connect() as conn:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE key = ? OR substr(key, 1, ?) = ?",
+                    (disk_prefix, len(disk_prefix) + 1, disk_prefix + ":"),
+                )
+        return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            with self._db_lock, self._connect() as conn:
+                conn.execute(f"DELETE FROM {self.table}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        stats["maxEntries"] = self.max_entries
+        stats["diskEnabled"] = bool(self.db_path)
+        return stats
+
+    # --- internals ---
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _lookup(self, key: Tuple) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if not self.db_path:
+            return None
+
+        entry = self._read_disk(key)
+        if entry is None or time.time() >= entry[1] + self.stale_seconds:
+            return None
+        self._count("diskHits")
+        self._set_memory(key, entry[0], entry[1])
+        return entry
+
+    def _set_memory(self, key: Tuple, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _newer_on_disk(self, key: Tuple, expires_at: float, now: float) -> Optional[Any]:
+        if not self.db_path:
+            return None
+        entry = self._read_disk(key)
+        if entry is None or entry[1] <= expires_at or now >= entry[1]:
+            return None
+        self._set_memory(key, entry[0], entry[1])
+        return entry[0]
+
+    def _refresh_in_background(self, key: Tuple, loader: Callable[[], Any], ttl_seconds: float, delegate: bool = True) -> None:
+        # Only a shared disk tier lets another process's refresh reach this one
+        if delegate and self._delegate is not None and self.db_path and self._delegate(key):
+            self._count("refreshesDelegated")
+            return
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = loader()
+                if value:
+                    self.set(key, value, ttl_seconds)
+                    self._count("refreshes")
+                else:
+                    self._count("refreshErrors")
+            except Exception as e:
+                logger.warning("Background refresh failed for %s: %s", key, e)
+                self._count("refreshErrors")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        if self._submit(refresh) is None:
+            self._count("refreshesSkipped")
+            with self._lock:
+                self._refreshing.discard(key)
+
+    @staticmethod
+    def _start_thread(fn: Callable[[], None]) -> threading.Thread:
+        thread = threading.Thread(target=fn, name="cache-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _disk_key(key: Tuple) -> str:
+        return ":".join(str(part) for part in key)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        # Read pages through a shared memory map rather than copying them per process
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+        return conn
+
+    def _init_db(self) -> None:
+        with self._db_lock, self._connect() as conn:
+            # WAL lets other processes read while one writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _read_disk(self, key: Tuple) -> Optional[Tuple[Any, float]]:
+        try:
+            with self._db_lock, self._connect() as conn:
+                row = conn.execute(
+                    f"SELECT value, expires_at FROM {self.table} WHERE key = ?",
+                    (self._disk_key(key),),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Disk read failed for %s: %s", key, e)
+            return None
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _write_disk(self, key: Tuple, value: Any, expires_at: float) -> None:
+        try:
+            payload = json.dumps(value, default=_json_default)
+            with self._db_lock, self._connect() as conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                    (self._disk_key(key), payload, expires_at),
+                )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning("Disk write failed for %s: %s", key, e)
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.callers = 1
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one execution
+
+    The first caller for a key runs the function; callers that arrive while it
+    is running wait for it and share its result (or exception). Per-key fan-out
+    counts record how many upstream calls were saved.
+    """
+
+    def __init__(self, max_tracked_keys: int = 1024):
+        self.max_tracked_keys = max_tracked_keys
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple, _InFlightCall] = {}
+        self._fanout: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def do(self, key: Tuple, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.callers += 1
+                leader = False
+            else:
+                call = _InFlightCall()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self._record(key, call.callers)
+            call.event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = {key: dict(counts) for key, counts in self._fanout.items()}
+            in_flight = len(self._calls)
+        return {
+            "inFlight": in_flight,
+            "upstreamCalls": sum(k["flights"] for k in keys.values()),
+            "callers": sum(k["callers"] for k in keys.values()),
+            "keys": keys,
+        }
+
+    def _record(self, key: Tuple, callers: int) -> None:
+        name = ":".join(str(part) for part in key)
+        counts = self._fanout.pop(name, None) or {"flights": 0, "callers": 0, "maxFanout": 0}
+        counts["flights"] += 1
+        counts["callers"] += callers
+        counts["maxFanout"] = max(counts["maxFanout"], callers)
+        self._fanout[name] = counts
+        while len(self._fanout) > self.max_tracked_keys:
+            self._fanout.popitem(last=False)
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight for coroutines on one event loop
+
+    Waiting callers don't hold a thread, so coalescing long upstream calls
+    (e.g. LLM generation) costs nothing per extra caller.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple, "asyncio.Future[Any]"] = {}
+        self._stats = {"upstreamCalls": 0, "coalesced": 0}
+
+    async def do(self, key: Tuple, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self._stats["upstreamCalls"] += 1
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved so a call nobody else waited on doesn't warn
+            future.exception()
+            raise
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"inFlight": len(self._calls), **self._stats}
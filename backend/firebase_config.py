@@ -1,14 +1,21 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 import os
 from pathlib import Path
 
+from observability import get_logger
+from subsystems import LazySubsystem
+
+logger = get_logger("firebase")
+
 # Initialize Firebase Admin SDK
 # Make sure you have downloaded the service account key from Firebase Console
 # and placed it in the backend directory as "serviceAccountKey.json"
 
 def initialize_firebase():
     """Initialize Firebase Admin SDK if not already initialized"""
+    # Imported here: firebase_admin/google.cloud.firestore are slow to import
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
     if not firebase_admin._apps:
         # Try to find the service account key
         service_account_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
@@ -28,17 +35,23 @@ def initialize_firebase():
                     break
         
         if not service_account_path or not os.path.exists(service_account_path):
-            print(f"Warning: Firebase service account key not found.")
-            print(f"Please download it from Firebase Console and save it as 'serviceAccountKey.json'")
-            print(f"in the backend directory, or set GOOGLE_APPLICATION_CREDENTIALS environment variable.")
+            logger.warning(
+                "Firebase service account key not found. Please download it from Firebase Console "
+                "and save it as 'serviceAccountKey.json' in the backend directory, "
+                "or set GOOGLE_APPLICATION_CREDENTIALS environment variable."
+            )
             return None
         
         cred = credentials.Certificate(service_account_path)
         firebase_admin.initialize_app(cred)
-        print(f"✓ Firebase Admin SDK initialized with: {service_account_path}")
+        logger.info("Firebase Admin SDK initialized with: %s", service_account_path)
     
     return firestore.client()
 
-# Initialize and export db
-db = initialize_firebase()
+# Initialized on first use (or by the startup task in main.py), not at import
+firebase = LazySubsystem("firebase", initialize_firebase)
+
+def get_db():
+    """Firestore client, or None if Firebase isn't configured"""
+    return firebase.get()
 
@@ -1,89 +1,505 @@
-from firebase_config import db
-from firebase_admin import firestore
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from firebase_config import get_db
+from typing import Optional, List, Dict, Any, Callable, Iterator, Tuple
+from caching import TieredCache
+from observability import get_logger, track_upstream
+from datetime import datetime, timezone
+from pathlib import Path
+import glob
+import json
+import os
+import queue
+import threading
+import time
 
-# Import db and check if it's available
-if db is None:
-    print("Warning: Firebase not initialized. Firebase service functions will not work.")
+logger = get_logger("firebase_service")
+
+# Firestore allows at most 500 writes per batch
+FIRESTORE_BATCH_SIZE = min(int(os.getenv("FIRESTORE_BATCH_SIZE", "500")), 500)
+# Longest a queued write waits for its batch to fill before being flushed
+FIRESTORE_FLUSH_INTERVAL_MS = int(os.getenv("FIRESTORE_FLUSH_INTERVAL_MS", "200"))
+# Writes allowed to wait for a flush before new saves are turned away
+FIRESTORE_WRITE_QUEUE_LIMIT = int(os.getenv("FIRESTORE_WRITE_QUEUE_LIMIT", "5000"))
+# Seconds a save waits for room in a full queue before giving up
+FIRESTORE_ENQUEUE_TIMEOUT = float(os.getenv("FIRESTORE_ENQUEUE_TIMEOUT", "0.5"))
+# Attempts per batch commit before its writes are spooled to disk
+FIRESTORE_COMMIT_ATTEMPTS = 3
+# Writes that still fail are appended here and retried later ("" drops them instead)
+FIRESTORE_SPOOL_PATH = os.getenv("FIRESTORE_SPOOL_PATH", str(Path(__file__).parent / "firestore_spool.ndjson"))
+# Seconds between attempts to commit spooled writes
+FIRESTORE_SPOOL_RETRY_SECONDS = float(os.getenv("FIRESTORE_SPOOL_RETRY_SECONDS", "60"))
+
+QUIZ_RESULTS_PAGE_SIZE = 20
+QUIZ_RESULTS_MAX_PAGE_SIZE = 100
+# Cached result pages are also dropped whenever the user saves a new result
+# through /save_quiz_result. The quiz page writes to Firestore directly
+# (frontend/src/services/firebaseService.ts), which this backend never sees,
+# so this is how long such a result can be missing from a cached page.
+QUIZ_RESULTS_CACHE_TTL_SECONDS = int(os.getenv("QUIZ_RESULTS_CACHE_TTL_SECONDS", "30"))
+QUIZ_RESULTS_CACHE_MAX_ENTRIES = int(os.getenv("QUIZ_RESULTS_CACHE_MAX_ENTRIES", "2048"))
+
+quiz_results_cache = TieredCache(
+    max_entries=QUIZ_RESULTS_CACHE_MAX_ENTRIES,
+    stale_seconds=0,
+    table="quiz_results_cache",
+)
+
+
+class WriteQueueFullError(Exception):
+    """Raised when the Firestore write queue stays full for the enqueue timeout"""
+
+
+class BatchedWriter:
+    """
+    Write-behind queue for Firestore documents
+
+    Writes are queued with IDs generated on the client and committed by one
+    background thread in batches of up to `batch_size`, whenever a batch is full
+    or its oldest write has waited `flush_interval_ms`. A full queue blocks
+    callers for up to `enqueue_timeout` seconds and then raises
+    WriteQueueFullError, so a slow Firestore pushes back on callers instead of
+    growing memory without bound.
+
+    Callers already have their document ID, so a batch that keeps failing is
+    appended to `spool_path` rather than dropped, and committed again every
+    `spool_retry_seconds`. Spooled writes keep their IDs, so committing one
+    twice (e.g. from two workers) just rewrites the same document. Spools left
+    mid-replay by a worker that died are picked up again when the writer starts.
+    `server_timestamp` is the client's SERVER_TIMESTAMP sentinel, which is
+    spooled as the time of the failure.
+    """
+
+    def __init__(
+        self,
+        client,
+        batch_size: int = 500,
+        flush_interval_ms: int = 200,
+        queue_limit: int = 5000,
+        enqueue_timeout: float = 0.5,
+        on_commit: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        spool_path: Optional[str] = None,
+        spool_retry_seconds: float = 60,
+        server_timestamp: Any = None,
+    ):
+        self.client = client
+        self.on_commit = on_commit
+        self.spool_path = spool_path or None
+        self.spool_retry_seconds = spool_retry_seconds
+        self.server_timestamp = server_timestamp
+        self._next_replay = 0.0
+        self._spool_lock = threading.Lock()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_limit)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"written": 0, "batches": 0, "failed": 0, "rejected": 0, "retries": 0, "spooled": 0, "replayed": 0}
+
+    def enqueue(self, collection: str, data: Dict[str, Any]) -> str:
+        """
+        Queue a new document and return its ID without waiting for Firestore
+
+        Raises:
+            WriteQueueFullError: if the queue is still full after enqueue_timeout
+            RuntimeError: if the writer has been closed
+        """
+        if self._closed:
+            raise RuntimeError("Firestore writer is closed")
+        doc_ref = self.client.collection(collection).document()  # ID is generated locally
+        self._ensure_started()
+        try:
+            self._queue.put((collection, doc_ref, data), timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise WriteQueueFullError(f"Firestore write queue full ({self._queue.maxsize} pending)")
+        return doc_ref.id
+
+    def close(self, timeout: Optional[float] = 30) -> None:
+        """
+        Stop accepting writes and block until everything queued is committed
+        """
+        self._closed = True
+        thread = self._thread
+        if thread is not None:
+            self._queue.put(None)  # wake the flusher; it drains everything ahead of this
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "pending": self._queue.qsize(),
+                "queueLimit": self._queue.maxsize,
+                "batchSize": self.batch_size,
+                "flushIntervalMs": int(self.flush_interval * 1000),
+            }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="firestore-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        if self.spool_path:
+            self._adopt_orphaned_replays()
+        stopping = False
+        while not stopping:
+            if self.spool_path and time.monotonic() >= self._next_replay:
+                self._replay_spool()
+            try:
+                first = self._queue.get(timeout=self.spool_retry_seconds if self.spool_path else None)
+            except queue.Empty:
+                continue
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+        # Drain anything that raced in behind the shutdown marker
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftovers.append(item)
+        for i in range(0, len(leftovers), self.batch_size):
+            self._commit(leftovers[i:i + self.batch_size])
+
+    def _commit(self, items: List[Tuple[str, Any, Dict[str, Any]]]) -> bool:
+        for attempt in range(FIRESTORE_COMMIT_ATTEMPTS):
+            try:
+                batch = self.client.batch()
+                for _, doc_ref, data in items:
+                    batch.set(doc_ref, data)
+                with track_upstream("firestore_commit"):
+                    batch.commit()
+                with self._lock:
+                    self._stats["written"] += len(items)
+                    self._stats["batches"] += 1
+                if self.on_commit is not None:
+                    self.on_commit([data for _, _, data in items])
+                return True
+            except Exception as e:
+                logger.warning("Batch of %d failed (attempt %d): %s", len(items), attempt + 1, e)
+                if attempt + 1 < FIRESTORE_COMMIT_ATTEMPTS:
+                    with self._lock:
+                        self._stats["retries"] += 1
+                    time.sleep(0.5 * 2 ** attempt)
+        self._spool(items)
+        return False
+
+    def _spool(self, items: List[Tuple[str, Any, Dict[str, Any]]]) -> None:
+        spooled = False
+        if self.spool_path:
+            spooled_at = datetime.now(timezone.utc)
+            try:
+                lines = [
+                    json.dumps({"collection": collection, "id": doc_ref.id, "data": data}, default=lambda v: _spool_value(v, spooled_at, self.server_timestamp))
+                    for collection, doc_ref, data in items
+                ]
+                with self._spool_lock, open(self.spool_path, "a", encoding="utf-8") as f:
+                    f.write("".join(line + "\n" for line in lines))
+                spooled = True
+            except (OSError, TypeError, ValueError) as e:
+                logger.error("Couldn't spool %d failed writes to %s: %s", len(items), self.spool_path, e)
+        with self._lock:
+            self._stats["spooled" if spooled else "failed"] += len(items)
+        for collection, doc_ref, data in items:
+            if spooled:
+                logger.error("Write of %s/%s (user %s) failed; spooled to %s for retry", collection, doc_ref.id, data.get("userId"), self.spool_path)
+            else:
+                logger.error("Write of %s/%s (user %s) failed and was lost: %s", collection, doc_ref.id, data.get("userId"), data)
+        # Don't retry a spool that was just written to before Firestore has had time to recover
+        self._next_replay = max(self._next_replay, time.monotonic() + self.spool_retry_seconds)
+
+    def _replay_spool(self) -> None:
+        """
+        Commit the writes in the spool file; ones that fail again are re-spooled
+        """
+        self._next_replay = time.monotonic() + self.spool_retry_seconds
+        # Claim the file by renaming it, so new failures start a fresh spool
+        # and another worker replaying at the same moment finds nothing
+        claimed = f"{self.spool_path}.{os.getpid()}.replay"
+        try:
+            with self._spool_lock:
+                if not os.path.exists(claimed):
+                    os.replace(self.spool_path, claimed)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.error("Couldn't claim Firestore spool %s: %s", self.spool_path, e)
+            return
+
+        items = []
+        with open(claimed, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line, object_hook=_unspool_value)
+                except ValueError:
+                    logger.error("Skipping unreadable line in Firestore spool %s: %r", claimed, line)
+                    continue
+                collection = entry["collection"]
+                items.append((collection, self.client.collection(collection).document(entry["id"]), entry["data"]))
+        logger.info("Retrying %d spooled Firestore writes", len(items))
+        for i in range(0, len(items), self.batch_size):
+            chunk = items[i:i + self.batch_size]
+            if self._commit(chunk):
+                with self._lock:
+                    self._stats["replayed"] += len(chunk)
+        os.remove(claimed)
+
+    def _adopt_orphaned_replays(self) -> None:
+        """
+        Move spools claimed by workers that died mid-replay back into the spool
+        """
+        for orphan in glob.glob(f"{glob.escape(self.spool_path)}.*.replay"):
+            pid = orphan[len(self.spool_path) + 1:-len(".replay")]
+            # Our own PID means a previous process with the same PID (e.g. PID 1
+            # in a container); _replay_spool already retries that file
+            if not pid.isdigit() or int(pid) == os.getpid() or _pid_alive(int(pid)):
+                continue
+            try:
+                with self._spool_lock:
+                    with open(orphan, encoding="utf-8") as f:
+                        lines = f.read()
+                    if lines and not lines.endswith("\n"):
+                        lines += "\n"  # the worker may have died mid-write
+                    with open(self.spool_path, "a", encoding="utf-8") as f:
+                        f.write(lines)
+                    os.remove(orphan)
+            except FileNotFoundError:
+                continue  # another worker adopted it first
+            except OSError as e:
+                logger.error("Couldn't adopt orphaned Firestore spool %s: %s", orphan, e)
+                continue
+            logger.warning("Adopted Firestore spool %s left by exited worker %s", orphan, pid)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists but belongs to another user
+    return True
+
+
+def _spool_value(value: Any, spooled_at: datetime, server_timestamp: Any = None) -> Any:
+    # JSON stand-ins for Firestore values; SERVER_TIMESTAMP becomes the time
+    # the write was spooled, which is closer to the save than the retry
+    if isinstance(value, datetime):
+        return {"$time": value.isoformat()}
+    if server_timestamp is not None and value is server_timestamp:
+        return {"$time": spooled_at.isoformat()}
+    raise TypeError(f"Can't spool a {type(value).__name__}")
+
+
+def _unspool_value(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "$time" in obj:
+        return datetime.fromisoformat(obj["$time"])
+    return obj
+
+
+_writer_lock = threading.Lock()
+quiz_result_writer: Optional[BatchedWriter] = None
+
+
+def _get_writer() -> Optional[BatchedWriter]:
+    """
+    The quiz result writer, created along with the Firestore client on first save
+    """
+    global quiz_result_writer
+    with _writer_lock:
+        if quiz_result_writer is None:
+            db = get_db()
+            if db is None:
+                return None
+            from firebase_admin import firestore
+            quiz_result_writer = BatchedWriter(
+                db,
+                batch_size=FIRESTORE_BATCH_SIZE,
+                flush_interval_ms=FIRESTORE_FLUSH_INTERVAL_MS,
+                queue_limit=FIRESTORE_WRITE_QUEUE_LIMIT,
+                enqueue_timeout=FIRESTORE_ENQUEUE_TIMEOUT,
+                # Pages cached between the save and the commit don't include the new result
+                on_commit=lambda written: [invalidate_user_quiz_results(data["userId"]) for data in written],
+                spool_path=FIRESTORE_SPOOL_PATH,
+                spool_retry_seconds=FIRESTORE_SPOOL_RETRY_SECONDS,
+                server_timestamp=firestore.SERVER_TIMESTAMP,
+            )
+        return quiz_result_writer
+
+
+def get_write_stats() -> Dict[str, Any]:
+    """
+    Counters for the quiz result write-behind queue and results cache (for /health)
+    """
+    if quiz_result_writer is None:
+        return {"enabled": False, "resultsCache": quiz_results_cache.stats()}
+    return {"enabled": True, **quiz_result_writer.stats(), "resultsCache": quiz_results_cache.stats()}
+
+
+def flush_quiz_results(timeout: Optional[float] = 30) -> None:
+    """
+    Commit every queued quiz result; call on shutdown
+    """
+    if quiz_result_writer is not None:
+        quiz_result_writer.close(timeout)
 
 def save_quiz_result(
     user_id: str,
     role: str,
-    quiz_answers: List[Dict[str, Any]],  # Not stored, only used for calculation
-    personality_scores: Dict[str, float],  # Not stored
-    personality_type: Dict[str, str]
+    quiz_answers: List[int],
+    personality_scores: Dict[str, float],
+    personality_type: Dict[str, str],
+    quiz_version: Optional[str] = None
 ) -> Optional[str]:
     """
-    Save MBTI result to Firestore (only the 4-letter code and related info, not quiz answers)
+    Save MBTI result to Firestore (the 4-letter code, related info, axis scores and answers)
+    
+    The write is queued and committed in the background (see BatchedWriter),
+    so the returned ID is known before the document reaches Firestore.
     
     Args:
         user_id: Unique user identifier
         role: "investor" or "advisor"
-        quiz_answers: List of quiz answers (not stored, only used for calculation)
-        personality_scores: Personality scores dictionary (not stored)
+        quiz_answers: Answer per question, 0 if unanswered (see QuizScorer.answer_vector);
+            stored so results can be re-scored when the quiz changes
+        personality_scores: Personality scores dictionary (stored for matchmaking)
         personality_type: Personality type dictionary (code, name, description, color)
+        quiz_version: Version of the question table the answers were scored with
     
     Returns:
-        Document ID if successful, None if failed
+        Document ID if queued, None if Firebase is unavailable
+
+    Raises:
+        WriteQueueFullError: if the write queue stays full (caller should back off)
     """
-    if db is None:
-        print("Warning: Firebase not initialized. Cannot save MBTI result.")
+    writer = _get_writer()
+    if writer is None:
+        logger.warning("Firebase not initialized. Cannot save MBTI result.")
         return None
     
+    from firebase_admin import firestore
     try:
-        # Only save the MBTI result (4-letter code and related info)
+        # Save the MBTI result (4-letter code and related info), the raw
+        # axis scores, which the matchmaking index is built from, and the
+        # answers they were scored from
         mbti_result_data = {
             "userId": user_id,
             "role": role,
             "personalityType": personality_type,  # Contains the 4-letter MBTI code
+            "personalityScores": personality_scores,
+            "answers": quiz_answers,
+            "quizVersion": quiz_version,
             "createdAt": firestore.SERVER_TIMESTAMP,
             "updatedAt": firestore.SERVER_TIMESTAMP
         }
         
-        doc_ref = db.collection("quizResults").document()
-        doc_ref.set(mbti_result_data)
-        
-        print(f"MBTI result saved to Firebase with ID: {doc_ref.id}")
-        return doc_ref.id
+        doc_id = writer.enqueue("quizResults", mbti_result_data)
+        invalidate_user_quiz_results(user_id)
+        return doc_id
+    except WriteQueueFullError:
+        raise
     except Exception as e:
-        print(f"Error saving MBTI result to Firebase: {e}")
+        logger.error("Error saving MBTI result to Firebase: %s", e)
         return None
 
-def get_user_quiz_results(user_id: str) -> List[Dict[str, Any]]:
+def _load_quiz_results_page(user_id: str, limit: int, cursor: Optional[str]) -> Dict[str, Any]:
+    from firebase_admin import firestore
+    db = get_db()
+    query = (
+        db.collection("quizResults")
+        .where("userId", "==", user_id)
+        .order_by("createdAt", direction=firestore.Query.DESCENDING)
+    )
+    if cursor:
+        with track_upstream("firestore_read"):
+            cursor_doc = db.collection("quizResults").document(cursor).get()
+        if not cursor_doc.exists or cursor_doc.get("userId") != user_id:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        query = query.start_after(cursor_doc)
+
+    # One extra document tells us whether there's another page
+    with track_upstream("firestore_read"):
+        docs = list(query.limit(limit + 1).stream())
+    quiz_results = []
+    for doc in docs[:limit]:
+        data = doc.to_dict()
+        data["id"] = doc.id
+        quiz_results.append(data)
+
+    return {
+        "results": quiz_results,
+        "nextCursor": quiz_results[-1]["id"] if len(docs) > limit else None,
+    }
+
+def get_user_quiz_results(
+    user_id: str,
+    limit: int = QUIZ_RESULTS_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
     """
-    Get all quiz results for a user
+    Get one page of a user's quiz results, most recent first
+    
+    Sorted and limited by Firestore (needs the userId + createdAt index in
+    firestore.indexes.json) and cached per user until their next save or for
+    QUIZ_RESULTS_CACHE_TTL_SECONDS, whichever comes first (results written
+    straight to Firestore by the frontend only show up once a page expires).
     
     Args:
         user_id: Unique user identifier
+        limit: Maximum number of results to return
+        cursor: nextCursor from the previous page, or None for the first page
     
     Returns:
-        List of quiz result documents
+        Dictionary with "results" (quiz result documents) and "nextCursor"
+        (None on the last page)
+    
+    Raises:
+        ValueError: if the cursor isn't one of this user's results
     """
-    if db is None:
-        print("Warning: Firebase not initialized. Cannot get quiz results.")
-        return []
+    if get_db() is None:
+        logger.warning("Firebase not initialized. Cannot get quiz results.")
+        return {"results": [], "nextCursor": None}
     
+    limit = max(1, min(limit, QUIZ_RESULTS_MAX_PAGE_SIZE))
     try:
-        results = db.collection("quizResults").where("userId", "==", user_id).stream()
-        quiz_results = []
-        
-        for doc in results:
-            data = doc.to_dict()
-            data["id"] = doc.id
-            quiz_results.append(data)
-        
-        # Sort by most recent first
-        quiz_results.sort(key=lambda x: x.get("createdAt", datetime.min), reverse=True)
-        
-        return quiz_results
+        return quiz_results_cache.get_or_load(
+            (user_id, "results", f"{limit}:{cursor or ''}"),
+            lambda: _load_quiz_results_page(user_id, limit, cursor),
+            QUIZ_RESULTS_CACHE_TTL_SECONDS,
+        )
+    except ValueError:
+        raise
     except Exception as e:
-        print(f"Error getting quiz results: {e}")
-        return []
+        logger.error("Error getting quiz results: %s", e)
+        return {"results": [], "nextCursor": None}
 
 def get_latest_quiz_result(user_id: str) -> Optional[Dict[str, Any]]:
     """
-    Get the most recent quiz result for a user
+    Get the most recent quiz result for a user (reads a single document)
+
+    Never cached: the frontend saves results straight to Firestore, so a
+    cached copy could hide the result the user just saved.
     
     Args:
         user_id: Unique user identifier
@@ -91,6 +507,129 @@ def get_latest_quiz_result(user_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Most recent quiz result document or None
     """
-    results = get_user_quiz_results(user_id)
+    if get_db() is None:
+        logger.warning("Firebase not initialized. Cannot get quiz results.")
+        return None
+    try:
+        results = _load_quiz_results_page(user_id, 1, None)["results"]
+    except Exception as e:
+        logger.error("Error getting latest quiz result: %s", e)
+        return None
     return results[0] if results else None
 
+def invalidate_user_quiz_results(user_id: str) -> None:
+    """
+    Forget cached quiz results for a user, e.g. after they save a new one
+    """
+    quiz_results_cache.invalidate((user_id,))
+
+
+def iter_quiz_result_scores() -> Iterator[Tuple[str, str, Dict[str, float]]]:
+    """
+    (userId, role, personalityScores) from each user's latest stored quiz
+    result, skipping results saved before scores were stored
+
+    The collection is read in keyset-paginated pages (see iter_collection_pages),
+    so nothing is yielded until the scan is done; if it fails part way, the
+    users read so far are still yielded.
+
+    Yields:
+        Tuples of user ID, role and the four axis scores
+    """
+    if get_db() is None:
+        logger.warning("Firebase not initialized. Cannot read quiz results.")
+        return
+
+    # Pages come in document ID order, so keep the newest result per user
+    latest: Dict[str, Tuple[Any, str, Dict[str, float]]] = {}
+    try:
+        for page in iter_collection_pages("quizResults", fields=["userId", "role", "personalityScores", "createdAt"]):
+            for _, data in page:
+                user_id, scores = data.get("userId"), data.get("personalityScores")
+                if not user_id or not scores:
+                    continue
+                created = data.get("createdAt")
+                seen = latest.get(user_id)
+                if seen is None or (created is not None and (seen[0] is None or created >= seen[0])):
+                    latest[user_id] = (created, data.get("role", "investor"), scores)
+    except Exception as e:
+        logger.error("Error reading quiz results (loaded %d users): %s", len(latest), e)
+    for user_id, (_, role, scores) in latest.items():
+        yield user_id, role, scores
+
+
+# === Bulk access (see bulk_pipeline.py) ===
+
+def iter_collection_pages(
+    collection: str,
+    start_id: Optional[str] = None,
+    after_id: Optional[str] = None,
+    before_id: Optional[str] = None,
+    page_size: int = 500,
+    fields: Optional[List[str]] = None,
+) -> Iterator[List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Stream a collection in document ID order, one page at a time
+
+    Each page is a separate query starting after the last ID seen (keyset
+    pagination), so no query stays open and memory holds one page at most.
+
+    Args:
+        collection: Collection name, e.g. "quizResults"
+        start_id: Only documents with IDs from this one on (a partition's start)
+        after_id: Only documents with IDs after this one (a resume cursor; overrides start_id)
+        before_id: Only documents with IDs before this one (a partition's end)
+        page_size: Documents per query
+        fields: Only read these fields (None reads whole documents)
+
+    Yields:
+        Lists of (document ID, data)
+    """
+    db = get_db()
+    if db is None:
+        raise RuntimeError("Firebase not initialized")
+    ref = db.collection(collection)
+    while True:
+        query = ref.order_by("__name__")
+        if fields is not None:
+            query = query.select(fields)
+        if after_id is not None:
+            query = query.where("__name__", ">", ref.document(after_id))
+        elif start_id is not None:
+            query = query.where("__name__", ">=", ref.document(start_id))
+        if before_id is not None:
+            query = query.where("__name__", "<", ref.document(before_id))
+        with track_upstream("firestore_read"):
+            page = [(doc.id, doc.to_dict()) for doc in query.limit(page_size).stream()]
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        after_id = page[-1][0]
+
+def commit_documents(collection: str, documents: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """
+    Write documents with the given IDs in one batch (at most FIRESTORE_BATCH_SIZE),
+    overwriting existing ones, so replaying a batch is harmless
+
+    Raises:
+        The last error if every attempt fails
+    """
+    db = get_db()
+    if db is None:
+        raise RuntimeError("Firebase not initialized")
+    ref = db.collection(collection)
+    for attempt in range(FIRESTORE_COMMIT_ATTEMPTS):
+        try:
+            batch = db.batch()
+            for doc_id, data in documents:
+                batch.set(ref.document(doc_id), data)
+            with track_upstream("firestore_commit"):
+                batch.commit()
+            return
+        except Exception as e:
+            if attempt + 1 == FIRESTORE_COMMIT_ATTEMPTS:
+                raise
+            logger.warning("Batch of %d failed (attempt %d): %s", len(documents), attempt + 1, e)
+            time.sleep(0.5 * 2 ** attempt)
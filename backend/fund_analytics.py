@@ -0,0 +1,146 @@
+from typing import Optional, Dict, List, Any, Tuple
+import math
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+# Rolling return windows, in trading days
+ROLLING_WINDOWS = {"1M": 21, "3M": 63, "6M": 126, "1Y": 252}
+
+# (dates as datetime64[D], values as float64), both oldest first
+NavArrays = Tuple[np.ndarray, np.ndarray]
+
+
+def _finite(value: float) -> Optional[float]:
+    # NaN/inf aren't valid JSON; report them as missing
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def to_arrays(dates: List[str], navs: List[float], total_returns: List[float]) -> NavArrays:
+    """
+    Convert NAV columns (as read from the NAV history store) into arrays
+
+    Uses the totalReturn index (which includes distributions) when every point
+    has one, otherwise falls back to the raw NAV.
+    """
+    day_array = np.array(dates, dtype="datetime64[D]")
+    total_return = np.array(total_returns, dtype=float)
+    if len(dates) and np.all(np.isfinite(total_return)) and np.all(total_return > 0):
+        return day_array, total_return
+    return day_array, np.array(navs, dtype=float)
+
+
+def max_drawdown(values: np.ndarray) -> float:
+    """
+    Largest peak-to-trough fall, as a negative fraction (e.g. -0.25)
+    """
+    running_peak = np.maximum.accumulate(values)
+    return float(np.min(values / running_peak - 1.0))
+
+
+def rolling_returns(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Return over every `window`-point span of the series
+    """
+    if len(values) <= window:
+        return np.empty(0)
+    return values[window:] / values[:-window] - 1.0
+
+
+def series_metrics(values: np.ndarray, risk_free_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Return/risk metrics for one price series, all annualized from daily returns
+    """
+    returns = values[1:] / values[:-1] - 1.0
+    years = len(returns) / TRADING_DAYS_PER_YEAR
+    total_return = values[-1] / values[0] - 1.0
+    annualized_return = (1.0 + total_return) ** (1.0 / years) - 1.0 if years > 0 else math.nan
+
+    daily_rf = risk_free_rate / TRADING_DAYS_PER_YEAR
+    excess = returns - daily_rf
+    volatility = returns.std(ddof=1) if len(returns) > 1 else math.nan
+    downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2)) if len(returns) else math.nan
+    scale = math.sqrt(TRADING_DAYS_PER_YEAR)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = excess.mean() / volatility * scale if len(returns) > 1 else math.nan
+        sortino = excess.mean() / downside * scale if len(returns) else math.nan
+
+    rolling = {}
+    for label, window in ROLLING_WINDOWS.items():
+        spans = rolling_returns(values, window)
+        if len(spans):
+            rolling[label] = {
+                "latest": _finite(spans[-1]),
+                "mean": _finite(spans.mean()),
+                "min": _finite(spans.min()),
+                "max": _finite(spans.max()),
+            }
+
+    return {
+        "totalReturn": _finite(total_return),
+        "annualizedReturn": _finite(annualized_return),
+        "annualizedVolatility": _finite(volatility * scale),
+        "maxDrawdown": _finite(max_drawdown(values)),
+        "sharpe": _finite(sharpe),
+        "sortino": _finite(sortino),
+        "rollingReturns": rolling,
+    }
+
+
+def correlation_matrix(series: Dict[str, NavArrays]) -> Dict[str, Any]:
+    """
+    Correlation of daily returns across tickers, over the dates they all share
+    """
+    tickers = [t for t, (dates, _) in series.items() if len(dates) > 2]
+    if len(tickers) < 2:
+        return {"tickers": tickers, "matrix": [[1.0]] if tickers else [], "observations": 0}
+
+    common = series[tickers[0]][0]
+    for ticker in tickers[1:]:
+        common = np.intersect1d(common, series[ticker][0], assume_unique=True)
+    if len(common) < 3:
+        return {"tickers": tickers, "matrix": None, "observations": len(common)}
+
+    # T x N price matrix aligned on the shared dates
+    prices = np.column_stack([
+        values[np.searchsorted(dates, common)] for dates, values in (series[t] for t in tickers)
+    ])
+    returns = prices[1:] / prices[:-1] - 1.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        matrix = np.corrcoef(returns, rowvar=False)
+
+    return {
+        "tickers": tickers,
+        "matrix": [[_finite(v) for v in row] for row in np.atleast_2d(matrix)],
+        "observations": int(len(returns)),
+    }
+
+
+def compute_analytics(series: Dict[str, NavArrays], risk_free_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Per-ticker metrics plus the cross-ticker correlation matrix
+
+    Args:
+        series: ticker -> (dates, values) arrays, oldest first
+        risk_free_rate: Annual risk-free rate used for Sharpe/Sortino (e.g. 0.04)
+
+    Returns:
+        Dictionary with "tickers" (metrics or an error per ticker) and "correlation"
+    """
+    metrics: Dict[str, Dict[str, Any]] = {}
+    usable: Dict[str, NavArrays] = {}
+    for ticker, (dates, values) in series.items():
+        if len(values) < 2 or not np.all(np.isfinite(values)) or np.any(values <= 0):
+            metrics[ticker] = {"error": "Not enough NAV history"}
+            continue
+        usable[ticker] = (dates, values)
+        metrics[ticker] = {
+            "points": int(len(values)),
+            "start": str(dates[0]),
+            "end": str(dates[-1]),
+            **series_metrics(values, risk_free_rate),
+        }
+
+    return {"tickers": metrics, "correlation": correlation_matrix(usable)}
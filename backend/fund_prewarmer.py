@@ -0,0 +1,215 @@
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Any, Callable, Tuple
+import asyncio
+import os
+import time
+
+from fund_service import (
+    refresh_fund_nav,
+    refresh_fund_holdings,
+    seconds_until_nav_publish,
+    mstarpy_lib,
+    HOLDINGS_TTL_SECONDS,
+)
+from observability import get_logger
+from upstream_pool import upstream_pool
+
+logger = get_logger("fund_prewarmer")
+
+# The ETFs the frontend shows (frontend/src/data/mockETFs.ts)
+PREWARM_TICKERS = [t.strip().upper() for t in os.getenv("PREWARM_TICKERS", "VOO,QQQ,BND,ARKK,VTI,SPY,SCHD,TQQQ").split(",") if t.strip()]
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() not in ("0", "false", "no")
+# Refreshes running at once, and upstream refreshes started per second
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "2"))
+PREWARM_RATE_PER_SECOND = float(os.getenv("PREWARM_RATE_PER_SECOND", "1"))
+# Wait this long after the NAV publish time so Morningstar has the new NAVs
+PREWARM_DELAY_SECONDS = int(os.getenv("PREWARM_DELAY_SECONDS", str(15 * 60)))
+# Refresh holdings this long before their cache entry expires
+PREWARM_LEAD_SECONDS = int(os.getenv("PREWARM_LEAD_SECONDS", str(10 * 60)))
+# Wait before retrying a failed refresh
+PREWARM_RETRY_SECONDS = int(os.getenv("PREWARM_RETRY_SECONDS", str(5 * 60)))
+# Longest the scheduler sleeps between checks
+PREWARM_MAX_SLEEP_SECONDS = 3600
+
+KINDS = ("nav", "holdings")
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
+
+
+class _RateLimiter:
+    """Spaces acquisitions at least 1/rate seconds apart"""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class FundPrewarmer:
+    """
+    Keeps the fund cache warm for a fixed list of tickers
+
+    Each ticker's NAV window is refreshed shortly after the daily NAV publish
+    time, and its holdings shortly before their cache entry expires, so fund
+    pages are served from cache rather than by the first visitor of the day.
+    Refreshes run on the upstream pool, at most `concurrency` at a time and
+    `rate_per_second` started per second.
+    """
+
+    def __init__(
+        self,
+        tickers: List[str],
+        concurrency: int = 2,
+        rate_per_second: float = 1.0,
+        refreshers: Optional[Dict[str, Callable[[str], int]]] = None,
+    ):
+        self.tickers = tickers
+        self.concurrency = max(1, concurrency)
+        self.rate_per_second = rate_per_second
+        self._refreshers = refreshers or {"nav": refresh_fund_nav, "holdings": refresh_fund_holdings}
+        # (ticker, kind) -> refreshedAt, expiresAt, dueAt, count, error
+        self._state: Dict[Tuple[str, str], Dict[str, Any]] = {
+            (ticker, kind): {"refreshedAt": None, "expiresAt": None, "dueAt": 0.0, "count": 0, "error": None}
+            for ticker in tickers for kind in KINDS
+        }
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._next_run: Optional[float] = None
+        self._last_run: Optional[Dict[str, Any]] = None
+        self._runs = 0
+
+    def start(self) -> None:
+        """
+        Start the scheduler on the running event loop
+        """
+        if self._task is None and self.tickers:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self, only_due: bool = True) -> Dict[str, Any]:
+        """
+        Refresh every (ticker, kind) that is due (or all of them)
+
+        Returns:
+            Summary of the run: refreshed and failed counts, duration
+        """
+        now = time.time()
+        jobs = [key for key, state in self._state.items() if not only_due or state["dueAt"] <= now]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = _RateLimiter(self.rate_per_second)
+        started = time.perf_counter()
+
+        async def refresh(key: Tuple[str, str]) -> bool:
+            async with semaphore:
+                await limiter.acquire()
+                return await self._refresh(*key)
+
+        results = await asyncio.gather(*(refresh(key) for key in jobs))
+        self._runs += 1
+        self._last_run = {
+            "startedAt": _iso(now),
+            "durationMs": round((time.perf_counter() - started) * 1000),
+            "refreshed": sum(results),
+            "failed": len(results) - sum(results),
+        }
+        if jobs:
+            logger.info(
+                "Pre-warmed %d of %d fund entries in %dms",
+                self._last_run["refreshed"], len(jobs), self._last_run["durationMs"],
+            )
+        return self._last_run
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Scheduler state and per-ticker freshness, for /health
+        """
+        now = time.time()
+        tickers: Dict[str, Dict[str, Any]] = {}
+        fresh = 0
+        for (ticker, kind), state in self._state.items():
+            is_fresh = state["expiresAt"] is not None and now < state["expiresAt"]
+            fresh += is_fresh
+            entry = {
+                "fresh": is_fresh,
+                "refreshedAt": _iso(state["refreshedAt"]),
+                "ageSeconds": round(now - state["refreshedAt"]) if state["refreshedAt"] else None,
+                "nextRefreshAt": _iso(state["dueAt"]),
+                "count": state["count"],
+            }
+            if state["error"]:
+                entry["error"] = state["error"]
+            tickers.setdefault(ticker, {})[kind] = entry
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "concurrency": self.concurrency,
+            "ratePerSecond": self.rate_per_second,
+            "fresh": fresh,
+            "total": len(self._state),
+            "runs": self._runs,
+            "lastRun": self._last_run,
+            "nextRunAt": _iso(self._next_run),
+            "tickers": tickers,
+        }
+
+    # --- internals ---
+
+    async def _loop(self) -> None:
+        if await mstarpy_lib.get_async() is None:
+            logger.info("mstarpy not available; fund pre-warming disabled")
+            return
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.exception("Fund pre-warm run failed: %s", e)
+            delay = min(PREWARM_MAX_SLEEP_SECONDS, max(1.0, min(s["dueAt"] for s in self._state.values()) - time.time()))
+            self._next_run = time.time() + delay
+            await asyncio.sleep(delay)
+
+    async def _refresh(self, ticker: str, kind: str) -> bool:
+        state = self._state[(ticker, kind)]
+        try:
+            count = await upstream_pool.run(self._refreshers[kind], ticker)
+            if not count:
+                raise ValueError(f"No {kind} data returned")
+        except Exception as e:
+            logger.warning("Pre-warm of %s %s failed: %s", ticker, kind, e)
+            state["error"] = str(e) or type(e).__name__
+            state["dueAt"] = time.time() + PREWARM_RETRY_SECONDS
+            return False
+
+        now = time.time()
+        if kind == "nav":
+            ttl = seconds_until_nav_publish()
+            due = now + ttl + PREWARM_DELAY_SECONDS
+        else:
+            ttl = HOLDINGS_TTL_SECONDS
+            due = now + max(ttl - PREWARM_LEAD_SECONDS, PREWARM_RETRY_SECONDS)
+        state.update({"refreshedAt": now, "expiresAt": now + ttl, "dueAt": due, "count": count, "error": None})
+        return True
+
+
+fund_prewarmer = FundPrewarmer(PREWARM_TICKERS, PREWARM_CONCURRENCY, PREWARM_RATE_PER_SECOND)
+
+
+def get_prewarm_stats() -> Dict[str, Any]:
+    return fund_prewarmer.stats()
@@ -1,13 +1,188 @@
 from datetime import datetime, timedelta, date
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Callable, Iterator, Tuple
+from collections import OrderedDict
+import asyncio
+import os
+import signal
+import threading
+import time
+
+from caching import TieredCache, SingleFlight
+from nav_store import NavHistoryStore, NAV_STORE_DB_PATH, every_nth, resample_ohlc
+from upstream_pool import upstream_pool, UpstreamPoolError, UpstreamTimeoutError
+from fund_analytics import compute_analytics, to_arrays
+from subsystems import LazySubsystem
+from observability import get_logger, track_upstream
+from resilience import UpstreamGuard, CircuitOpenError
+from workers import coordinator
+
+logger = get_logger("fund_service")
 
-# Optional import - only use if mstarpy is installed
 try:
-    import mstarpy as ms
-    MSTARPY_AVAILABLE = True
-except ImportError:
-    MSTARPY_AVAILABLE = False
-    print("Warning: mstarpy not installed. Fund data features will be unavailable.")
+    from zoneinfo import ZoneInfo
+    MARKET_TZ = ZoneInfo("America/New_York")
+except Exception:
+    # tzdata missing (e.g. bare Windows installs) - fall back to EST
+    from datetime import timezone
+    MARKET_TZ = timezone(timedelta(hours=-5))
+
+def _load_mstarpy():
+    # Optional dependency, and slow to import (pandas, requests), so it's
+    # loaded on first use or by the startup task rather than at import.
+    # mstarpy.utils registers a SIGTERM handler at import time, which fails off
+    # the main thread and would replace the server's own shutdown handler, so
+    # signal registration is skipped while it imports.
+    register_signal = signal.signal
+    signal.signal = lambda signalnum, handler: signal.getsignal(signalnum)
+    try:
+        import mstarpy
+    except ImportError:
+        logger.warning("mstarpy not installed. Fund data features will be unavailable.")
+        raise
+    finally:
+        signal.signal = register_signal
+    return mstarpy
+
+
+mstarpy_lib = LazySubsystem("mstarpy", _load_mstarpy)
+
+# === Fund data cache ===
+
+# Funds publish the day's NAV a couple of hours after the 4pm ET close, so
+# NAV-derived entries stay fresh until the next publish time.
+NAV_PUBLISH_HOUR_ET = int(os.getenv("NAV_PUBLISH_HOUR_ET", "18"))
+# Holdings are only reported monthly/quarterly; half a day is plenty fresh
+HOLDINGS_TTL_SECONDS = int(os.getenv("HOLDINGS_TTL_SECONDS", str(12 * 3600)))
+# How long past expiry an entry may still be served while it is refreshed
+FUND_CACHE_STALE_SECONDS = int(os.getenv("FUND_CACHE_STALE_SECONDS", str(3 * 86400)))
+FUND_CACHE_MAX_ENTRIES = int(os.getenv("FUND_CACHE_MAX_ENTRIES", "256"))
+# Optional SQLite file for the on-disk tier; leave unset to keep the cache in memory only
+FUND_CACHE_DB_PATH = os.getenv("FUND_CACHE_DB_PATH")
+
+
+def seconds_until_nav_publish(now: Optional[datetime] = None) -> float:
+    """
+    Seconds until the next weekday NAV publish time in US/Eastern
+    """
+    now = now or datetime.now(MARKET_TZ)
+    publish = now.replace(hour=NAV_PUBLISH_HOUR_ET, minute=0, second=0, microsecond=0)
+    if now >= publish:
+        publish += timedelta(days=1)
+    # No new NAVs over the weekend
+    while publish.weekday() >= 5:
+        publish += timedelta(days=1)
+    return (publish - now).total_seconds()
+
+
+def _ttl_for_kind(kind: str) -> float:
+    """
+    Time-to-live in seconds for a cache entry of the given kind ("nav", "holdings", ...)
+    """
+    if kind == "holdings":
+        return HOLDINGS_TTL_SECONDS
+    return seconds_until_nav_publish()
+
+
+# === Shared fund handles ===
+
+# Building mstarpy.Funds runs a Morningstar search to resolve the ticker to a
+# security ID, so one handle per ticker is reused by every operation
+FUNDS_HANDLE_TTL_SECONDS = int(os.getenv("FUNDS_HANDLE_TTL_SECONDS", str(24 * 3600)))
+FUNDS_HANDLE_MAX_ENTRIES = 128
+
+FUND_INFO_NAV_DAYS = 30
+FUND_INFO_HOLDINGS_LIMIT = 10
+
+# Batch lookups: tickers per request and how many are fetched at once
+FUND_BATCH_MAX_TICKERS = int(os.getenv("FUND_BATCH_MAX_TICKERS", "50"))
+FUND_BATCH_CONCURRENCY = int(os.getenv("FUND_BATCH_CONCURRENCY", "4"))
+FUND_SNAPSHOT_FIELDS = ("name", "description", "expenseRatio", "nav", "totalReturn", "lastUpdated", "historicalNav", "holdings")
+_NAV_FIELDS = {"nav", "totalReturn", "lastUpdated", "historicalNav"}
+
+_funds_handles: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+_funds_handles_lock = threading.Lock()
+
+
+def _get_funds(ticker: str) -> Any:
+    """
+    Get the resolved mstarpy.Funds handle for a ticker, creating it on first use
+
+    Concurrent first uses share a single resolution. Failed resolutions
+    (unknown tickers) raise and are not cached.
+    """
+    now = time.time()
+    with _funds_handles_lock:
+        entry = _funds_handles.get(ticker)
+        if entry is not None and now - entry[1] < FUNDS_HANDLE_TTL_SECONDS:
+            _funds_handles.move_to_end(ticker)
+            return entry[0]
+
+    def resolve():
+        with track_upstream("mstarpy_resolve"):
+            return mstarpy_lib.get().Funds(ticker)
+
+    funds = single_flight.do((ticker, "resolve"), lambda: mstarpy_guard.call(ticker, resolve))
+    with _funds_handles_lock:
+        _funds_handles[ticker] = (funds, now)
+        _funds_handles.move_to_end(ticker)
+        while len(_funds_handles) > FUNDS_HANDLE_MAX_ENTRIES:
+            _funds_handles.popitem(last=False)
+    return funds
+
+
+nav_store = NavHistoryStore(NAV_STORE_DB_PATH)
+
+single_flight = SingleFlight()
+
+# Breaker for Morningstar as a whole plus one per ticker, so an outage (or a
+# ticker it can't resolve) fails fast to stored data instead of timing out
+mstarpy_guard = UpstreamGuard("mstarpy")
+
+fund_cache = TieredCache(
+    max_entries=FUND_CACHE_MAX_ENTRIES,
+    db_path=FUND_CACHE_DB_PATH,
+    stale_seconds=FUND_CACHE_STALE_SECONDS,
+    submit=upstream_pool.try_submit,
+    table="fund_cache",
+    # With several workers, only the leader refreshes stale entries
+    delegate=coordinator.delegate("fund_cache"),
+)
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss/eviction counters for the fund data cache
+    """
+    return fund_cache.stats()
+
+
+def get_coalescing_stats() -> Dict[str, Any]:
+    """
+    Per-key counts of upstream fetches and the callers that shared them
+    """
+    return single_flight.stats()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Load and rejection counters for the upstream worker pool
+    """
+    return upstream_pool.stats()
+
+
+def get_breaker_status() -> Dict[str, Any]:
+    """
+    Morningstar circuit breaker state, including any tickers whose circuit isn't closed
+    """
+    return mstarpy_guard.status()
+
+
+def _log_fetch_failure(what: str, ticker: str, error: Exception) -> None:
+    if isinstance(error, CircuitOpenError):
+        logger.debug("Skipping %s fetch for %s: %s", what, ticker, error)
+    else:
+        logger.error("Error fetching %s for %s: %s", what, ticker, error)
+
 
 def get_fund_nav(ticker: str, days: int = 30) -> List[Dict[str, Any]]:
     """
@@ -20,25 +195,178 @@ def get_fund_nav(ticker: str, days: int = 30) -> List[Dict[str, Any]]:
     Returns:
         List of dictionaries with nav, totalReturn, and date
     """
-    if not MSTARPY_AVAILABLE:
-        print(f"mstarpy not available. Cannot fetch NAV for {ticker}")
-        return []
-    
+    return get_fund_nav_status(ticker, days)[0]
+
+def get_fund_nav_status(ticker: str, days: int = 30) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Like get_fund_nav, but also says whether the points are a stale fallback
+
+    If Morningstar fails or its circuit is open, whatever the NAV history
+    store already holds for the window is returned instead.
+
+    Returns:
+        (NAV points, stale)
+    """
+    if mstarpy_lib.get() is None:
+        logger.warning("mstarpy not available. Cannot fetch NAV for %s", ticker)
+        return [], False
+
     try:
-        funds = ms.Funds(ticker)
-        # mstarpy requires date objects, not datetime objects
-        end_date = date.today()
-        start_date = end_date - timedelta(days=days)
-        
-        print(f"[get_fund_nav] Fetching NAV for {ticker} from {start_date} to {end_date}")
-        nav_data = funds.nav(start_date, end_date)
-        print(f"[get_fund_nav] Successfully fetched {len(nav_data)} NAV points for {ticker}")
-        return nav_data
+        key = (ticker, "nav", days)
+        nav_data = fund_cache.get_or_load(key, _fund_entry_loader(key), _ttl_for_kind("nav"))
+        return nav_data, False
     except Exception as e:
-        print(f"[get_fund_nav] Error fetching NAV for {ticker}: {e}")
-        import traceback
-        traceback.print_exc()
-        return []
+        _log_fetch_failure("NAV", ticker, e)
+        start_date, end_date = _nav_window(days)
+        fallback = nav_store.read(ticker, start_date, end_date)
+        return fallback, bool(fallback)
+
+def _nav_window(days: int) -> Tuple[date, date]:
+    # mstarpy requires date objects, not datetime objects
+    end_date = date.today()
+    return end_date - timedelta(days=days), end_date
+
+def _nav_fetcher(ticker: str) -> Callable[[date, date], List[Dict[str, Any]]]:
+    def fetch_range(range_start: date, range_end: date) -> List[Dict[str, Any]]:
+        funds = _get_funds(ticker)
+
+        def nav():
+            with track_upstream("mstarpy_nav"):
+                return funds.nav(range_start, range_end)
+        return mstarpy_guard.call(ticker, nav)
+    return fetch_range
+
+def _fetch_fund_nav(ticker: str, days: int) -> List[Dict[str, Any]]:
+    """
+    Get NAV history for a fund from the local history store, fetching only
+    the dates it doesn't hold yet from Morningstar (uncached; errors propagate)
+    """
+    start_date, end_date = _nav_window(days)
+    logger.debug("Getting NAV for %s from %s to %s", ticker, start_date, end_date)
+    nav_data = nav_store.get_range(ticker, start_date, end_date, _nav_fetcher(ticker))
+    logger.debug("Got %d NAV points for %s", len(nav_data), ticker)
+    return nav_data
+
+def fill_fund_nav_history(ticker: str, days: int) -> bool:
+    """
+    Make sure the NAV history store holds the last `days` days for a fund
+
+    Upstream errors are logged; whatever is already stored can still be served.
+
+    Returns:
+        True if the window was filled (now or since the last NAV publish),
+        False if Morningstar failed or mstarpy isn't available
+    """
+    if mstarpy_lib.get() is None:
+        return False
+
+    # The store always re-checks the days since the last published NAV, so
+    # gate fills through the cache to hit upstream at most once per NAV publish
+    key = (ticker, "navfill", days)
+    return bool(fund_cache.get_or_load(key, _fund_entry_loader(key), _ttl_for_kind("nav")))
+
+def _fill_nav_history(ticker: str, days: int) -> bool:
+    start_date, end_date = _nav_window(days)
+    try:
+        nav_store.fill(ticker, start_date, end_date, _nav_fetcher(ticker))
+        return True
+    except Exception as e:
+        _log_fetch_failure("NAV history", ticker, e)
+        return False
+
+def refresh_fund_nav(ticker: str, days: int = FUND_INFO_NAV_DAYS) -> int:
+    """
+    Fetch a fund's NAV window from upstream and replace its cache entry
+
+    Unlike get_fund_nav this always goes upstream, even if the entry is fresh;
+    used by the pre-warmer. Errors propagate.
+
+    Returns:
+        Number of NAV points cached
+    """
+    key = (ticker, "nav", days)
+    nav_data = single_flight.do(key, lambda: _fetch_fund_nav(ticker, days))
+    if nav_data:
+        fund_cache.set(key, nav_data, _ttl_for_kind("nav"))
+    return len(nav_data)
+
+def refresh_fund_holdings(ticker: str, limit: int = FUND_INFO_HOLDINGS_LIMIT) -> int:
+    """
+    Fetch a fund's top holdings from upstream and replace its cache entry (see refresh_fund_nav)
+
+    Returns:
+        Number of holdings cached
+    """
+    key = (ticker, "holdings", limit)
+    holdings = single_flight.do(key, lambda: _fetch_fund_holdings(ticker, limit))
+    if holdings:
+        fund_cache.set(key, holdings, _ttl_for_kind("holdings"))
+    return len(holdings)
+
+def get_fund_analytics(tickers: List[str], days: int = 365, risk_free_rate: float = 0.0, filled: bool = True) -> Dict[str, Any]:
+    """
+    Return/risk analytics and the return correlation matrix for a set of funds
+
+    Results are cached per (ticker set, window) until the next NAV publish,
+    unless a ticker has an error or some NAV history couldn't be filled: those
+    are recomputed on every call, so a brief Morningstar outage doesn't pin
+    them until the next publish. NAV history should already be filled (see
+    get_fund_analytics_async).
+
+    Args:
+        tickers: Fund ticker symbols (already normalized and de-duplicated)
+        days: Number of days of history to analyze
+        risk_free_rate: Annual risk-free rate for Sharpe/Sortino
+        filled: False if filling any ticker's NAV history failed
+
+    Returns:
+        Dictionary with per-ticker metrics and a correlation matrix
+    """
+    key = (",".join(sorted(tickers)), "analytics", f"{days}:{risk_free_rate}")
+    if filled:
+        result = fund_cache.get_or_load(key, _fund_entry_loader(key), _ttl_for_kind("nav"))
+    else:
+        result = fund_cache.get(key)
+    if result:
+        return result
+    return _compute_analytics(tickers, days, risk_free_rate)
+
+def _compute_analytics(tickers: List[str], days: int, risk_free_rate: float) -> Dict[str, Any]:
+    start_date, end_date = _nav_window(days)
+    series = {t: to_arrays(*nav_store.read_columns(t, start_date, end_date)) for t in tickers}
+    result = compute_analytics(series, risk_free_rate)
+    result.update({"days": days, "riskFreeRate": risk_free_rate})
+    return result
+
+def _cacheable_analytics(tickers: List[str], days: int, risk_free_rate: float) -> Optional[Dict[str, Any]]:
+    # None (not cached) if any ticker lacks history, e.g. after a failed fill
+    result = _compute_analytics(tickers, days, risk_free_rate)
+    if any("error" in metrics for metrics in result["tickers"].values()):
+        return None
+    return result
+
+def iter_fund_nav(ticker: str, days: int, every: int = 1, period: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream stored NAV points for the last `days` days, optionally downsampled
+
+    Reads from the NAV history store only; call fill_fund_nav_history first.
+
+    Args:
+        ticker: Fund ticker symbol
+        days: Number of days of history
+        every: Keep every Nth point (1 keeps all)
+        period: "week" or "month" to emit one OHLC bar per period instead of points
+
+    Returns:
+        Iterator of NAV point (or OHLC bar) dictionaries, oldest first
+    """
+    start_date, end_date = _nav_window(days)
+    points = nav_store.iter_range(ticker, start_date, end_date)
+    if period:
+        points = resample_ohlc(points, period)
+    if every > 1:
+        points = every_nth(points, every)
+    return points
 
 def get_fund_holdings(ticker: str, limit: int = 10) -> List[Dict[str, Any]]:
     """
@@ -51,29 +379,92 @@ def get_fund_holdings(ticker: str, limit: int = 10) -> List[Dict[str, Any]]:
     Returns:
         List of dictionaries with ticker, securityName, weighting, and marketValue
     """
-    if not MSTARPY_AVAILABLE:
-        print(f"mstarpy not available. Cannot fetch holdings for {ticker}")
-        return []
-    
+    return get_fund_holdings_status(ticker, limit)[0]
+
+def get_fund_holdings_status(ticker: str, limit: int = 10) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Like get_fund_holdings, but also says whether the holdings are a stale fallback
+
+    If Morningstar fails or its circuit is open, the last holdings fetched
+    for the fund are returned instead, however old.
+
+    Returns:
+        (holdings, stale)
+    """
+    if mstarpy_lib.get() is None:
+        logger.warning("mstarpy not available. Cannot fetch holdings for %s", ticker)
+        return [], False
+
+    key = (ticker, "holdings", limit)
     try:
-        funds = ms.Funds(ticker)
-        holdings = funds.holdings()
-        
-        # Convert to list of dictionaries and limit results
-        if isinstance(holdings, list):
-            return holdings[:limit]
-        elif hasattr(holdings, 'to_dict'):
-            # If it's a pandas DataFrame
-            return holdings.head(limit).to_dict('records')
-        else:
-            return []
+        holdings = fund_cache.get_or_load(key, _fund_entry_loader(key), _ttl_for_kind("holdings"))
+        return holdings, False
     except Exception as e:
-        print(f"Error fetching holdings for {ticker}: {e}")
+        _log_fetch_failure("holdings", ticker, e)
+        fallback = fund_cache.peek(key)
+        return (fallback, True) if fallback else ([], False)
+
+def _fetch_fund_holdings(ticker: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    Fetch top holdings for a fund straight from Morningstar (uncached; errors propagate)
+    """
+    funds = _get_funds(ticker)
+
+    def holdings():
+        with track_upstream("mstarpy_holdings"):
+            return funds.holdings()
+    holdings = mstarpy_guard.call(ticker, holdings)
+
+    # Convert to list of dictionaries and limit results
+    if isinstance(holdings, list):
+        return holdings[:limit]
+    elif hasattr(holdings, 'to_dict'):
+        # If it's a pandas DataFrame
+        return holdings.head(limit).to_dict('records')
+    else:
         return []
 
+def _fund_entry_loader(key: Tuple) -> Callable[[], Any]:
+    """
+    The (coalesced) loader for a fund cache key: (ticker, kind, window)
+    """
+    subject, kind, window = key
+    if kind == "nav":
+        load = lambda: _fetch_fund_nav(subject, int(window))
+    elif kind == "holdings":
+        load = lambda: _fetch_fund_holdings(subject, int(window))
+    elif kind == "navfill":
+        load = lambda: _fill_nav_history(subject, int(window))
+    elif kind == "analytics":
+        days, risk_free_rate = str(window).split(":")
+        load = lambda: _cacheable_analytics(subject.split(","), int(days), float(risk_free_rate))
+    else:
+        raise ValueError(f"Unknown fund cache entry kind: {kind}")
+    return lambda: single_flight.do(tuple(key), load)
+
+def _refresh_fund_entry(key: Tuple) -> None:
+    # Refreshes other workers handed to this one (the leader)
+    fund_cache.refresh(key, _fund_entry_loader(key), _ttl_for_kind(key[1]))
+
+coordinator.register("fund_cache", _refresh_fund_entry)
+
+def _unavailable_fund_info(ticker: str, error: str) -> Dict[str, Any]:
+    return {
+        "ticker": ticker,
+        "nav": None,
+        "totalReturn": None,
+        "lastUpdated": None,
+        "historicalNav": [],
+        "holdings": [],
+        "error": error
+    }
+
 def get_fund_info(ticker: str) -> Dict[str, Any]:
     """
     Get comprehensive fund information including NAV and holdings
+
+    This synchronous version fetches NAV and holdings one after the other;
+    get_fund_info_async fetches them in parallel.
     
     Args:
         ticker: Fund ticker symbol
@@ -81,57 +472,178 @@ def get_fund_info(ticker: str) -> Dict[str, Any]:
     Returns:
         Dictionary with fund information
     """
-    if not MSTARPY_AVAILABLE:
-        print(f"mstarpy not available. Cannot fetch fund info for {ticker}")
-        return {
-            "ticker": ticker,
-            "nav": None,
-            "totalReturn": None,
-            "lastUpdated": None,
-            "historicalNav": [],
-            "holdings": [],
-            "error": "mstarpy not installed"
-        }
-    
+    if mstarpy_lib.get() is None:
+        logger.warning("mstarpy not available. Cannot fetch fund info for %s", ticker)
+        return _unavailable_fund_info(ticker, "mstarpy not installed")
+
+    # Concurrent page loads for the same fund share one build
+    return single_flight.do((ticker, "info"), lambda: _build_fund_info(ticker))
+
+def _build_fund_info(ticker: str) -> Dict[str, Any]:
     try:
-        print(f"[get_fund_info] Starting fetch for {ticker}")
-        funds = ms.Funds(ticker)
-        
-        # Get recent NAV data (last 30 days) - limit to avoid timeouts
-        print(f"[get_fund_info] Fetching NAV data...")
-        nav_data = get_fund_nav(ticker, days=30)
-        
-        # Get top holdings
-        print(f"[get_fund_info] Fetching holdings...")
-        holdings = get_fund_holdings(ticker, limit=10)
-        
-        # Get latest NAV
-        latest_nav = nav_data[-1] if nav_data else None
-        
-        print(f"[get_fund_info] Successfully fetched data for {ticker}: {len(nav_data)} NAV points, {len(holdings)} holdings")
-        
-        return {
-            "ticker": ticker,
-            "name": None,  # Will be filled from frontend mock data
-            "description": None,  # mstarpy doesn't provide this easily
-            "expenseRatio": None,  # mstarpy doesn't provide this easily
-            "nav": latest_nav["nav"] if latest_nav else None,
-            "totalReturn": latest_nav["totalReturn"] if latest_nav else None,
-            "lastUpdated": latest_nav["date"] if latest_nav else None,
-            "historicalNav": nav_data,
-            "holdings": holdings,
-        }
+        logger.debug("Starting fetch for %s", ticker)
+        nav_data, nav_stale = get_fund_nav_status(ticker, days=FUND_INFO_NAV_DAYS)
+        holdings, holdings_stale = get_fund_holdings_status(ticker, limit=FUND_INFO_HOLDINGS_LIMIT)
+        return _assemble_fund_info(ticker, nav_data, holdings, nav_stale or holdings_stale)
     except Exception as e:
-        print(f"[get_fund_info] Error fetching fund info for {ticker}: {e}")
-        import traceback
-        traceback.print_exc()
-        return {
-            "ticker": ticker,
-            "nav": None,
-            "totalReturn": None,
-            "lastUpdated": None,
-            "historicalNav": [],
-            "holdings": [],
-            "error": str(e)
-        }
+        logger.exception("Error fetching fund info for %s: %s", ticker, e)
+        return _unavailable_fund_info(ticker, str(e))
+
+def _assemble_fund_info(ticker: str, nav_data: List[Dict[str, Any]], holdings: List[Dict[str, Any]], stale: bool = False) -> Dict[str, Any]:
+    # Get latest NAV
+    latest_nav = nav_data[-1] if nav_data else None
+
+    logger.debug("Fetched data for %s: %d NAV points, %d holdings", ticker, len(nav_data), len(holdings))
+
+    info = {
+        "ticker": ticker,
+        "name": None,  # Will be filled from frontend mock data
+        "description": None,  # mstarpy doesn't provide this easily
+        "expenseRatio": None,  # mstarpy doesn't provide this easily
+        "nav": latest_nav["nav"] if latest_nav else None,
+        "totalReturn": latest_nav["totalReturn"] if latest_nav else None,
+        "lastUpdated": latest_nav["date"] if latest_nav else None,
+        "historicalNav": nav_data,
+        "holdings": holdings,
+    }
+    if stale:
+        # Morningstar couldn't be reached; some of this is last-known-good data
+        info["stale"] = True
+    return info
+
+# === Async entry points ===
+# mstarpy is blocking network code; these run the lookups on the bounded
+# upstream pool so the event loop stays free. They raise PoolSaturatedError
+# or UpstreamTimeoutError from upstream_pool instead of queueing without limit,
+# except the *_status ones, which fall back to stored data when there is some.
+
+async def get_fund_info_async(ticker: str) -> Dict[str, Any]:
+    if await mstarpy_lib.get_async() is None:
+        return get_fund_info(ticker)
+
+    # NAV and holdings run side by side on the pool, so a page load costs the
+    # slower of the two calls rather than their sum
+    logger.debug("Starting fetch for %s", ticker)
+    (nav_data, nav_stale), (holdings, holdings_stale) = await asyncio.gather(
+        get_fund_nav_status_async(ticker, FUND_INFO_NAV_DAYS),
+        get_fund_holdings_status_async(ticker, FUND_INFO_HOLDINGS_LIMIT),
+    )
+    return _assemble_fund_info(ticker, nav_data, holdings, nav_stale or holdings_stale)
+
+def _pool_failure(what: str, ticker: str, error: UpstreamPoolError) -> None:
+    # mstarpy sets no request timeout, so the pool's timeout is the only sign
+    # of a hung Morningstar; count it against the breakers like any timeout
+    if isinstance(error, UpstreamTimeoutError):
+        mstarpy_guard.record_timeout(ticker)
+    logger.warning("%s fetch for %s didn't finish: %s", what, ticker, error)
+
+async def get_fund_nav_async(ticker: str, days: int = 30) -> List[Dict[str, Any]]:
+    return (await get_fund_nav_status_async(ticker, days))[0]
+
+async def get_fund_nav_status_async(ticker: str, days: int = 30) -> Tuple[List[Dict[str, Any]], bool]:
+    try:
+        return await upstream_pool.run(get_fund_nav_status, ticker, days)
+    except UpstreamPoolError as e:
+        _pool_failure("NAV", ticker, e)
+        fallback = nav_store.read(ticker, *_nav_window(days))
+        if not fallback:
+            raise
+        return fallback, True
+
+async def get_fund_holdings_async(ticker: str, limit: int = 10) -> List[Dict[str, Any]]:
+    return (await get_fund_holdings_status_async(ticker, limit))[0]
+
+async def get_fund_holdings_status_async(ticker: str, limit: int = 10) -> Tuple[List[Dict[str, Any]], bool]:
+    try:
+        return await upstream_pool.run(get_fund_holdings_status, ticker, limit)
+    except UpstreamPoolError as e:
+        _pool_failure("Holdings", ticker, e)
+        fallback = fund_cache.peek((ticker, "holdings", limit))
+        if not fallback:
+            raise
+        return fallback, True
+
+async def fill_fund_nav_history_async(ticker: str, days: int) -> bool:
+    return await upstream_pool.run(fill_fund_nav_history, ticker, days)
+
+async def get_funds_batch_async(tickers: List[str], fields: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Get snapshots for several funds in one call
+
+    Duplicate tickers are fetched once and at most FUND_BATCH_CONCURRENCY
+    lookups run at a time. A ticker that fails gets an "error" entry rather
+    than failing the whole batch. Only the upstream data needed for `fields`
+    is fetched (e.g. asking for just "nav" skips holdings).
+
+    Args:
+        tickers: Fund ticker symbols (case-insensitive)
+        fields: Snapshot fields to return (see FUND_SNAPSHOT_FIELDS); None for all
+
+    Returns:
+        Dictionary of ticker -> fund snapshot, in request order
+
+    Raises:
+        ValueError: if the batch is too large or asks for unknown fields
+    """
+    unique_tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    if len(unique_tickers) > FUND_BATCH_MAX_TICKERS:
+        raise ValueError(f"At most {FUND_BATCH_MAX_TICKERS} tickers per batch")
+    wanted = set(fields) if fields else None
+    if wanted is not None:
+        unknown = wanted - set(FUND_SNAPSHOT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    semaphore = asyncio.Semaphore(FUND_BATCH_CONCURRENCY)
+
+    async def snapshot(ticker: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                if await mstarpy_lib.get_async() is None:
+                    info = get_fund_info(ticker)
+                else:
+                    need_nav = wanted is None or bool(wanted & _NAV_FIELDS)
+                    need_holdings = wanted is None or "holdings" in wanted
+                    (nav_data, nav_stale), (holdings, holdings_stale) = await asyncio.gather(
+                        get_fund_nav_status_async(ticker, FUND_INFO_NAV_DAYS) if need_nav else _no_data(),
+                        get_fund_holdings_status_async(ticker, FUND_INFO_HOLDINGS_LIMIT) if need_holdings else _no_data(),
+                    )
+                    info = _assemble_fund_info(ticker, nav_data, holdings, nav_stale or holdings_stale)
+                    if not nav_data and not holdings:
+                        # Upstream errors are logged and fall back to stored data, if any
+                        info["error"] = f"No fund data available for {ticker}"
+            except Exception as e:
+                logger.error("Batch fetch failed for %s: %s", ticker, e)
+                return {"ticker": ticker, "error": str(e)}
+        if wanted is not None:
+            info = {k: v for k, v in info.items() if k in wanted or k in ("ticker", "error", "stale")}
+        return info
+
+    results = await asyncio.gather(*(snapshot(t) for t in unique_tickers))
+    return dict(zip(unique_tickers, results))
+
+async def get_fund_analytics_async(tickers: List[str], days: int = 365, risk_free_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Fill NAV history for every ticker (at most FUND_BATCH_CONCURRENCY at a
+    time) and then compute analytics on the upstream pool
+
+    Raises:
+        ValueError: if more than FUND_BATCH_MAX_TICKERS tickers are given
+    """
+    unique_tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    if not unique_tickers:
+        raise ValueError("At least one ticker is required")
+    if len(unique_tickers) > FUND_BATCH_MAX_TICKERS:
+        raise ValueError(f"At most {FUND_BATCH_MAX_TICKERS} tickers per request")
+
+    semaphore = asyncio.Semaphore(FUND_BATCH_CONCURRENCY)
+
+    async def fill(ticker: str) -> bool:
+        async with semaphore:
+            return await fill_fund_nav_history_async(ticker, days)
+
+    filled = await asyncio.gather(*(fill(t) for t in unique_tickers))
+    return await upstream_pool.run(get_fund_analytics, unique_tickers, days, risk_free_rate, all(filled))
 
+async def _no_data() -> Tuple[List[Any], bool]:
+    return [], False
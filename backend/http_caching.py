@@ -0,0 +1,90 @@
+from typing import Optional, Dict, List, Any, Tuple
+import hashlib
+import json
+import os
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Longest a browser or CDN may reuse a fund response without revalidating
+FUND_HTTP_MAX_AGE_SECONDS = int(os.getenv("FUND_HTTP_MAX_AGE_SECONDS", str(6 * 3600)))
+# How long past max-age a cached response may be served while it revalidates
+FUND_HTTP_STALE_SECONDS = int(os.getenv("FUND_HTTP_STALE_SECONDS", "3600"))
+# max-age for last-known-good (stale: true) data, so clients come back for fresh data soon
+FUND_HTTP_STALE_DATA_MAX_AGE_SECONDS = 60
+
+
+def fingerprint(value: Any) -> str:
+    """
+    Short stable hash of a JSON-serializable value (e.g. a holdings list)
+    """
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def nav_version(nav_data: List[Dict[str, Any]]) -> str:
+    """
+    Version of a NAV series: its last date and length (new NAVs only ever append)
+    """
+    if not nav_data:
+        return "none"
+    return f"{nav_data[-1].get('date', '')[:10]}.{len(nav_data)}"
+
+
+def make_etag(request: Request, *versions: str) -> str:
+    """
+    Weak ETag for a response built from data at `versions`
+
+    The path and query are included so each window/format/downsampling has
+    its own tag; weak because gzip and identity bodies share it.
+    """
+    variant = f"{request.url.path}?{request.url.query}|{request.headers.get('accept', '')}"
+    digest = hashlib.blake2b("|".join((variant,) + versions).encode("utf-8"), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def cache_headers(etag: str, max_age: float, stale: bool = False) -> Dict[str, str]:
+    """
+    ETag, Cache-Control and Vary headers for a public fund response
+
+    Args:
+        etag: From make_etag
+        max_age: Seconds until the underlying data can change
+        stale: The data is a last-known-good fallback
+    """
+    if stale:
+        max_age = FUND_HTTP_STALE_DATA_MAX_AGE_SECONDS
+    max_age = int(max(0, min(max_age, FUND_HTTP_MAX_AGE_SECONDS)))
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={FUND_HTTP_STALE_SECONDS}",
+        "Vary": "Accept, Accept-Encoding",
+    }
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """
+    True if the request's If-None-Match matches `etag` (weak comparison)
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def conditional(request: Request, etag: str, max_age: float, stale: bool = False) -> Tuple[Dict[str, str], Optional[Response]]:
+    """
+    The caching headers for a response, plus a 304 to send instead if the client's copy is current
+
+    Returns:
+        (headers, 304 response or None)
+    """
+    headers = cache_headers(etag, max_age, stale)
+    return headers, (not_modified(headers) if if_none_match(request, etag) else None)
@@ -1,24 +1,66 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import google.generativeai as genai
+from typing import List, Optional
 import os
 from dotenv import load_dotenv
+import asyncio
 import json
-from firebase_service import save_quiz_result
-from fund_service import get_fund_info, get_fund_nav, get_fund_holdings
-
-# Import MSTARPY_AVAILABLE for startup check
-try:
-    from fund_service import MSTARPY_AVAILABLE
-except ImportError:
-    MSTARPY_AVAILABLE = False
+import math
+from firebase_service import (
+    save_quiz_result,
+    get_user_quiz_results,
+    get_latest_quiz_result,
+    iter_quiz_result_scores,
+    flush_quiz_results,
+    get_write_stats,
+    WriteQueueFullError,
+)
+from fund_service import (
+    get_fund_info_async,
+    get_fund_nav_status_async,
+    get_fund_holdings_status_async,
+    get_funds_batch_async,
+    fill_fund_nav_history_async,
+    get_fund_analytics_async,
+    iter_fund_nav,
+    get_cache_stats,
+    get_coalescing_stats,
+    get_pool_stats,
+    get_breaker_status,
+    seconds_until_nav_publish,
+    mstarpy_lib,
+    HOLDINGS_TTL_SECONDS,
+)
+from upstream_pool import upstream_pool, UpstreamPoolError, PoolSaturatedError
+from nav_store import every_nth, resample_ohlc, RESAMPLE_PERIODS
+from http_caching import conditional, make_etag, nav_version, fingerprint
+from nav_encoding import negotiate_format, encoded_response, nav_payload, pack_nav_series, to_columns
+from report_service import generate_report, stream_report, get_report_cache_stats, get_gemini_breaker_status, gemini_lib
+from report_templates import report_templates
+from firebase_config import firebase
+from subsystems import start_all, readiness
+from resilience import CircuitOpenError
+from fund_prewarmer import fund_prewarmer, get_prewarm_stats, PREWARM_ENABLED
+from rate_limit import rate_limiter, RateLimitMiddleware, get_rate_limit_stats, get_quota_status, RATE_LIMIT_ENABLED
+from workers import coordinator
+from match_service import match_index, load_match_index, find_matches
+from quiz_scoring import get_scorer, quiz_table, QuizValidationError, QuizTableError, AXES
+from observability import get_logger, registry, render_metrics, Gauge, MetricsMiddleware
 
 load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+
+logger = get_logger("main")
+
+# Slow-to-import clients, loaded in the background after the port is bound
+SUBSYSTEMS = [firebase, mstarpy_lib, gemini_lib]
 
 app = FastAPI(title="Financial Personality Quiz API")
 
+# Per-client token buckets on the fund and report routes; inside CORS so 429s are readable by the browser
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, router=app.router, limiter=rate_limiter)
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -26,15 +68,76 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Binary NAV responses carry their stale flag in a header
+    expose_headers=["X-Stale", "ETag"],
 )
+# Outermost, so it times everything including CORS and error handlers
+app.add_middleware(MetricsMiddleware, router=app.router)
+
+# Queue depths read at scrape time
+registry.register(Gauge(
+    "upstream_pool_pending", "Upstream calls running or waiting for a worker",
+    collect=lambda: {(): get_pool_stats()["pending"]},
+))
+registry.register(Gauge(
+    "quiz_write_queue_pending", "Quiz results waiting to be committed to Firestore",
+    collect=lambda: {(): get_write_stats().get("pending", 0)},
+))
+
+@app.exception_handler(UpstreamPoolError)
+async def upstream_pool_error_handler(request: Request, exc: UpstreamPoolError):
+    """Saturated pool -> 503 so clients back off; timed out call -> 504"""
+    if isinstance(exc, PoolSaturatedError):
+        return JSONResponse(status_code=503, content={"error": str(exc)}, headers={"Retry-After": "1"})
+    return JSONResponse(status_code=504, content={"error": str(exc)})
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """Upstream circuit open and nothing cached to fall back to -> 503 until the next trial"""
+    return JSONResponse(status_code=503, content={"error": str(exc)}, headers={"Retry-After": str(math.ceil(exc.retry_after))})
+
+@app.exception_handler(WriteQueueFullError)
+async def write_queue_full_handler(request: Request, exc: WriteQueueFullError):
+    """Firestore can't keep up -> 503 so clients retry later"""
+    return JSONResponse(status_code=503, content={"success": False, "error": str(exc)}, headers={"Retry-After": "1"})
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await fund_prewarmer.stop()
+    await coordinator.stop()
+    upstream_pool.shutdown(wait=False)
+    # Commit queued quiz results before the process exits
+    await asyncio.get_running_loop().run_in_executor(None, flush_quiz_results)
 
 @app.on_event("startup")
 async def startup_event():
-    print("=" * 50)
-    print("Backend server starting up...")
-    print(f"Gemini API configured: {bool(os.getenv('GEMINI_API_KEY'))}")
-    print(f"mstarpy available: {MSTARPY_AVAILABLE if 'MSTARPY_AVAILABLE' in globals() else 'Checking...'}")
-    print("=" * 50)
+    logger.info(
+        "Backend server starting up (Gemini API configured: %s); loading Firebase, "
+        "mstarpy and Gemini in the background (see /health)",
+        bool(os.getenv("GEMINI_API_KEY")),
+    )
+    start_all(SUBSYSTEMS)
+    # Build the match index in the background; new results are indexed as they're saved
+    asyncio.get_running_loop().run_in_executor(None, _load_match_index)
+    # Read the quiz question table now so a missing one shows up in the log at startup
+    asyncio.get_running_loop().run_in_executor(None, _load_quiz_table)
+    # Report templates (the fallback when Gemini is slow or down) load in the background too
+    asyncio.get_running_loop().run_in_executor(None, report_templates.load)
+    # Keep the catalog ETFs' NAV and holdings cached (refreshed after each NAV
+    # publish); with several workers only the leader does this
+    if PREWARM_ENABLED:
+        coordinator.on_elected(fund_prewarmer.start)
+    coordinator.start()
+
+def _load_quiz_table():
+    try:
+        quiz_table()
+    except QuizTableError as e:
+        logger.error("%s; /save_quiz_result will return 503 until it's fixed", e)
+
+def _load_match_index():
+    count = load_match_index(iter_quiz_result_scores())
+    logger.info("Match index loaded %d users from stored quiz results (%d indexed)", count, len(match_index))
 
 # === Models ===
 
@@ -58,188 +161,88 @@ class InvestorReportRequest(BaseModel):
 class QuizResultRequest(BaseModel):
     userId: str
     role: str
-    quizAnswers: list
+    quizAnswers: List[dict]  # [{"questionIndex", "value"}, ...]
     personalityScores: PersonalityScores
     personalityType: PersonalityType
 
+class FundBatchRequest(BaseModel):
+    tickers: List[str]
+    fields: Optional[List[str]] = None
+
 # === Endpoint ===
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    subsystems = readiness(SUBSYSTEMS)
     return {
         "status": "ok",
-        "gemini_configured": bool(os.getenv("GEMINI_API_KEY"))
+        # False while any subsystem is still loading; unavailable ones don't block readiness
+        "ready": all(s["state"] not in ("not_loaded", "loading") for s in subsystems.values()),
+        "subsystems": subsystems,
+        "gemini_configured": bool(os.getenv("GEMINI_API_KEY")),
+        "fundCache": get_cache_stats(),
+        "fundCoalescing": get_coalescing_stats(),
+        "upstreamPool": get_pool_stats(),
+        "prewarm": get_prewarm_stats(),
+        "workers": coordinator.status(),
+        "circuitBreakers": {"mstarpy": get_breaker_status(), "gemini": get_gemini_breaker_status()},
+        "rateLimits": get_rate_limit_stats(),
+        "upstreamQuotas": get_quota_status(),
+        "reportCache": get_report_cache_stats(),
+        "matchIndex": match_index.stats(),
+        "quizWrites": get_write_stats(),
     }
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus text-format metrics: per-route and per-upstream latency
+    histograms, error counts and in-flight gauges
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.post("/generate_investor_report")
 async def generate_investor_report(req: InvestorReportRequest):
-    print(f"\n[generate_investor_report] Request received for {req.personality.code}")
-    print(f"[generate_investor_report] Role: {req.role}")
-    
-    # Check if Gemini API key is configured
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    if not gemini_key:
-        print("[generate_investor_report] ERROR: GEMINI_API_KEY not found")
-        return {
-            "error": "Gemini API key not configured",
-            "dimensions": {
-                "timeHorizon": {"dominantLabel": "Long-Term", "description": "AI analysis unavailable - API key not configured."},
-                "riskTolerance": {"dominantLabel": "Low Risk", "description": "AI analysis unavailable - API key not configured."},
-                "complexity": {"dominantLabel": "Simple", "description": "AI analysis unavailable - API key not configured."},
-                "consistency": {"dominantLabel": "Consistent", "description": "AI analysis unavailable - API key not configured."}
-            }
-        }
-    
-    print(f"[generate_investor_report] Gemini API key found, proceeding...")
-
-    p = req.personality
-    s = req.scores
-
-    # Convert raw axis scores (range roughly -15..+15) to 0-100 percentages
-    max_possible = 15  # 5 questions * max 3 points each
-    time_pct = round(((s.shortTermVsLongTerm + max_possible) / (max_possible * 2)) * 100)
-    risk_pct = round(((s.highRiskVsLowRisk + max_possible) / (max_possible * 2)) * 100)
-    complexity_pct = round(((s.clarityVsComplexity + max_possible) / (max_possible * 2)) * 100)
-    strategy_pct = round(((s.consistentVsLumpSum + max_possible) / (max_possible * 2)) * 100)
-
-    prompt = f"""
-Generate a detailed investor personality report based on the following data.
-
-### Personality Code
-{p.code} — {p.name}
-
-### Description
-{p.description}
-
-### Axis Percentages (0-100%):
-- Time Horizon (Short → Long): {time_pct}%
-- Risk Tolerance (Risky → Conservative): {risk_pct}%
-- Complexity Preference (Simple → Complex): {complexity_pct}%
-- Strategy Preference (Gradual → Lump Sum): {strategy_pct}%
-
-### User Role
-{req.role}
-
-### REQUIREMENTS
-Produce thoughtful, complete insights. Each "dimensions" entry MUST include:
-- "dominantLabel": a clear interpretation of the score
-- "description": 3–5 sentences explaining how this trait influences investing
-- "strengths": 2–4 strengths specifically tied to that dimension
-- "weaknesses": 2–4 weaknesses or vulnerabilities
-- "blindSpots": 1–3 potential blind spots or risks caused by that dimension
-
-Descriptions must be specific, behavioral, and investment-focused.
-
-### REQUIRED JSON FORMAT (no markdown):
-
-{{
-  "strengths": [],
-  "weaknesses": [],
-  "strategies": [],
-  "behaviors": [],
-  "advisorTips": [],
-  "dimensions": {{
-    "timeHorizon": {{
-      "dominantLabel": "",
-      "description": "",
-      "strengths": [],
-      "weaknesses": [],
-      "blindSpots": []
-    }},
-    "riskTolerance": {{
-      "dominantLabel": "",
-      "description": "",
-      "strengths": [],
-      "weaknesses": [],
-      "blindSpots": []
-    }},
-    "complexity": {{
-      "dominantLabel": "",
-      "description": "",
-      "strengths": [],
-      "weaknesses": [],
-      "blindSpots": []
-    }},
-    "consistency": {{
-      "dominantLabel": "",
-      "description": "",
-      "strengths": [],
-      "weaknesses": [],
-      "blindSpots": []
-    }}
-  }}
-}}
-
-Return ONLY valid JSON — no notes, no extra text.
-"""
-
-    try:
-        model = genai.GenerativeModel("gemini-2.5-flash-lite")
-        print("[generate_investor_report] Calling Gemini API...")
-        response = model.generate_content(prompt)
-        text = response.text
-        print("[generate_investor_report] Gemini API response received")
-    except Exception as e:
-        print(f"[generate_investor_report] ERROR calling Gemini API: {e}")
-        raise
-
-    # Log the raw model output for debugging
-    print("[generate_investor_report] model output:")
-    print(text)
-
-    # Try strict JSON parse first, then try to recover a JSON substring if the model
-    # returned surrounding commentary or extra tokens.
-    try:
-        return json.loads(text)
-    except Exception:
-        # Attempt to extract the first JSON object from the text by finding
-        # the first '{' and the last '}' and parsing that substring.
-        first = text.find('{')
-        last = text.rfind('}')
-        if first != -1 and last != -1 and last > first:
-            candidate = text[first:last+1]
-            try:
-                return json.loads(candidate)
-            except Exception:
-                pass
-
-    # If recovery failed, return a simple deterministic fallback so the UI
-    # can still show useful content. Also keep the raw model output in the
-    # returned structure under `raw` for debugging.
-    print("[generate_investor_report] JSON parsing failed, returning fallback")
-    def dominant_label_from_pct(pct, labels):
-      return labels[0] if pct < 50 else labels[1]
-
-    fallback = {
-      "strengths": [],
-      "weaknesses": [],
-      "strategies": [],
-      "behaviors": [],
-      "advisorTips": [],
-      "dimensions": {
-        "timeHorizon": {
-          "dominantLabel": dominant_label_from_pct(time_pct, ["Short-Term", "Long-Term"]),
-          "description": f"Your time horizon preference is {time_pct}% toward long-term planning. This suggests you prefer investments that compound over years rather than seeking quick returns. Consider strategies that align with your patient approach to wealth building."
-        },
-        "riskTolerance": {
-          "dominantLabel": dominant_label_from_pct(risk_pct, ["High Risk", "Low Risk"]),
-          "description": f"Your risk tolerance is {risk_pct}% toward conservative strategies. This indicates you value stability and capital preservation. Focus on diversified portfolios that balance growth potential with downside protection."
-        },
-        "complexity": {
-          "dominantLabel": dominant_label_from_pct(complexity_pct, ["Clarity", "Complex"]),
-          "description": f"Your preference for investment complexity is {complexity_pct}% toward simplicity. You likely prefer straightforward, easy-to-understand investment options that don't require deep financial knowledge."
-        },
-        "consistency": {
-          "dominantLabel": dominant_label_from_pct(strategy_pct, ["Consistent Yield", "Lump Sum"]),
-          "description": f"Your investment style preference is {strategy_pct}% toward consistent strategies. You likely prefer regular, predictable returns through steady contributions rather than large one-time investments."
-        }
-      },
-      "raw": text[:500] if text else "No response from AI"
-    }
+    logger.debug("Report requested for %s (%s)", req.personality.code, req.role)
+    return await generate_report(
+        code=req.personality.code,
+        name=req.personality.name,
+        description=req.personality.description,
+        scores=req.scores.model_dump(),
+        role=req.role,
+    )
+
+@app.post("/generate_investor_report/stream")
+async def stream_investor_report(req: InvestorReportRequest):
+    """
+    Server-sent events version of /generate_investor_report
 
-    print("[generate_investor_report] Returning fallback response")
-    return fallback
+    Sends a `section` event ({"key", "value"}) for each top-level section and
+    each dimensions entry as soon as it is complete, then a `done` event with
+    the full report, or an `error` event if generation fails.
+    """
+    logger.debug("Report stream requested for %s (%s)", req.personality.code, req.role)
+
+    async def events():
+        try:
+            async for event, data in stream_report(
+                code=req.personality.code,
+                name=req.personality.name,
+                description=req.personality.description,
+                scores=req.scores.model_dump(),
+                role=req.role,
+            ):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            logger.error("Error streaming report: %s", e)
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # === Quiz Results Endpoint ===
 
@@ -247,76 +250,241 @@ Return ONLY valid JSON — no notes, no extra text.
 async def save_quiz_result_endpoint(req: QuizResultRequest):
     """
     Save quiz results to Firebase
+
+    The answers are scored again here with the shared question table, and
+    those scores are what's saved; answers that don't fit the quiz get a 400.
     """
     try:
-        doc_id = save_quiz_result(
+        scorer = get_scorer(req.role)
+        scored = scorer.score(req.quizAnswers)
+    except QuizValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QuizTableError as e:
+        logger.error("Can't score quiz result for %s: %s", req.userId, e)
+        raise HTTPException(status_code=503, detail="Quiz scoring is unavailable")
+    personality_scores = scored["personalityScores"]
+    personality_type = scored["personalityType"]
+    claimed = req.personalityScores.model_dump()
+    if any(abs(claimed[axis] - personality_scores[axis]) > 1e-6 for axis in AXES):
+        logger.warning(
+            "Quiz result for %s scored %s by the client but %s here; saving the server's scores",
+            req.userId, req.personalityType.code, personality_type["code"],
+        )
+    try:
+        # Usually returns at once; only waits (in a thread) when the write queue is full
+        doc_id = await asyncio.to_thread(
+            save_quiz_result,
             user_id=req.userId,
             role=req.role,
-            quiz_answers=req.quizAnswers,
-            personality_scores={
-                "shortTermVsLongTerm": req.personalityScores.shortTermVsLongTerm,
-                "highRiskVsLowRisk": req.personalityScores.highRiskVsLowRisk,
-                "clarityVsComplexity": req.personalityScores.clarityVsComplexity,
-                "consistentVsLumpSum": req.personalityScores.consistentVsLumpSum,
-            },
-            personality_type={
-                "code": req.personalityType.code,
-                "name": req.personalityType.name,
-                "description": req.personalityType.description,
-                "color": req.personalityType.color,
-            }
+            quiz_answers=scored["answers"],
+            personality_scores=personality_scores,
+            personality_type={key: personality_type[key] for key in ("code", "name", "description", "color")},
+            quiz_version=scorer.version,
         )
         
         if doc_id:
-            return {"success": True, "documentId": doc_id}
+            match_index.upsert(req.userId, req.role, personality_scores)
+            return {"success": True, "documentId": doc_id, "personalityScores": personality_scores, "personalityType": personality_type}
         else:
             return {"success": False, "error": "Failed to save quiz result"}
+    except WriteQueueFullError:
+        raise
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@app.get("/api/users/{user_id}/quiz_results")
+async def get_user_quiz_results_endpoint(user_id: str, limit: int = 20, cursor: Optional[str] = None):
+    """
+    A user's quiz results, most recent first; pass nextCursor back as `cursor`
+    to get the next page
+    """
+    try:
+        return await asyncio.to_thread(get_user_quiz_results, user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/users/{user_id}/quiz_results/latest")
+async def get_latest_quiz_result_endpoint(user_id: str):
+    """
+    A user's most recent quiz result
+    """
+    result = await asyncio.to_thread(get_latest_quiz_result, user_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No quiz result found for user {user_id}")
+    return result
+
+# === Matchmaking Endpoint ===
+
+MAX_MATCH_PAGE_SIZE = 100
+
+@app.get("/api/matches/{user_id}")
+async def get_matches_endpoint(
+    user_id: str,
+    role: Optional[str] = None,
+    tags: Optional[str] = None,
+    page: int = 1,
+    pageSize: int = 10,
+):
+    """
+    Users whose personality scores are closest to this user's latest quiz result
+
+    `role` limits matches to "investor" or "advisor"; `tags` is a comma-separated
+    list of trait tags every match must have, e.g. ?tags=Long-Term,Low%20Risk
+    """
+    page = max(1, page)
+    pageSize = max(1, min(pageSize, MAX_MATCH_PAGE_SIZE))
+    tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else None
+    try:
+        result = await asyncio.to_thread(find_matches, user_id, role=role, tags=tag_list, page=page, page_size=pageSize)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No quiz result found for user {user_id}")
+    return result
+
 # === Fund Data Endpoints ===
 
+MAX_NAV_DAYS = 365 * 10
+
 @app.get("/api/fund/{ticker}")
-async def get_fund(ticker: str):
+async def get_fund(request: Request, ticker: str):
     """
     Get comprehensive fund information including NAV, holdings, and historical data
+
+    `?format=columns` (or `Accept: application/vnd.fund-nav.columns+json`)
+    sends historicalNav as {"dates", "nav", "totalReturn"} arrays. Responses
+    carry an ETag from the latest NAV date and holdings, and a matching
+    If-None-Match gets a 304 without the body being encoded.
     """
-    print(f"[API] GET /api/fund/{ticker}")
+    fmt = negotiate_format(request, supported=("rows", "columns"))
     try:
-        fund_info = get_fund_info(ticker.upper())
-        print(f"[API] Successfully returned fund info for {ticker}")
-        return fund_info
+        info = await get_fund_info_async(ticker.upper())
+    except UpstreamPoolError:
+        raise
     except Exception as e:
-        print(f"[API] Error getting fund info for {ticker}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error getting fund info for %s: %s", ticker, e)
         return {"error": str(e), "ticker": ticker}
+    if info.get("error"):
+        return info
+
+    stale = bool(info.get("stale"))
+    etag = make_etag(request, nav_version(info["historicalNav"]), fingerprint(info["holdings"]), str(stale))
+    headers, unchanged = conditional(request, etag, seconds_until_nav_publish(), stale)
+    if unchanged:
+        return unchanged
+    if fmt == "columns":
+        info = {**info, "historicalNav": to_columns(info["historicalNav"])}
+    return encoded_response(request, info, fmt, headers=headers)
+
+def _mark_stale(response: dict, stale: bool) -> dict:
+    # Morningstar was unreachable and this is last-known-good data
+    if stale:
+        response["stale"] = True
+    return response
+
+def _check_downsampling(every: int, period: Optional[str]) -> None:
+    if every < 1:
+        raise HTTPException(status_code=400, detail="every must be at least 1")
+    if period is not None and period not in RESAMPLE_PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {', '.join(RESAMPLE_PERIODS)}")
 
 @app.get("/api/fund/{ticker}/nav")
-async def get_fund_nav_endpoint(ticker: str, days: int = 30):
+async def get_fund_nav_endpoint(request: Request, ticker: str, days: int = 30, every: int = 1, period: Optional[str] = None):
     """
     Get historical NAV data for a fund
+
+    `every=N` keeps every Nth point; `period=week|month` returns OHLC bars instead.
+    `?format=columns|binary` (or the matching Accept media type) returns
+    struct-of-arrays JSON or packed float32 columns (see nav_encoding);
+    large bodies are gzip/brotli compressed when the client accepts it.
     """
-    print(f"[API] GET /api/fund/{ticker}/nav?days={days}")
+    _check_downsampling(every, period)
+    fmt = negotiate_format(request)
     try:
-        # Limit days to prevent timeouts
-        days = min(days, 90)  # Max 90 days
-        nav_data = get_fund_nav(ticker.upper(), days=days)
-        print(f"[API] Successfully returned {len(nav_data)} NAV points for {ticker}")
-        return {"ticker": ticker, "navData": nav_data}
+        # Only the dates missing from the NAV history store are fetched upstream,
+        # so long windows are cheap; just keep the request within reason
+        days = max(1, min(days, MAX_NAV_DAYS))
+        nav_data, stale = await get_fund_nav_status_async(ticker.upper(), days=days)
+        if period:
+            nav_data = list(resample_ohlc(nav_data, period))
+        if every > 1:
+            nav_data = list(every_nth(nav_data, every))
+    except UpstreamPoolError:
+        raise
     except Exception as e:
-        print(f"[API] Error getting NAV for {ticker}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error getting NAV for %s: %s", ticker, e)
         return {"error": str(e), "ticker": ticker, "navData": []}
 
+    etag = make_etag(request, nav_version(nav_data), str(stale))
+    headers, unchanged = conditional(request, etag, seconds_until_nav_publish(), stale)
+    if unchanged:
+        return unchanged
+    if fmt == "binary":
+        if stale:
+            headers["X-Stale"] = "true"
+        return encoded_response(request, pack_nav_series(nav_data), fmt, headers=headers)
+    return encoded_response(request, _mark_stale({"ticker": ticker, "navData": nav_payload(nav_data, fmt)}, stale), fmt, headers=headers)
+
+@app.get("/api/fund/{ticker}/nav/stream")
+async def stream_fund_nav_endpoint(ticker: str, days: int = 365, every: int = 1, period: Optional[str] = None):
+    """
+    Stream historical NAV data as NDJSON (one point per line, oldest first)
+
+    Points are read from the NAV history store in small batches, so memory
+    stays flat for multi-year windows. Takes the same downsampling options
+    as /nav.
+    """
+    _check_downsampling(every, period)
+    ticker = ticker.upper()
+    days = max(1, min(days, MAX_NAV_DAYS))
+    await fill_fund_nav_history_async(ticker, days)
+
+    def ndjson_lines():
+        for point in iter_fund_nav(ticker, days, every=every, period=period):
+            yield json.dumps(point) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 @app.get("/api/fund/{ticker}/holdings")
-async def get_fund_holdings_endpoint(ticker: str, limit: int = 10):
+async def get_fund_holdings_endpoint(request: Request, ticker: str, limit: int = 10):
     """
-    Get top holdings of a fund
+    Get top holdings of a fund (with an ETag; If-None-Match can get a 304)
     """
     try:
-        holdings = get_fund_holdings(ticker.upper(), limit=limit)
-        return {"ticker": ticker, "holdings": holdings}
+        holdings, stale = await get_fund_holdings_status_async(ticker.upper(), limit=limit)
+    except UpstreamPoolError:
+        raise
     except Exception as e:
         return {"error": str(e), "ticker": ticker}
+
+    etag = make_etag(request, fingerprint(holdings), str(stale))
+    headers, unchanged = conditional(request, etag, HOLDINGS_TTL_SECONDS, stale)
+    if unchanged:
+        return unchanged
+    return encoded_response(request, _mark_stale({"ticker": ticker, "holdings": holdings}, stale), headers=headers)
+
+@app.post("/api/funds")
+async def get_funds_batch(req: FundBatchRequest):
+    """
+    Get snapshots for several funds in one request (for list/comparison pages)
+    """
+    logger.debug("Batch request for %d tickers", len(req.tickers))
+    try:
+        funds = await get_funds_batch_async(req.tickers, fields=req.fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"funds": funds}
+
+@app.get("/api/analytics")
+async def get_fund_analytics_endpoint(tickers: str, days: int = 365, riskFreeRate: float = 0.0):
+    """
+    Returns, volatility, max drawdown, Sharpe/Sortino and rolling returns per
+    fund, plus the correlation matrix of daily returns across the funds
+
+    `tickers` is a comma-separated list, e.g. ?tickers=VOO,QQQ,BND
+    """
+    days = max(2, min(days, MAX_NAV_DAYS))
+    try:
+        return await get_fund_analytics_async(tickers.split(","), days=days, risk_free_rate=riskFreeRate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
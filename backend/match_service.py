@@ -0,0 +1,364 @@
+from typing import Optional, Dict, List, Any, Iterable, Tuple
+import math
+import os
+import threading
+
+import numpy as np
+
+from firebase_service import get_latest_quiz_result
+from quiz_scoring import AXES, CODE_LETTERS, axis_limits
+
+# Per-axis weights for the match distance, e.g. "2,2,1,1" to weigh time horizon and risk double
+MATCH_AXIS_WEIGHTS = np.array(
+    [float(w) for w in os.getenv("MATCH_AXIS_WEIGHTS", "1,1,1,1").split(",")], dtype=np.float32
+)
+MATCH_MAX_RESULTS = 1000  # deepest rank reachable through pagination
+
+# Trait tag for each axis: (tag when score >= 0, tag when score < 0). These
+# are the same letters as the personality code, so a tag filter is a filter
+# on which code partitions to scan.
+AXIS_TAGS = (
+    ("Long-Term", "Short-Term"),
+    ("Low Risk", "High Risk"),
+    ("Complex", "Clarity"),
+    ("Lump Sum", "Consistent"),
+)
+_TAG_BITS = {tag: (axis, positive) for axis, pair in enumerate(AXIS_TAGS) for tag, positive in zip(pair, (True, False))}
+
+
+def _code_bits(vector: np.ndarray) -> int:
+    # One bit per axis, set when the score is >= 0 (L, R, C, W)
+    return sum(1 << axis for axis in range(len(AXES)) if vector[axis] >= 0)
+
+
+def _code_letters(bits: int) -> str:
+    return "".join(pair[0] if bits & (1 << axis) else pair[1] for axis, pair in enumerate(CODE_LETTERS))
+
+
+def _tags(bits: int) -> List[str]:
+    return [pair[0] if bits & (1 << axis) else pair[1] for axis, pair in enumerate(AXIS_TAGS)]
+
+
+class _Partition:
+    """
+    Score columns for one (role, code) pair, grown by doubling
+
+    Stored axis-major (one contiguous float32 row per axis) so distance passes
+    stream through memory, with a bounding box used to skip partitions that
+    can't contain a closer match.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.columns = np.empty((len(AXES), capacity), dtype=np.float32)
+        self.user_ids: List[str] = []
+        # Never shrunk on removal, so it stays a valid (if loose) bound
+        self.low = np.full(len(AXES), np.inf, dtype=np.float32)
+        self.high = np.full(len(AXES), -np.inf, dtype=np.float32)
+
+    @property
+    def size(self) -> int:
+        return len(self.user_ids)
+
+    def append(self, user_id: str, vector: np.ndarray) -> int:
+        row = self.size
+        if row == self.columns.shape[1]:
+            grown = np.empty((len(AXES), row * 2), dtype=np.float32)
+            grown[:, :row] = self.columns[:, :row]
+            self.columns = grown
+        self.set(row, vector)
+        self.user_ids.append(user_id)
+        return row
+
+    def set(self, row: int, vector: np.ndarray) -> None:
+        self.columns[:, row] = vector
+        np.minimum(self.low, vector, out=self.low)
+        np.maximum(self.high, vector, out=self.high)
+
+    def remove(self, row: int) -> Optional[str]:
+        """Swap-remove a row; returns the user ID that moved into it, if any"""
+        last = self.size - 1
+        moved = None
+        if row != last:
+            self.columns[:, row] = self.columns[:, last]
+            self.user_ids[row] = self.user_ids[last]
+            moved = self.user_ids[row]
+        self.user_ids.pop()
+        return moved
+
+    def lower_bound(self, query: np.ndarray, weights: np.ndarray) -> float:
+        """Smallest possible weighted squared distance from query to any row"""
+        gap = np.maximum(np.maximum(self.low - query, query - self.high), 0)
+        return float((gap * gap) @ weights)
+
+    def distances(self, query: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        size = self.size
+        out = np.zeros(size, dtype=np.float32)
+        scratch = np.empty(size, dtype=np.float32)
+        for axis in range(len(AXES)):
+            np.subtract(self.columns[axis, :size], query[axis], out=scratch)
+            np.multiply(scratch, scratch, out=scratch)
+            if weights[axis] != 1:
+                scratch *= weights[axis]
+            out += scratch
+        return out
+
+
+class MatchIndex:
+    """
+    In-memory nearest-neighbour index over users' four-axis personality scores
+
+    Users are partitioned by (role, personality code). Role and tag filters
+    choose which partitions to scan, partitions are visited nearest-first and
+    skipped once their bounding box is farther than the current Kth match, and
+    each one scanned is searched with a vectorized weighted-L2 pass plus
+    argpartition, so no per-user Python runs at query time. Upserts are O(1)
+    amortized.
+    """
+
+    def __init__(self, weights: np.ndarray = MATCH_AXIS_WEIGHTS):
+        self.weights = weights.astype(np.float32)
+        self._max_distance: Optional[float] = None
+        self._lock = threading.RLock()
+        self._partitions: Dict[Tuple[str, int], _Partition] = {}
+        self._locations: Dict[str, Tuple[Tuple[str, int], int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    @property
+    def max_distance(self) -> float:
+        """
+        Largest possible weighted distance (opposite corners of the score
+        ranges the question table allows), for percentages
+        """
+        if self._max_distance is None:
+            self._max_distance = float(np.sqrt(np.sum(self.weights * (2 * axis_limits()) ** 2)))
+        return self._max_distance
+
+    def upsert(self, user_id: str, role: str, scores: Dict[str, float], replace: bool = True) -> bool:
+        """
+        Add a user or replace their scores/role with the latest quiz result
+
+        With replace=False a user already in the index is left alone, so a
+        bulk load can't undo a result saved while it was running.
+
+        Returns:
+            False if the user was left alone, True otherwise
+        """
+        vector = np.array([scores[axis] for axis in AXES], dtype=np.float32)
+        key = (role, _code_bits(vector))
+        with self._lock:
+            location = self._locations.get(user_id)
+            if location is not None and not replace:
+                return False
+            if location is not None:
+                old_key, row = location
+                if old_key == key:
+                    self._partitions[key].set(row, vector)
+                    return True
+                self._remove_at(old_key, row)
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = self._partitions[key] = _Partition()
+            self._locations[user_id] = (key, partition.append(user_id, vector))
+        return True
+
+    def remove(self, user_id: str) -> bool:
+        with self._lock:
+            location = self._locations.pop(user_id, None)
+            if location is None:
+                return False
+            self._remove_at(*location)
+            return True
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            location = self._locations.get(user_id)
+            if location is None:
+                return None
+            (role, bits), row = location
+            vector = self._partitions[(role, bits)].columns[:, row].copy()
+        return self._entry(user_id, role, bits, vector)
+
+    def query(
+        self,
+        scores: Dict[str, float],
+        role: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: int = 10,
+        exclude_user_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Nearest users to `scores`, best match first
+
+        Args:
+            scores: Four-axis scores to match against
+            role: Only match users with this role
+            tags: Only match users with all of these trait tags (see AXIS_TAGS)
+            offset: Number of ranked matches to skip (pagination)
+            limit: Number of matches to return
+            exclude_user_id: User to leave out (normally the one asking)
+
+        Returns:
+            Dictionary with "matches" and "total" (users passing the filters)
+
+        Raises:
+            ValueError: on unknown tags or a page beyond MATCH_MAX_RESULTS
+        """
+        if offset < 0 or limit < 1 or offset + limit > MATCH_MAX_RESULTS:
+            raise ValueError(f"Only the top {MATCH_MAX_RESULTS} matches can be paged through")
+        required: Dict[int, bool] = {}
+        for tag in tags or []:
+            if tag not in _TAG_BITS:
+                raise ValueError(f"Unknown tag: {tag}")
+            axis, positive = _TAG_BITS[tag]
+            if required.get(axis, positive) != positive:
+                return {"matches": [], "total": 0}
+            required[axis] = positive
+
+        query = np.array([scores[axis] for axis in AXES], dtype=np.float32)
+        wanted = offset + limit + (1 if exclude_user_id else 0)
+
+        with self._lock:
+            eligible = []
+            total = 0
+            for key, partition in self._partitions.items():
+                part_role, bits = key
+                if role is not None and part_role != role:
+                    continue
+                if any(bool(bits & (1 << axis)) != positive for axis, positive in required.items()):
+                    continue
+                if partition.size:
+                    total += partition.size
+                    eligible.append((partition.lower_bound(query, self.weights), key, partition))
+            eligible.sort(key=lambda item: item[0])
+            excluded = self._locations.get(exclude_user_id) if exclude_user_id else None
+            if excluded is not None and any(key == excluded[0] for _, key, _ in eligible):
+                total -= 1
+
+            # Keep the `wanted` smallest distances seen so far; stop once the
+            # next partition's bounding box is farther than all of them
+            kth = np.inf
+            scanned = []
+            for bound, key, partition in eligible:
+                if bound > kth:
+                    break
+                dists = partition.distances(query, self.weights)
+                rows = np.argpartition(dists, wanted - 1)[:wanted] if len(dists) > wanted else np.arange(len(dists))
+                scanned.append((key, partition, rows, dists[rows]))
+                seen = np.concatenate([d for _, _, _, d in scanned])
+                if len(seen) >= wanted:
+                    kth = float(np.partition(seen, wanted - 1)[wanted - 1])
+
+            candidates = []
+            for key, partition, rows, dists in scanned:
+                for row, dist in zip(rows[dists <= kth], dists[dists <= kth]):
+                    user_id = partition.user_ids[row]
+                    if user_id != exclude_user_id:
+                        candidates.append((float(dist), user_id, key, partition.columns[:, row].copy()))
+
+        candidates.sort(key=lambda c: c[0])
+        matches = candidates[:offset + limit]
+
+        results = []
+        for dist, user_id, (part_role, bits), vector in matches[offset:]:
+            entry = self._entry(user_id, part_role, bits, vector)
+            # Clamped in case stored scores predate a change to the question table
+            entry["matchPercentage"] = min(100, max(0, round(100 * (1 - math.sqrt(dist) / self.max_distance))))
+            results.append(entry)
+        return {"matches": results, "total": max(total, 0)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": len(self._locations),
+                "partitions": sum(1 for p in self._partitions.values() if p.size),
+            }
+
+    # --- internals ---
+
+    def _remove_at(self, key: Tuple[str, int], row: int) -> None:
+        moved = self._partitions[key].remove(row)
+        if moved is not None:
+            self._locations[moved] = (key, row)
+
+    @staticmethod
+    def _entry(user_id: str, role: str, bits: int, vector: np.ndarray) -> Dict[str, Any]:
+        return {
+            "userId": user_id,
+            "role": role,
+            "code": _code_letters(bits),
+            "scores": {axis: float(value) for axis, value in zip(AXES, vector)},
+            "tags": _tags(bits),
+        }
+
+
+match_index = MatchIndex()
+
+
+def load_match_index(results: Iterable[Tuple[str, str, Dict[str, float]]]) -> int:
+    """
+    Bulk-load (user_id, role, scores) rows, one per user, into the index
+
+    Users already indexed (results saved since the server started, including
+    while this runs) keep their scores. Returns the number of users added.
+    """
+    count = 0
+    for user_id, role, scores in results:
+        try:
+            added = match_index.upsert(user_id, role, scores, replace=False)
+        except (KeyError, TypeError, ValueError):
+            continue
+        count += added
+    return count
+
+
+def find_matches(
+    user_id: str,
+    role: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    page: int = 1,
+    page_size: int = 10,
+) -> Optional[Dict[str, Any]]:
+    """
+    Ranked matches for a user who has taken the quiz
+
+    A user missing from the index (e.g. their result was saved through another
+    worker, each of which has its own index) is looked up in Firestore and
+    added. This can block on Firestore, so call it off the event loop.
+
+    Returns:
+        Dictionary with matches, page, pageSize and total, or None if the user
+        has no quiz result in the index
+
+    Raises:
+        ValueError: on unknown tags or a page beyond MATCH_MAX_RESULTS
+    """
+    user = match_index.get(user_id) or _index_latest_result(user_id)
+    if user is None:
+        return None
+    result = match_index.query(
+        user["scores"],
+        role=role,
+        tags=tags,
+        offset=(page - 1) * page_size,
+        limit=page_size,
+        exclude_user_id=user_id,
+    )
+    return {**result, "page": page, "pageSize": page_size}
+
+
+def _index_latest_result(user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Add a user's latest stored quiz result to the index; returns their entry, or None
+    """
+    latest = get_latest_quiz_result(user_id)
+    scores = latest.get("personalityScores") if latest else None
+    if not scores:
+        return None
+    try:
+        match_index.upsert(user_id, latest.get("role", "investor"), scores, replace=False)
+    except (KeyError, TypeError, ValueError):
+        return None
+    return match_index.get(user_id)
@@ -0,0 +1,139 @@
+"""
+Measure backend cold-start time against a budget.
+
+Reports how long `import main` takes, how long a fresh uvicorn process takes
+to answer its first request, and how long until every background subsystem
+(Firebase, mstarpy, Gemini) has finished loading. Exits non-zero if the import
+or first-response time is over budget.
+
+Usage:
+    cd backend
+    python measure_startup.py
+    python measure_startup.py --runs 5 --import-budget-ms 1000 --path /api/fund/VOO
+"""
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import main; "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def measure_import_ms() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(url: str, timeout: float = 30):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.status, response.read()
+
+
+def measure_server(path: str, ready_timeout: float) -> dict:
+    """
+    Start uvicorn and time first /health response, readiness and a first request to `path`
+    """
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {}
+    try:
+        deadline = started + ready_timeout
+        while "firstResponseMs" not in result:
+            if time.perf_counter() > deadline or server.poll() is not None:
+                raise RuntimeError("Server did not start")
+            try:
+                _get(f"{base}/health", timeout=1)
+                result["firstResponseMs"] = (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.02)
+
+        health = {}
+        while time.perf_counter() < deadline:
+            health = json.loads(_get(f"{base}/health")[1])
+            if health.get("ready"):
+                result["readyMs"] = (time.perf_counter() - started) * 1000
+                break
+            time.sleep(0.05)
+        result["subsystems"] = health.get("subsystems")
+
+        if path:
+            request_started = time.perf_counter()
+            try:
+                status, _ = _get(base + path)
+            except urllib.error.HTTPError as e:
+                status = e.code
+            result["firstRequest"] = {
+                "path": path,
+                "status": status,
+                "ms": (time.perf_counter() - request_started) * 1000,
+            }
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="cold starts to measure (median is reported)")
+    parser.add_argument("--import-budget-ms", type=float, default=1500)
+    parser.add_argument("--first-response-budget-ms", type=float, default=3000)
+    parser.add_argument("--path", default="/health", help="endpoint to time as the first real request")
+    parser.add_argument("--ready-timeout", type=float, default=60, help="seconds to wait for subsystems")
+    args = parser.parse_args()
+
+    import_ms = [measure_import_ms() for _ in range(args.runs)]
+    servers = [measure_server(args.path, args.ready_timeout) for _ in range(args.runs)]
+
+    first_response_ms = [s["firstResponseMs"] for s in servers]
+    ready_ms = [s["readyMs"] for s in servers if "readyMs" in s]
+    report = {
+        "importMs": round(statistics.median(import_ms), 1),
+        "firstResponseMs": round(statistics.median(first_response_ms), 1),
+        "readyMs": round(statistics.median(ready_ms), 1) if ready_ms else None,
+        "firstRequest": servers[-1].get("firstRequest"),
+        "subsystems": servers[-1].get("subsystems"),
+        "budget": {
+            "importMs": args.import_budget_ms,
+            "firstResponseMs": args.first_response_budget_ms,
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+    over = []
+    if report["importMs"] > args.import_budget_ms:
+        over.append(f"import {report['importMs']}ms > {args.import_budget_ms}ms")
+    if report["firstResponseMs"] > args.first_response_budget_ms:
+        over.append(f"first response {report['firstResponseMs']}ms > {args.first_response_budget_ms}ms")
+    if over:
+        raise SystemExit("Over startup budget: " + "; ".join(over))
+    print("Within startup budget")
+
+
+if __name__ == "__main__":
+    main()
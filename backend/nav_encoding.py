@@ -0,0 +1,170 @@
+from datetime import date
+from typing import Optional, Dict, List, Any, Iterable, Tuple
+import gzip
+import json
+import math
+import os
+import struct
+
+import numpy as np
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    # Optional: brotli beats gzip on JSON, but gzip is always available
+    import brotli
+except ImportError:
+    brotli = None
+
+# NAV series encodings, chosen by the Accept header or ?format=
+#   rows:    {"navData": [{"nav", "totalReturn", "date"}, ...]} (the default)
+#   columns: {"navData": {"dates": [...], "nav": [...], "totalReturn": [...]}}
+#   binary:  packed float32 columns, see pack_nav_series
+ROWS_MEDIA_TYPE = "application/json"
+COLUMNS_MEDIA_TYPE = "application/vnd.fund-nav.columns+json"
+BINARY_MEDIA_TYPE = "application/vnd.fund-nav.f32"
+NAV_FORMATS = {"rows": ROWS_MEDIA_TYPE, "columns": COLUMNS_MEDIA_TYPE, "binary": BINARY_MEDIA_TYPE}
+
+# Bodies smaller than this aren't worth compressing
+NAV_COMPRESS_MIN_BYTES = int(os.getenv("NAV_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+BINARY_MAGIC = b"NAV1"
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def negotiate_format(request: Request, supported: Iterable[str] = NAV_FORMATS) -> str:
+    """
+    Pick the NAV encoding for a request: ?format= wins, then the Accept header
+
+    Unknown or unsupported choices fall back to "rows", so plain clients keep
+    getting the JSON they always did.
+    """
+    supported = list(supported)
+    requested = request.query_params.get("format")
+    if requested:
+        return requested if requested in supported else "rows"
+
+    by_media_type = {NAV_FORMATS[name]: name for name in supported}
+    best, best_q = "rows", 0.0
+    for media_type, q in _parse_accept(request.headers.get("accept", "")):
+        name = by_media_type.get(media_type)
+        # Ties keep the earlier entry; rows only wins if it's explicitly preferred
+        if name is not None and q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _parse_accept(header: str) -> List[Tuple[str, float]]:
+    entries = []
+    for part in header.split(","):
+        media_type, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type:
+            entries.append((media_type.strip().lower(), q))
+    return entries
+
+
+def to_columns(points: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Struct-of-arrays form of NAV points (or OHLC bars): "dates" plus one list per field
+    """
+    fields = [key for key in (points[0] if points else {"nav": 0, "totalReturn": 0}) if key != "date"]
+    columns: Dict[str, List[Any]] = {"dates": [p["date"] for p in points]}
+    for field in fields:
+        columns[field] = [p.get(field) for p in points]
+    return columns
+
+
+def pack_nav_series(points: List[Dict[str, Any]]) -> bytes:
+    """
+    Pack NAV points (or OHLC bars) into the compact binary format
+
+    Layout (little-endian):
+        4 bytes   magic "NAV1"
+        uint32    point count n
+        uint8     field count k
+        k times   uint8 name length + UTF-8 field name
+        zero padding to a multiple of 4 bytes
+        n int32   dates as days since 1970-01-01; the first is absolute,
+                  the rest are deltas from the previous date
+        k times   n float32 values (NaN where missing), byte-stream-split:
+                  all first bytes, then all second bytes, and so on
+
+    Delta dates and split bytes turn the series into long runs of similar
+    bytes, so it compresses far better than plain float arrays.
+    """
+    columns = to_columns(points)
+    dates = columns.pop("dates")
+    fields = list(columns)
+
+    header = bytearray(BINARY_MAGIC + struct.pack("<IB", len(points), len(fields)))
+    for field in fields:
+        name = field.encode("utf-8")
+        header += struct.pack("<B", len(name)) + name
+    header += b"\0" * (-len(header) % 4)
+
+    days = np.fromiter((date.fromisoformat(d[:10]).toordinal() - _EPOCH_ORDINAL for d in dates), dtype=np.int64, count=len(dates))
+    day_deltas = np.diff(days, prepend=0).astype("<i4")
+
+    parts = [bytes(header), day_deltas.tobytes()]
+    for field in fields:
+        values = np.array([math.nan if v is None else v for v in columns[field]], dtype="<f4")
+        parts.append(values.view(np.uint8).reshape(-1, 4).T.tobytes())
+    return b"".join(parts)
+
+
+def nav_payload(points: List[Dict[str, Any]], fmt: str) -> Any:
+    """
+    navData value for the JSON formats
+    """
+    return to_columns(points) if fmt == "columns" else points
+
+
+def encoded_response(
+    request: Request,
+    content: Any,
+    fmt: str = "rows",
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Build a response in the negotiated format, compressed if the client accepts it
+
+    `content` is the JSON body for "rows"/"columns", or raw bytes for "binary".
+    """
+    if fmt == "binary":
+        body = content
+    else:
+        body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    response_headers = {"Vary": "Accept, Accept-Encoding"}
+    response_headers.update(headers or {})
+    body, encoding = compress(body, request.headers.get("accept-encoding", ""))
+    if encoding:
+        response_headers["Content-Encoding"] = encoding
+    return Response(body, media_type=NAV_FORMATS.get(fmt, ROWS_MEDIA_TYPE), headers=response_headers)
+
+
+def compress(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress `body` with brotli or gzip if it's big enough and the client accepts it
+
+    Returns:
+        (body, content encoding or None)
+    """
+    if len(body) < NAV_COMPRESS_MIN_BYTES:
+        return body, None
+    accepted = {media_type for media_type, q in _parse_accept(accept_encoding) if q > 0}
+    if brotli is not None and "br" in accepted:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+    return body, None
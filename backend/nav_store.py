@@ -0,0 +1,278 @@
+from datetime import date, timedelta
+from typing import Optional, Dict, List, Any, Callable, Iterable, Iterator, Tuple
+import os
+import sqlite3
+import threading
+
+from caching import SQLITE_MMAP_BYTES
+from observability import get_logger
+
+logger = get_logger("nav_store")
+
+# Optional SQLite file for NAV history; the default keeps it in memory for the process lifetime
+NAV_STORE_DB_PATH = os.getenv("NAV_STORE_DB_PATH", ":memory:")
+# NAVs older than this many days are treated as final, so a window that ends
+# before it never needs to be re-fetched even if upstream returned no points
+NAV_SETTLE_DAYS = 7
+
+NavFetcher = Callable[[date, date], List[Dict[str, Any]]]
+
+
+def _has_weekday(start: date, end: date) -> bool:
+    """
+    True if [start, end] contains at least one trading weekday
+    """
+    if end < start:
+        return False
+    if (end - start).days >= 2:
+        return True
+    return any((start + timedelta(days=i)).weekday() < 5 for i in range((end - start).days + 1))
+
+
+class NavHistoryStore:
+    """
+    Per-ticker NAV time series kept in SQLite
+
+    Each ticker has one contiguous covered date range. A request for a window
+    only fetches the parts outside that range from upstream, merges them in,
+    and then serves the whole window from local data.
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        if db_path != ":memory:":
+            # Worker processes share the file: WAL so reads don't wait on writes,
+            # mmap so they read the same pages instead of each copying them
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS nav_points ("
+                "ticker TEXT NOT NULL, date TEXT NOT NULL, nav REAL, total_return REAL, "
+                "PRIMARY KEY (ticker, date)) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS nav_coverage ("
+                "ticker TEXT PRIMARY KEY, start_date TEXT NOT NULL, end_date TEXT NOT NULL)"
+            )
+
+    def get_range(self, ticker: str, start: date, end: date, fetcher: NavFetcher) -> List[Dict[str, Any]]:
+        """
+        Get NAV points for [start, end], fetching only the dates not already stored
+
+        Args:
+            ticker: Fund ticker symbol
+            start: First date of the window
+            end: Last date of the window
+            fetcher: Called as fetcher(start, end) for each missing range; errors propagate
+
+        Returns:
+            List of dictionaries with nav, totalReturn, and date, oldest first
+        """
+        self.fill(ticker, start, end, fetcher)
+        return self.read(ticker, start, end)
+
+    def fill(self, ticker: str, start: date, end: date, fetcher: NavFetcher) -> None:
+        """
+        Fetch and store whatever part of [start, end] isn't stored yet
+        """
+        coverage = self.coverage(ticker)
+        if coverage is None:
+            missing = [(start, end)]
+        else:
+            covered_start, covered_end = coverage
+            missing = []
+            if start < covered_start:
+                missing.append((start, covered_start - timedelta(days=1)))
+            if end > covered_end:
+                missing.append((covered_end + timedelta(days=1), end))
+
+        for gap_start, gap_end in missing:
+            if not _has_weekday(gap_start, gap_end):
+                continue
+            logger.info("Fetching %s NAV from %s to %s", ticker, gap_start, gap_end)
+            points = fetcher(gap_start, gap_end)
+            self._merge(ticker, gap_start, gap_end, points)
+
+    def read(self, ticker: str, start: date, end: date) -> List[Dict[str, Any]]:
+        """
+        Read stored NAV points for [start, end] without touching upstream
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, nav, total_return FROM nav_points "
+                "WHERE ticker = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (ticker, start.isoformat(), end.isoformat()),
+            ).fetchall()
+        return [{"nav": nav, "totalReturn": total_return, "date": day} for day, nav, total_return in rows]
+
+    def read_columns(self, ticker: str, start: date, end: date) -> Tuple[List[str], List[float], List[float]]:
+        """
+        Read stored NAV data for [start, end] as (dates, navs, totalReturns) columns
+
+        Skips building a dict per point, for callers that load the series into arrays.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, nav, total_return FROM nav_points "
+                "WHERE ticker = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (ticker, start.isoformat(), end.isoformat()),
+            ).fetchall()
+        if not rows:
+            return [], [], []
+        dates, navs, total_returns = zip(*rows)
+        return list(dates), list(navs), list(total_returns)
+
+    def iter_range(self, ticker: str, start: date, end: date, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Yield stored NAV points for [start, end] oldest first, reading
+        `batch_size` rows at a time so long histories stay out of memory
+        """
+        last_day = ""
+        lower = start.isoformat()
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT date, nav, total_return FROM nav_points "
+                    "WHERE ticker = ? AND date >= ? AND date > ? AND date <= ? ORDER BY date LIMIT ?",
+                    (ticker, lower, last_day, end.isoformat(), batch_size),
+                ).fetchall()
+            for day, nav, total_return in rows:
+                yield {"nav": nav, "totalReturn": total_return, "date": day}
+            if len(rows) < batch_size:
+                return
+            last_day = rows[-1][0]
+
+    def coverage(self, ticker: str) -> Optional[Tuple[date, date]]:
+        """
+        The contiguous date range already fetched for a ticker, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT start_date, end_date FROM nav_coverage WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        if row is None:
+            return None
+        return date.fromisoformat(row[0]), date.fromisoformat(row[1])
+
+    def import_points(self, ticker: str, start: date, end: date, points: List[Dict[str, Any]]) -> None:
+        """
+        Store NAV points for [start, end] obtained elsewhere (e.g. a bulk import)
+        and mark the range as covered, as if it had been fetched
+        """
+        self._merge(ticker, start, end, points)
+
+    def clear(self, ticker: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            if ticker is None:
+                self._conn.execute("DELETE FROM nav_points")
+                self._conn.execute("DELETE FROM nav_coverage")
+            else:
+                self._conn.execute("DELETE FROM nav_points WHERE ticker = ?", (ticker,))
+                self._conn.execute("DELETE FROM nav_coverage WHERE ticker = ?", (ticker,))
+
+    def _merge(self, ticker: str, start: date, end: date, points: List[Dict[str, Any]]) -> None:
+        rows = []
+        for point in points or []:
+            day = str(point.get("date", ""))[:10]
+            if day:
+                rows.append((ticker, day, point.get("nav"), point.get("totalReturn")))
+
+        # Only mark dates as covered once their NAV has been seen or has settled,
+        # so today's not-yet-published NAV is picked up on the next request
+        settled = date.today() - timedelta(days=NAV_SETTLE_DAYS)
+        latest_point = max((date.fromisoformat(r[1]) for r in rows), default=start - timedelta(days=1))
+        fetched_end = max(latest_point, min(end, settled))
+
+        with self._lock:
+            # IMMEDIATE takes the write lock before the coverage is read, so workers
+            # filling different windows of one ticker can't overwrite each other's range
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT start_date, end_date FROM nav_coverage WHERE ticker = ?", (ticker,)
+                ).fetchone()
+                if row is None:
+                    new_start, new_end = start, fetched_end
+                else:
+                    covered_start, covered_end = date.fromisoformat(row[0]), date.fromisoformat(row[1])
+                    new_start = min(covered_start, start)
+                    # A left-side fill never moves the end back
+                    new_end = max(covered_end, fetched_end) if start > covered_start else covered_end
+
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO nav_points (ticker, date, nav, total_return) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                # Nothing known about a new ticker - don't record an empty range
+                if new_end >= new_start and (row is not None or rows):
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO nav_coverage (ticker, start_date, end_date) VALUES (?, ?, ?)",
+                        (ticker, new_start.isoformat(), new_end.isoformat()),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+# === Downsampling ===
+# Long charts don't need daily points; both helpers consume and produce
+# iterators so they can sit between the store and a streaming response.
+
+RESAMPLE_PERIODS = ("week", "month")
+
+
+def every_nth(points: Iterable[Dict[str, Any]], n: int) -> Iterator[Dict[str, Any]]:
+    """
+    Keep every nth point, always including the most recent one
+    """
+    last = None
+    for i, point in enumerate(points):
+        last = point
+        if i % n == 0:
+            last = None
+            yield point
+    if last is not None:
+        yield last
+
+
+def _period_key(day: str, period: str) -> Tuple[int, int]:
+    d = date.fromisoformat(day[:10])
+    if period == "week":
+        iso = d.isocalendar()
+        return iso[0], iso[1]
+    return d.year, d.month
+
+
+def resample_ohlc(points: Iterable[Dict[str, Any]], period: str) -> Iterator[Dict[str, Any]]:
+    """
+    Collapse daily NAV points into one open/high/low/close bar per week or month
+
+    Each bar is dated by its first trading day and carries the last totalReturn
+    of the period; "nav" is the closing value so bars can be charted like points.
+    """
+    if period not in RESAMPLE_PERIODS:
+        raise ValueError(f"period must be one of {', '.join(RESAMPLE_PERIODS)}")
+
+    bar = None
+    bar_key = None
+    for point in points:
+        nav = point.get("nav")
+        if nav is None:
+            continue
+        key = _period_key(point["date"], period)
+        if key != bar_key:
+            if bar is not None:
+                yield bar
+            bar_key = key
+            bar = {"date": point["date"], "open": nav, "high": nav, "low": nav, "close": nav}
+        bar["high"] = max(bar["high"], nav)
+        bar["low"] = min(bar["low"], nav)
+        bar["close"] = nav
+        bar["nav"] = nav
+        bar["totalReturn"] = point.get("totalReturn")
+    if bar is not None:
+        yield bar
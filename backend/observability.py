@@ -0,0 +1,358 @@
+from typing import Optional, Dict, List, Any, Callable, Iterator, Tuple
+from contextlib import contextmanager
+import atexit
+import bisect
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+from starlette.routing import Match
+
+# DEBUG, INFO, WARNING or ERROR
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" for one JSON object per line, "text" for human-readable lines
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+# Latency buckets in seconds; fund lookups sit in the 0.1-5s range, Gemini in 1-30s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+# === Logging ===
+# Handlers only put records on a queue; a listener thread formats and writes
+# them, so a slow stdout never stalls a request.
+
+class _JsonFormatter(logging.Formatter):
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        # Anything passed as logger.info(..., extra={...})
+        entry.update({k: v for k, v in vars(record).items() if k not in self._RESERVED})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    _RESERVED = _JsonFormatter._RESERVED
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s [%(name)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {k: v for k, v in vars(record).items() if k not in self._RESERVED}
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_logging_lock = threading.Lock()
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> None:
+    """
+    Route the backend's loggers through a non-blocking queue to stdout (idempotent)
+    """
+    global _listener
+    with _logging_lock:
+        if _listener is not None:
+            return
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(_JsonFormatter() if fmt == "json" else _TextFormatter())
+        records: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger("backend")
+        root.handlers = [logging.handlers.QueueHandler(records)]
+        root.setLevel(level)
+        root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Logger for a backend module, e.g. get_logger("fund_service")
+    """
+    setup_logging()
+    return logging.getLogger(f"backend.{name}")
+
+
+# === Metrics ===
+# A small in-process registry rendered in the Prometheus text format, so
+# /metrics needs no extra dependency.
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_label_text(self.labels, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        # Optional callback that reads current values at scrape time
+        self._collect = collect
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._collect is not None:
+            try:
+                values.update(self._collect())
+            except Exception:
+                pass
+        return self.header() + [f"{self.name}{_label_text(self.labels, k)} {_number(v)}" for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = {k: (list(counts), total[0]) for k, (counts, total) in self._series.items()}
+        lines = self.header()
+        for label_values, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, label_values)} {total!r}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to serve a request, including streamed bodies",
+    ("method", "route", "status"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being served", ("route",),
+))
+http_request_errors = registry.register(Counter(
+    "http_request_errors_total", "Requests that raised or returned a 5xx status", ("method", "route"),
+))
+upstream_call_duration = registry.register(Histogram(
+    "upstream_call_duration_seconds", "Latency of calls to mstarpy, Gemini and Firestore", ("upstream",),
+))
+upstream_calls_in_flight = registry.register(Gauge(
+    "upstream_calls_in_flight", "Upstream calls currently running", ("upstream",),
+))
+upstream_call_errors = registry.register(Counter(
+    "upstream_call_errors_total", "Upstream calls that raised", ("upstream", "error"),
+))
+
+
+# Called with the upstream name at the start of every tracked call (e.g. quota accounting)
+_upstream_listeners: List[Callable[[str], None]] = []
+
+
+def add_upstream_listener(listener: Callable[[str], None]) -> None:
+    """
+    Call `listener(upstream)` whenever a tracked upstream call starts
+    """
+    _upstream_listeners.append(listener)
+
+
+@contextmanager
+def track_upstream(upstream: str) -> Iterator[None]:
+    """
+    Record latency, errors and in-flight count for one upstream call
+
+    Usage:
+        with track_upstream("mstarpy_nav"):
+            funds.nav(start, end)
+    """
+    for listener in _upstream_listeners:
+        try:
+            listener(upstream)
+        except Exception:
+            logging.getLogger("backend.observability").exception("Upstream listener failed")
+    upstream_calls_in_flight.inc(upstream)
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        upstream_call_errors.inc(upstream, type(e).__name__)
+        raise
+    finally:
+        upstream_call_duration.observe(time.perf_counter() - started, upstream)
+        upstream_calls_in_flight.dec(upstream)
+
+
+def timed_upstream(upstream: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator form of track_upstream for blocking functions
+    """
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with track_upstream(upstream):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+    return decorate
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, in-flight requests and errors
+
+    Routes are labelled by their path template (e.g. /api/fund/{ticker}) so
+    tickers and user IDs don't each create a series. Durations run until the
+    last body chunk is sent, so streamed responses are measured in full.
+    """
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route(scope)
+        method = scope["method"]
+        status = 500  # if the app raises before responding
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(route)
+            http_request_duration.observe(time.perf_counter() - started, method, route, str(status))
+            if status >= 500:
+                http_request_errors.inc(method, route)
+
+    def _route(self, scope) -> str:
+        return route_template(self.router, scope)
+
+
+def route_template(router, scope) -> str:
+    """
+    Path template of the route a request matches, e.g. /api/fund/{ticker}
+    """
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+def render_metrics() -> str:
+    return registry.render()
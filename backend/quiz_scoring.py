@@ -0,0 +1,368 @@
+from typing import Optional, Dict, List, Any, Iterable, Sequence, Tuple
+from pathlib import Path
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from observability import get_logger
+
+logger = get_logger("quiz_scoring")
+
+# The question table the frontend quiz is built from; point this at a copy
+# when the backend is deployed without the frontend tree. It's read on first
+# use, so the server still starts (and serves funds) if it's missing.
+QUIZ_TABLE_PATH = os.getenv(
+    "QUIZ_TABLE_PATH",
+    str(Path(__file__).parent.parent / "frontend" / "src" / "data" / "quizQuestions.json"),
+)
+
+ROLES = ("investor", "advisor")
+AXES = ("shortTermVsLongTerm", "highRiskVsLowRisk", "clarityVsComplexity", "consistentVsLumpSum")
+# Score each question axis adds to
+AXIS_KEYS = {
+    "timeHorizon": "shortTermVsLongTerm",
+    "riskTolerance": "highRiskVsLowRisk",
+    "complexity": "clarityVsComplexity",
+    "consistency": "consistentVsLumpSum",
+}
+# Personality code letter per axis: (score >= 0, score < 0)
+CODE_LETTERS = (("L", "S"), ("R", "H"), ("C", "X"), ("W", "C"))
+
+# Mirrors getPersonalityType in frontend/src/utils/personalityCalculator.ts
+PERSONALITY_GROUPS: Dict[str, Tuple[str, str]] = {
+    "LH": ("Bold", "hsl(var(--high-risk))"),
+    "SH": ("Fast", "hsl(var(--short-term))"),
+    "SR": ("Safe", "hsl(var(--low-risk))"),
+    "LR": ("Steady", "hsl(var(--long-term))"),
+}
+PERSONALITY_TYPES: Dict[str, Tuple[str, str]] = {
+    "LHCC": ("The Visionary Builder", "Bold and patient, you embrace complex long-term strategies with consistent returns. You're willing to take risks to build something significant over time."),
+    "LHCW": ("The Empire Architect", "You design intricate, ambitious long-term plans aimed at major windfalls. Risk doesn't intimidate you when there's potential for transformative gains."),
+    "LHXC": ("The Steady Pioneer", "You prefer clear, bold long-term strategies that deliver regular progress. Simple approaches with high upside appeal to your patient yet daring nature."),
+    "LHXW": ("The Strategic Gambler", "Simple yet bold, you target significant long-term windfalls. You're comfortable with risk and prefer straightforward approaches to major milestones."),
+    "SHCC": ("The Dynamic Trader", "Fast-paced and analytical, you thrive on complex short-term strategies with consistent action. You enjoy the thrill of frequent, calculated risks."),
+    "SHCW": ("The Aggressive Speculator", "You pursue complex short-term opportunities for major quick windfalls. High risk and high reward excite you when backed by sophisticated analysis."),
+    "SHXC": ("The Quick Mover", "Simple and fast, you prefer clear short-term plays with regular opportunities. Speed and simplicity drive your bold decisions."),
+    "SHXW": ("The Momentum Chaser", "You seek straightforward short-term opportunities for big, fast windfalls. Risk is acceptable when the potential payoff comes quickly."),
+    "SRCC": ("The Prudent Tactician", "You favor complex but safe short-term strategies with steady results. Security and sophistication guide your near-term decisions."),
+    "SRCW": ("The Careful Opportunist", "Conservative yet tactical, you seek complex short-term strategies for notable but secure windfalls. You balance safety with targeted opportunities."),
+    "SRXC": ("The Safe Sprinter", "Simple and secure, you prefer clear short-term approaches with regular, predictable returns. Safety and consistency are your priorities."),
+    "SRXW": ("The Conservative Achiever", "You look for straightforward, low-risk short-term opportunities that can yield meaningful windfalls. Security meets ambition in your approach."),
+    "LRCC": ("The Patient Analyst", "You build complex, secure long-term strategies with consistent returns. Sophistication and safety define your patient approach to wealth building."),
+    "LRCW": ("The Methodical Planner", "Complex and conservative, you design long-term strategies for significant secure windfalls. You value both sophistication and stability."),
+    "LRXC": ("The Steady Builder", "Simple and secure, you prefer clear long-term approaches with regular progress. Patience, safety, and consistency are your foundation."),
+    "LRXW": ("The Reliable Achiever", "Straightforward and patient, you work toward major long-term windfalls with minimal risk. Clarity and security guide your journey to success."),
+}
+
+# Code for each combination of axis signs; bit i is set when axis i scores >= 0
+_CODES = np.array([
+    "".join(pair[0] if bits & (1 << axis) else pair[1] for axis, pair in enumerate(CODE_LETTERS))
+    for bits in range(1 << len(AXES))
+])
+_CODE_BIT_VALUES = 1 << np.arange(len(AXES))
+
+
+class QuizValidationError(ValueError):
+    """An answer set that doesn't fit the question table"""
+
+
+class QuizTableError(RuntimeError):
+    """The question table couldn't be read, so answers can't be scored"""
+
+
+_table: Optional[Dict[str, Any]] = None
+_scorers: Optional[Dict[str, "QuizScorer"]] = None
+_table_lock = threading.Lock()
+
+
+def quiz_table() -> Dict[str, Any]:
+    """
+    The question table (scale, percentFullScale and each role's questions), read on first use
+
+    A failed read isn't remembered, so fixing the file or QUIZ_TABLE_PATH
+    takes effect on the next call.
+
+    Raises:
+        QuizTableError: if the table can't be read
+    """
+    global _table, _scorers
+    if _table is not None:
+        return _table
+    with _table_lock:
+        if _table is None:
+            try:
+                with open(QUIZ_TABLE_PATH, encoding="utf-8") as f:
+                    table = json.load(f)
+                scorers = {role: QuizScorer(role, table[role], table["scale"]) for role in ROLES}
+            except (OSError, ValueError, KeyError) as e:
+                raise QuizTableError(f"Quiz question table unusable at {QUIZ_TABLE_PATH} (set QUIZ_TABLE_PATH): {e}") from e
+            _scorers = scorers
+            _table = table
+    return _table
+
+
+def get_scorers() -> Dict[str, "QuizScorer"]:
+    """
+    The scorer for each role, built from the question table on first use
+
+    Raises:
+        QuizTableError: if the table can't be read
+    """
+    quiz_table()
+    return _scorers
+
+
+def percent_full_scale() -> float:
+    """
+    Axis score shown as 0% / 100%, shared with getPercentages on the frontend
+    """
+    return quiz_table()["percentFullScale"]
+
+
+def personality_code(scores: Dict[str, float]) -> str:
+    """
+    4-letter personality code for a set of raw axis scores
+    """
+    return "".join(pair[0] if scores[axis] >= 0 else pair[1] for axis, pair in zip(AXES, CODE_LETTERS))
+
+
+def personality_type(code: str) -> Dict[str, str]:
+    """
+    Name, description, group and color for a personality code, as the frontend shows them
+    """
+    name, description = PERSONALITY_TYPES.get(code, (
+        "The Financial Explorer",
+        "Your unique combination of traits makes you adaptable and open to various financial strategies.",
+    ))
+    group, color = PERSONALITY_GROUPS.get(code[:2], ("", "hsl(var(--primary))"))
+    return {"code": code, "name": name, "description": description, "color": color, "group": group}
+
+
+class QuizScorer:
+    """
+    Scores answer sets for one role's quiz
+
+    Scoring is one matrix product: an (n, questions) matrix of answers, with
+    the neutral value subtracted, times a (questions, axes) weight matrix
+    holding +1 (or -1 for reversed questions) in each question's axis column.
+    Unanswered questions count as neutral, as they do in the frontend, so
+    thousands of answer sets are scored without a per-answer Python loop.
+    """
+
+    def __init__(self, role: str, questions: List[Dict[str, Any]], scale: Dict[str, int]):
+        self.role = role
+        self.questions = questions
+        self.low, self.high, self.neutral = scale["min"], scale["max"], scale["neutral"]
+        self.weights = np.zeros((len(questions), len(AXES)), dtype=np.float64)
+        for i, question in enumerate(questions):
+            self.weights[i, AXES.index(AXIS_KEYS[question["axis"]])] = -1.0 if question.get("reverse") else 1.0
+        # Largest score each axis can reach, in either direction
+        self.axis_limits = np.abs(self.weights).sum(axis=0) * max(self.high - self.neutral, self.neutral - self.low)
+        # Changes whenever a change to the table would change scores
+        scoring = [[q["axis"], bool(q.get("reverse"))] for q in questions] + [scale]
+        self.version = hashlib.blake2b(json.dumps(scoring, sort_keys=True).encode("utf-8"), digest_size=4).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def answers_matrix(self, answer_sets: Sequence[Iterable[Dict[str, Any]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pack answer lists as submitted ([{"questionIndex", "value"}, ...]) into a matrix
+
+        Args:
+            answer_sets: One list of answers per submission
+
+        Returns:
+            (answers, valid): an int8 (n, questions) matrix with 0 for
+            unanswered questions, and a bool array that is False for answer
+            sets with an unknown question, an out-of-scale value or a
+            question answered twice (their rows are left incomplete)
+        """
+        rows, indexes, values = [], [], []
+        for row, answers in enumerate(answer_sets):
+            for answer in answers:
+                rows.append(row)
+                indexes.append(_number(answer.get("questionIndex")) if isinstance(answer, dict) else np.nan)
+                values.append(_number(answer.get("value")) if isinstance(answer, dict) else np.nan)
+        count = len(answer_sets)
+        rows = np.array(rows, dtype=np.int64)
+        indexes = np.array(indexes, dtype=np.float64)
+        values = np.array(values, dtype=np.float64)
+
+        with np.errstate(invalid="ignore"):
+            ok = (
+                (indexes == np.floor(indexes)) & (indexes >= 0) & (indexes < len(self.questions))
+                & (values == np.floor(values)) & (values >= self.low) & (values <= self.high)
+            )
+        matrix = np.zeros((count, len(self.questions)), dtype=np.int8)
+        matrix[rows[ok], indexes[ok].astype(np.int64)] = values[ok]
+
+        invalid = np.zeros(count, dtype=bool)
+        invalid[rows[~ok]] = True
+        # A second answer to the same question
+        cells = rows[ok] * len(self.questions) + indexes[ok].astype(np.int64)
+        cells.sort()
+        invalid[cells[1:][cells[1:] == cells[:-1]] // len(self.questions)] = True
+        return matrix, ~invalid
+
+    def answer_vector(self, answers: Iterable[Dict[str, Any]]) -> List[int]:
+        """
+        One submitted answer list as a compact per-question list (0 = unanswered)
+
+        Raises:
+            QuizValidationError: if the answers don't fit this quiz
+        """
+        answers = list(answers)
+        if not answers:
+            raise QuizValidationError("quizAnswers is empty")
+        matrix, valid = self.answers_matrix([answers])
+        if not valid[0]:
+            raise QuizValidationError(
+                f"quizAnswers must answer questions 0-{len(self.questions) - 1} of the {self.role} quiz "
+                f"at most once, with whole values from {self.low} to {self.high}"
+            )
+        return matrix[0].tolist()
+
+    def score_matrix(self, answers: np.ndarray) -> np.ndarray:
+        """
+        Axis scores for an (n, questions) answers matrix (0 = unanswered)
+
+        Returns:
+            (n, 4) float array, columns in AXES order
+        """
+        answers = np.asarray(answers, dtype=np.float64)
+        centered = np.where(answers == 0, 0.0, answers - self.neutral)
+        return centered @ self.weights
+
+    def score_batch(self, answers: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Score and classify every row of an (n, questions) answers matrix
+
+        Returns:
+            Dictionary with "scores" ((n, 4) floats), "codes" ((n,) personality
+            codes) and "percentages" ((n, 4) ints, as getPercentages shows them)
+        """
+        scores = self.score_matrix(answers)
+        return {"scores": scores, "codes": classify_matrix(scores), "percentages": percentages_matrix(scores)}
+
+    def score(self, answers: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Score one submitted answer list
+
+        Returns:
+            Dictionary with answers (compact, see answer_vector), personalityScores,
+            personalityType and percentages
+
+        Raises:
+            QuizValidationError: if the answers don't fit this quiz
+        """
+        vector = self.answer_vector(answers)
+        batch = self.score_batch(np.array([vector]))
+        return {
+            "answers": vector,
+            "personalityScores": dict(zip(AXES, batch["scores"][0].tolist())),
+            "personalityType": personality_type(str(batch["codes"][0])),
+            "percentages": dict(zip(AXES, batch["percentages"][0].tolist())),
+        }
+
+
+def _number(value: Any) -> float:
+    # bool is an int subclass, but True isn't an answer
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+def classify_matrix(scores: np.ndarray) -> np.ndarray:
+    """
+    Personality codes for an (n, 4) matrix of axis scores
+    """
+    bits = (np.asarray(scores) >= 0).astype(np.int64) @ _CODE_BIT_VALUES
+    return _CODES[bits]
+
+
+def percentages_matrix(scores: np.ndarray) -> np.ndarray:
+    """
+    0-100 axis percentages for an (n, 4) matrix of axis scores, never exactly 50
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    full_scale = percent_full_scale()
+    # floor(x + 0.5) rounds halves up like Math.round
+    pct = np.floor((scores + full_scale) / (full_scale * 2) * 100 + 0.5)
+    pct = np.clip(pct, 0, 100).astype(np.int64)
+    pct[pct == 50] = 51
+    return pct
+
+
+def get_scorer(role: str) -> QuizScorer:
+    """
+    The scorer for a role's quiz
+
+    Raises:
+        QuizValidationError: for an unknown role
+        QuizTableError: if the question table can't be read
+    """
+    scorer = get_scorers().get(role)
+    if scorer is None:
+        raise QuizValidationError(f"role must be one of {', '.join(ROLES)}")
+    return scorer
+
+
+def axis_limits() -> np.ndarray:
+    """
+    Largest absolute score each axis (in AXES order) can reach in any role's quiz
+    """
+    return np.max([scorer.axis_limits for scorer in get_scorers().values()], axis=0)
+
+
+def score_answers(answers: Iterable[Dict[str, Any]], role: str) -> Dict[str, Any]:
+    """
+    Score one submitted answer list for a role (see QuizScorer.score)
+    """
+    return get_scorer(role).score(answers)
+
+
+def rescore_documents(documents: List[Dict[str, Any]]) -> int:
+    """
+    Re-score stored quiz results in place with the current question table
+
+    Documents are grouped by role and each group is scored as one matrix.
+    Documents without stored answers for the current quiz (saved before
+    answers were kept, or for a quiz with a different number of questions)
+    are left as they are.
+
+    Args:
+        documents: Quiz result documents (userId, role, answers, personalityScores, ...)
+
+    Returns:
+        Number of documents re-scored
+    """
+    rescored = 0
+    for role, scorer in get_scorers().items():
+        group = [
+            doc for doc in documents
+            if doc.get("role") == role and isinstance(doc.get("answers"), list) and len(doc["answers"]) == len(scorer)
+        ]
+        if not group:
+            continue
+        answers = np.array([doc["answers"] for doc in group], dtype=np.float64)
+        # Stored vectors went through answer_vector; anything else is skipped
+        usable = np.all((answers == 0) | ((answers >= scorer.low) & (answers <= scorer.high)), axis=1)
+        batch = scorer.score_batch(np.where(usable[:, None], answers, 0))
+        for doc, ok, scores, code in zip(group, usable, batch["scores"].tolist(), batch["codes"].tolist()):
+            if not ok:
+                continue
+            doc["personalityScores"] = dict(zip(AXES, scores))
+            previous = doc.get("personalityType") or {}
+            kind = personality_type(code)
+            doc["personalityType"] = {key: kind[key] for key in ("code", "name", "description", "color")}
+            doc["quizVersion"] = scorer.version
+            if previous.get("code") not in (None, code):
+                logger.debug("Quiz result of %s re-scored from %s to %s", doc.get("userId"), previous.get("code"), code)
+            rescored += 1
+    if len(documents) != rescored:
+        logger.debug("Re-scored %d of %d quiz results", rescored, len(documents))
+    return rescored
@@ -0,0 +1,444 @@
+from typing import Optional, Dict, List, Any, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from observability import get_logger, registry, route_template, add_upstream_listener, Counter, Gauge
+
+logger = get_logger("rate_limit")
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
+# "memory" keeps buckets per process; "sqlite" shares them (and quota counts) across uvicorn workers
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", str(Path(__file__).parent / "rate_limits.sqlite3"))
+# Use the first X-Forwarded-For address as the client (only behind a proxy that sets it)
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+# Fund endpoints: sustained requests per minute, and burst size, per client per route
+FUND_RATE_LIMIT_PER_MINUTE = float(os.getenv("FUND_RATE_LIMIT_PER_MINUTE", "120"))
+FUND_RATE_LIMIT_BURST = float(os.getenv("FUND_RATE_LIMIT_BURST", "60"))
+# Report endpoints can call Gemini, so they get a much smaller allowance
+REPORT_RATE_LIMIT_PER_MINUTE = float(os.getenv("REPORT_RATE_LIMIT_PER_MINUTE", "10"))
+REPORT_RATE_LIMIT_BURST = float(os.getenv("REPORT_RATE_LIMIT_BURST", "5"))
+# Provider quotas to track, as upstream:window=limit (windows: minute, hour, day in UTC).
+# Defaults are Gemini 2.5 Flash-Lite's free tier and a conservative Morningstar budget.
+UPSTREAM_QUOTAS = os.getenv("UPSTREAM_QUOTAS", "gemini:minute=15,gemini:day=1000,mstarpy:day=5000")
+# Log a warning when a quota window passes this fraction of its limit
+QUOTA_WARN_RATIO = float(os.getenv("QUOTA_WARN_RATIO", "0.8"))
+
+# Clients tracked in memory; the least recently seen are forgotten first (a full bucket)
+MAX_TRACKED_BUCKETS = 10000
+# SQLite buckets idle this long are full again and get deleted
+BUCKET_IDLE_SECONDS = 3600
+
+QUOTA_WINDOWS = {"minute": 60, "hour": 3600, "day": 86400}
+
+# Call names passed to track_upstream -> the provider whose quota they use
+UPSTREAM_PROVIDERS = (
+    ("mstarpy_", "mstarpy"),
+    ("gemini", "gemini"),
+    ("firestore_read", "firestore_read"),
+    ("firestore_commit", "firestore_commit"),
+)
+
+rate_limited_requests = registry.register(Counter(
+    "rate_limited_requests_total", "Requests rejected with 429 by the per-client rate limiter", ("route",),
+))
+
+
+class MemoryBucketStore:
+    """
+    Token buckets and quota windows in this process only
+    """
+
+    name = "memory"
+
+    def __init__(self, max_buckets: int = MAX_TRACKED_BUCKETS):
+        self.max_buckets = max_buckets
+        self._lock = threading.Lock()
+        # key -> (tokens, updated_at)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        # (upstream, window) -> (window_start, count)
+        self._windows: Dict[Tuple[str, str], Tuple[float, int]] = {}
+
+    def take(self, key: str, rate: float, burst: float, now: float) -> Tuple[bool, float]:
+        """
+        Take one token from `key`'s bucket
+
+        Returns:
+            (allowed, seconds until a token is available if not)
+        """
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            allowed, tokens, retry_after = _refill_and_take(tokens, updated, rate, burst, now)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def add(self, upstream: str, window: str, window_start: float) -> int:
+        """
+        Count one call in a quota window; returns the window's count so far
+        """
+        with self._lock:
+            start, count = self._windows.get((upstream, window), (window_start, 0))
+            count = count + 1 if start == window_start else 1
+            self._windows[(upstream, window)] = (window_start, count)
+        return count
+
+    def count(self, upstream: str, window: str, window_start: float) -> int:
+        with self._lock:
+            start, count = self._windows.get((upstream, window), (window_start, 0))
+        return count if start == window_start else 0
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._buckets)
+
+
+class SqliteBucketStore:
+    """
+    Token buckets and quota windows in a SQLite file (WAL), shared by every
+    worker process using the same path
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._takes = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS quota_windows ("
+            "upstream TEXT NOT NULL, window TEXT NOT NULL, window_start REAL NOT NULL, "
+            "count INTEGER NOT NULL, PRIMARY KEY (upstream, window))"
+        )
+
+    def take(self, key: str, rate: float, burst: float, now: float) -> Tuple[bool, float]:
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front, so concurrent workers can't both spend the last token
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row is not None else (burst, now)
+            allowed, tokens, retry_after = _refill_and_take(tokens, updated, rate, burst, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+            self._takes += 1
+            if self._takes % 1000 == 0:
+                conn.execute("DELETE FROM rate_buckets WHERE updated_at < ?", (now - BUCKET_IDLE_SECONDS,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+    def add(self, upstream: str, window: str, window_start: float) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO quota_windows (upstream, window, window_start, count) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT (upstream, window) DO UPDATE SET "
+                "count = CASE WHEN window_start = excluded.window_start THEN count + 1 ELSE 1 END, "
+                "window_start = excluded.window_start",
+                (upstream, window, window_start),
+            )
+            count = conn.execute(
+                "SELECT count FROM quota_windows WHERE upstream = ? AND window = ?", (upstream, window)
+            ).fetchone()[0]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def count(self, upstream: str, window: str, window_start: float) -> int:
+        row = self._conn().execute(
+            "SELECT count FROM quota_windows WHERE upstream = ? AND window = ? AND window_start = ?",
+            (upstream, window, window_start),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; isolation_level=None so transactions are explicit
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=2, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+def _refill_and_take(tokens: float, updated: float, rate: float, burst: float, now: float) -> Tuple[bool, float, float]:
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate if rate > 0 else math.inf
+
+
+def make_store(backend: str = RATE_LIMIT_BACKEND, db_path: str = RATE_LIMIT_DB_PATH):
+    """
+    The configured bucket store, falling back to memory if SQLite can't be opened
+    """
+    if backend == "sqlite":
+        try:
+            return SqliteBucketStore(db_path)
+        except sqlite3.Error as e:
+            logger.warning("Can't open rate limit database %s (%s); limits are per process", db_path, e)
+    return MemoryBucketStore()
+
+
+class RateLimiter:
+    """
+    Token-bucket limits per client and per route
+
+    Each (client, route) pair has its own bucket of `burst` requests, refilled
+    at the route's per-minute rate. Routes without a limit aren't counted.
+    If the store fails, requests are allowed rather than rejected.
+    """
+
+    def __init__(self, store, limits: Dict[str, Tuple[float, float]]):
+        self.store = store
+        # route template -> (requests per minute, burst)
+        self.limits = limits
+        self._limited: Dict[str, int] = {}
+
+    async def check(self, client: str, route: str) -> Tuple[bool, float]:
+        """
+        Returns:
+            (allowed, seconds until the client may retry)
+        """
+        limit = self.limits.get(route)
+        if limit is None:
+            return True, 0.0
+        per_minute, burst = limit
+        args = (f"{client}|{route}", per_minute / 60, burst, time.time())
+        try:
+            if isinstance(self.store, MemoryBucketStore):
+                allowed, retry_after = self.store.take(*args)
+            else:
+                allowed, retry_after = await asyncio.to_thread(self.store.take, *args)
+        except Exception as e:
+            logger.warning("Rate limit check failed for %s: %s", route, e)
+            return True, 0.0
+        if not allowed:
+            self._limited[route] = self._limited.get(route, 0) + 1
+            rate_limited_requests.inc(route)
+        return allowed, retry_after
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            tracked = self.store.size()
+        except Exception:
+            tracked = None
+        return {
+            "backend": self.store.name,
+            "trackedBuckets": tracked,
+            "limits": {route: {"perMinute": per_minute, "burst": burst} for route, (per_minute, burst) in self.limits.items()},
+            "limited": dict(self._limited),
+        }
+
+
+def client_address(scope) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware answering 429 (with Retry-After) once a client's bucket
+    for a route is empty
+    """
+
+    def __init__(self, app, router, limiter: RateLimiter):
+        self.app = app
+        self.router = router
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        # Preflights carry no work, and must succeed for the real request to be limited properly
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        route = route_template(self.router, scope)
+        allowed, retry_after = await self.limiter.check(client_address(scope), route)
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"error": f"Rate limit exceeded for {route}; retry in {math.ceil(retry_after)}s"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class UpstreamQuotas:
+    """
+    Counts upstream calls in fixed UTC windows against provider quotas
+
+    Only counts and reports; nothing is blocked when a quota runs out (the
+    circuit breakers handle the provider's 429s). Gemini's daily quota resets
+    at midnight Pacific time, so the "day" window is an approximation there.
+    """
+
+    def __init__(self, store, quotas: Dict[Tuple[str, str], int], warn_ratio: float = QUOTA_WARN_RATIO):
+        self.store = store
+        # (upstream, window) -> limit
+        self.quotas = quotas
+        self.warn_ratio = warn_ratio
+        self._lock = threading.Lock()
+        # (upstream, window) -> window_start already warned about
+        self._warned: Dict[Tuple[str, str], float] = {}
+
+    def record(self, call: str) -> None:
+        """
+        Count one call (a track_upstream name such as "mstarpy_nav")
+        """
+        upstream = provider_for(call)
+        now = time.time()
+        for (name, window), limit in self.quotas.items():
+            if name != upstream:
+                continue
+            start = _window_start(window, now)
+            try:
+                count = self.store.add(name, window, start)
+            except Exception as e:
+                logger.warning("Quota accounting failed for %s: %s", name, e)
+                continue
+            if count >= limit * self.warn_ratio:
+                self._warn(name, window, start, count, limit)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Calls used and remaining in each current window, per upstream
+        """
+        now = time.time()
+        status: Dict[str, Dict[str, Any]] = {}
+        for (name, window), limit in self.quotas.items():
+            start = _window_start(window, now)
+            try:
+                used = self.store.count(name, window, start)
+            except Exception:
+                used = None
+            status.setdefault(name, {})[window] = {
+                "used": used,
+                "limit": limit,
+                "remaining": max(0, limit - used) if used is not None else None,
+                "utilization": round(used / limit, 3) if used is not None and limit else None,
+                "resetsInSeconds": round(start + QUOTA_WINDOWS[window] - now),
+            }
+        return status
+
+    def _warn(self, name: str, window: str, start: float, count: int, limit: int) -> None:
+        with self._lock:
+            if self._warned.get((name, window)) == start:
+                return
+            self._warned[(name, window)] = start
+        logger.warning("%s has used %d of its %d calls per %s", name, count, limit, window)
+
+
+def provider_for(call: str) -> str:
+    for prefix, provider in UPSTREAM_PROVIDERS:
+        if call.startswith(prefix):
+            return provider
+    return call
+
+
+def _window_start(window: str, now: float) -> float:
+    seconds = QUOTA_WINDOWS[window]
+    return float(int(now // seconds) * seconds)
+
+
+def parse_quotas(spec: str) -> Dict[Tuple[str, str], int]:
+    """
+    Parse "gemini:minute=15,gemini:day=1000" into {("gemini", "minute"): 15, ...}
+    """
+    quotas: Dict[Tuple[str, str], int] = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            name, rest = entry.split(":", 1)
+            window, limit = rest.split("=", 1)
+            if window not in QUOTA_WINDOWS:
+                raise ValueError(f"window must be one of {', '.join(QUOTA_WINDOWS)}")
+            quotas[(name.strip(), window.strip())] = int(limit)
+        except ValueError as e:
+            logger.warning("Ignoring upstream quota %r: %s", entry, e)
+    return quotas
+
+
+FUND_LIMIT = (FUND_RATE_LIMIT_PER_MINUTE, FUND_RATE_LIMIT_BURST)
+REPORT_LIMIT = (REPORT_RATE_LIMIT_PER_MINUTE, REPORT_RATE_LIMIT_BURST)
+ROUTE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "/api/fund/{ticker}": FUND_LIMIT,
+    "/api/fund/{ticker}/nav": FUND_LIMIT,
+    "/api/fund/{ticker}/nav/stream": FUND_LIMIT,
+    "/api/fund/{ticker}/holdings": FUND_LIMIT,
+    "/api/funds": FUND_LIMIT,
+    "/api/analytics": FUND_LIMIT,
+    "/generate_investor_report": REPORT_LIMIT,
+    "/generate_investor_report/stream": REPORT_LIMIT,
+}
+
+_store = make_store()
+rate_limiter = RateLimiter(_store, ROUTE_LIMITS)
+upstream_quotas = UpstreamQuotas(_store, parse_quotas(UPSTREAM_QUOTAS))
+add_upstream_listener(upstream_quotas.record)
+
+
+def _quota_values(field: str) -> Dict[Tuple[str, ...], float]:
+    return {
+        (name, window): entry[field]
+        for name, windows in upstream_quotas.status().items()
+        for window, entry in windows.items()
+        if entry[field] is not None
+    }
+
+
+registry.register(Gauge(
+    "upstream_quota_used", "Upstream calls made in the current quota window", ("upstream", "window"),
+    collect=lambda: _quota_values("used"),
+))
+registry.register(Gauge(
+    "upstream_quota_limit", "Upstream calls allowed per quota window", ("upstream", "window"),
+    collect=lambda: _quota_values("limit"),
+))
+
+
+def get_rate_limit_stats() -> Dict[str, Any]:
+    return {"enabled": RATE_LIMIT_ENABLED, **rate_limiter.stats()}
+
+
+def get_quota_status() -> Dict[str, Dict[str, Any]]:
+    return upstream_quotas.status()
@@ -0,0 +1,587 @@
+from typing import Optional, Dict, List, Any, AsyncIterator, Tuple
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from caching import TieredCache, AsyncSingleFlight
+from observability import get_logger, track_upstream, timed_upstream
+from quiz_scoring import AXES, percentages_matrix
+from report_templates import report_templates
+from resilience import UpstreamGuard, is_network_error
+from subsystems import LazySubsystem
+from upstream_pool import upstream_pool
+
+logger = get_logger("report_service")
+
+GEMINI_MODEL = "gemini-2.5-flash-lite"
+# LLM calls are much slower than fund lookups, so they get their own timeout
+GEMINI_CALL_TIMEOUT = float(os.getenv("GEMINI_CALL_TIMEOUT", "60"))
+# Attempts per report for overload/timeout errors; each one can take seconds
+GEMINI_RETRY_ATTEMPTS = int(os.getenv("GEMINI_RETRY_ATTEMPTS", "2"))
+# google.api_core errors worth retrying; others (bad key, blocked prompt) aren't
+GEMINI_TRANSIENT_ERRORS = ("ServiceUnavailable", "ResourceExhausted", "DeadlineExceeded", "InternalServerError", "TooManyRequests")
+
+# Bump whenever the prompt or the expected report shape changes; cached
+# reports from other versions are ignored
+REPORT_PROMPT_VERSION = "v1"
+# Reports only change when the prompt version does, so keep them for a long time
+REPORT_CACHE_TTL_SECONDS = int(os.getenv("REPORT_CACHE_TTL_SECONDS", str(30 * 86400)))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "2048"))
+# SQLite file for cached reports; set to an empty string to keep them in memory only
+REPORT_CACHE_DB_PATH = os.getenv("REPORT_CACHE_DB_PATH", str(Path(__file__).parent / "report_cache.sqlite3"))
+# Round axis percentages to this step before prompting (1 = exact) so more users share a report
+REPORT_PCT_BUCKET = max(1, int(os.getenv("REPORT_PCT_BUCKET", "1")))
+# Longest a report request waits for Gemini before getting the precomputed
+# template instead (Gemini's answer is still cached for next time); 0 waits
+# for Gemini however long it takes
+REPORT_LATENCY_BUDGET_SECONDS = float(os.getenv("REPORT_LATENCY_BUDGET_SECONDS", "8"))
+
+report_cache = TieredCache(
+    max_entries=REPORT_CACHE_MAX_ENTRIES,
+    db_path=REPORT_CACHE_DB_PATH or None,
+    stale_seconds=0,
+    table="report_cache",
+)
+report_flights = AsyncSingleFlight()
+# Generations still running after their request was answered from a template, by report key
+_background_reports: Dict[Tuple[str, str], "asyncio.Task[Any]"] = {}
+_template_stats = {"overBudget": 0, "failed": 0, "unparseable": 0, "backgroundCompleted": 0}
+gemini_guard = UpstreamGuard(
+    "gemini",
+    transient=lambda e: is_network_error(e, GEMINI_TRANSIENT_ERRORS),
+    attempts=GEMINI_RETRY_ATTEMPTS,
+)
+
+
+def _load_gemini():
+    # google.generativeai takes about a second to import, so it's loaded on
+    # first use or by the startup task rather than at import
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return None
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai
+
+
+gemini_lib = LazySubsystem("gemini", _load_gemini)
+
+
+def axis_percentages(scores: Dict[str, float]) -> Dict[str, int]:
+    """
+    Convert raw axis scores to 0-100 percentages, as the results page shows
+    them (see percentages_matrix), rounded to REPORT_PCT_BUCKET
+
+    Args:
+        scores: Dictionary with shortTermVsLongTerm, highRiskVsLowRisk,
+            clarityVsComplexity and consistentVsLumpSum
+
+    Returns:
+        Dictionary with time, risk, complexity and strategy percentages
+    """
+    pcts = percentages_matrix([[scores[axis] for axis in AXES]])[0].tolist()
+    bucketed = [int(round(value / REPORT_PCT_BUCKET) * REPORT_PCT_BUCKET) for value in pcts]
+    return dict(zip(("time", "risk", "complexity", "strategy"), bucketed))
+
+
+def report_cache_key(code: str, name: str, description: str, pcts: Dict[str, int], role: str) -> Tuple[str, str]:
+    """
+    Cache key for a report: a hash of everything that goes into the prompt
+    """
+    inputs = {
+        "version": REPORT_PROMPT_VERSION,
+        "code": code,
+        "name": name,
+        "description": description,
+        "pcts": [pcts["time"], pcts["risk"], pcts["complexity"], pcts["strategy"]],
+        "role": role.strip().lower(),
+    }
+    digest = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+    return ("report", digest)
+
+
+def build_report_prompt(code: str, name: str, description: str, pcts: Dict[str, int], role: str) -> str:
+    return f"""
+Generate a detailed investor personality report based on the following data.
+
+### Personality Code
+{code} — {name}
+
+### Description
+{description}
+
+### Axis Percentages (0-100%):
+- Time Horizon (Short → Long): {pcts["time"]}%
+- Risk Tolerance (Risky → Conservative): {pcts["risk"]}%
+- Complexity Preference (Simple → Complex): {pcts["complexity"]}%
+- Strategy Preference (Gradual → Lump Sum): {pcts["strategy"]}%
+
+### User Role
+{role}
+
+### REQUIREMENTS
+Produce thoughtful, complete insights. Each "dimensions" entry MUST include:
+- "dominantLabel": a clear interpretation of the score
+- "description": 3–5 sentences explaining how this trait influences investing
+- "strengths": 2–4 strengths specifically tied to that dimension
+- "weaknesses": 2–4 weaknesses or vulnerabilities
+- "blindSpots": 1–3 potential blind spots or risks caused by that dimension
+
+Descriptions must be specific, behavioral, and investment-focused.
+
+### REQUIRED JSON FORMAT (no markdown):
+
+{{
+  "strengths": [],
+  "weaknesses": [],
+  "strategies": [],
+  "behaviors": [],
+  "advisorTips": [],
+  "dimensions": {{
+    "timeHorizon": {{
+      "dominantLabel": "",
+      "description": "",
+      "strengths": [],
+      "weaknesses": [],
+      "blindSpots": []
+    }},
+    "riskTolerance": {{
+      "dominantLabel": "",
+      "description": "",
+      "strengths": [],
+      "weaknesses": [],
+      "blindSpots": []
+    }},
+    "complexity": {{
+      "dominantLabel": "",
+      "description": "",
+      "strengths": [],
+      "weaknesses": [],
+      "blindSpots": []
+    }},
+    "consistency": {{
+      "dominantLabel": "",
+      "description": "",
+      "strengths": [],
+      "weaknesses": [],
+      "blindSpots": []
+    }}
+  }}
+}}
+
+Return ONLY valid JSON — no notes, no extra text.
+"""
+
+
+def parse_report_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse the model output as JSON, recovering the outermost {...} if the
+    model wrapped it in commentary or extra tokens. Returns None on failure.
+    """
+    try:
+        return json.loads(text)
+    except Exception:
+        # Attempt to extract the first JSON object from the text by finding
+        # the first '{' and the last '}' and parsing that substring.
+        first = text.find('{')
+        last = text.rfind('}')
+        if first != -1 and last != -1 and last > first:
+            candidate = text[first:last+1]
+            try:
+                return json.loads(candidate)
+            except Exception:
+                pass
+    return None
+
+
+class ReportSectionParser:
+    """
+    Incremental scanner for a streamed report JSON object
+
+    feed() takes the next chunk of model output and returns every section
+    completed by it: top-level keys (e.g. "strengths") and each entry of
+    "dimensions" (e.g. "dimensions.riskTolerance"). Text before the opening
+    brace, such as a markdown fence, is skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[Dict[str, Any]] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self.finished = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        self._buffer += text
+        sections: List[Tuple[str, Any]] = []
+        buf = self._buffer
+        while self._pos < len(buf) and not self.finished:
+            i = self._pos
+            c = buf[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    top = self._stack[-1]
+                    if top["reading_key"]:
+                        top["reading_key"] = False
+                        key = self._loads(buf[self._string_start:i + 1])
+                        top["key"] = key if isinstance(key, str) else None
+                    else:
+                        self._complete(top, i + 1, sections)
+                continue
+
+            if not self._stack:
+                if c == "{":
+                    self._stack.append(self._frame("{"))
+                continue
+
+            top = self._stack[-1]
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                if top["open"] == "{" and not top["after_colon"]:
+                    top["reading_key"] = True
+                elif top["value_start"] is None:
+                    top["value_start"] = i
+            elif c in "{[":
+                if top["value_start"] is None:
+                    top["value_start"] = i
+                self._stack.append(self._frame(c))
+            elif c in "}]":
+                self._complete(top, i, sections)
+                self._stack.pop()
+                if not self._stack:
+                    self.finished = True
+                else:
+                    self._complete(self._stack[-1], i + 1, sections)
+            elif c == ":":
+                top["after_colon"] = True
+            elif c == ",":
+                self._complete(top, i, sections)
+                top["after_colon"] = False
+                top["key"] = None
+            elif not c.isspace() and top["value_start"] is None:
+                # Start of a number / true / false / null
+                top["value_start"] = i
+        return sections
+
+    @staticmethod
+    def _frame(open_char: str) -> Dict[str, Any]:
+        return {"open": open_char, "key": None, "reading_key": False, "after_colon": False, "value_start": None}
+
+    _INVALID = object()
+
+    @classmethod
+    def _loads(cls, text: str) -> Any:
+        try:
+            return json.loads(text)
+        except ValueError:
+            return cls._INVALID
+
+    def _complete(self, frame: Dict[str, Any], end: int, sections: List[Tuple[str, Any]]) -> None:
+        start = frame["value_start"]
+        if start is None:
+            return
+        frame["value_start"] = None
+        # `frame` is always the innermost open container
+        path = [f["key"] for f in self._stack]
+        if (len(path) == 1 and path[0] != "dimensions") or (len(path) == 2 and path[0] == "dimensions"):
+            value = self._loads(self._buffer[start:end].strip())
+            if value is not self._INVALID and all(isinstance(k, str) for k in path):
+                sections.append((".".join(path), value))
+
+
+def report_sections(report: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """
+    Split a finished report into the same sections ReportSectionParser emits
+    """
+    sections = []
+    for key, value in report.items():
+        if key == "dimensions" and isinstance(value, dict):
+            sections.extend((f"dimensions.{name}", entry) for name, entry in value.items())
+        else:
+            sections.append((key, value))
+    return sections
+
+
+def missing_key_report() -> Dict[str, Any]:
+    return {
+        "error": "Gemini API key not configured",
+        "dimensions": {
+            "timeHorizon": {"dominantLabel": "Long-Term", "description": "AI analysis unavailable - API key not configured."},
+            "riskTolerance": {"dominantLabel": "Low Risk", "description": "AI analysis unavailable - API key not configured."},
+            "complexity": {"dominantLabel": "Simple", "description": "AI analysis unavailable - API key not configured."},
+            "consistency": {"dominantLabel": "Consistent", "description": "AI analysis unavailable - API key not configured."}
+        }
+    }
+
+
+def fallback_report(code: str, pcts: Dict[str, int], role: str, text: Optional[str]) -> Dict[str, Any]:
+    """
+    The precomputed template report, for when the model output can't be
+    parsed. Keeps the raw output under `raw` for debugging.
+    """
+    return {**report_templates.get(code, pcts, role), "raw": text[:500] if text else "No response from AI"}
+
+
+def _finish_in_background(flight: "asyncio.Task[Any]", key: Tuple[str, str], code: str) -> None:
+    """
+    Let a generation that outlived its request run on; generate() caches its result
+    """
+    if key in _background_reports:
+        # Another request's wait on the same coalesced generation; just retrieve its outcome
+        flight.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return
+    _background_reports[key] = flight
+
+    def done(task: "asyncio.Task[Any]") -> None:
+        _background_reports.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is None:
+            _template_stats["backgroundCompleted"] += 1
+            logger.info("Report for %s finished after its request got a template; cached for next time", code)
+
+    flight.add_done_callback(done)
+
+
+async def generate_report(
+    code: str,
+    name: str,
+    description: str,
+    scores: Dict[str, float],
+    role: str,
+    latency_budget: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Get the investor report for a personality, from the cache when possible
+
+    Reports are cached by a hash of the prompt inputs, and identical requests
+    that arrive while a report is being generated share one Gemini call.
+    If Gemini hasn't answered within REPORT_LATENCY_BUDGET_SECONDS, the
+    precomputed template report is returned with "template": True and the
+    generation carries on in the background to fill the cache. If Gemini
+    fails or its circuit is open, an expired cached report for the same
+    inputs is returned with "stale": True, or else the template. Templates
+    (including the fallback for unparseable model output) aren't cached.
+
+    Args:
+        code: 4-letter personality code
+        name: Personality type name
+        description: Personality type description
+        scores: Raw axis scores (see axis_percentages)
+        role: "investor" or "advisor"
+        latency_budget: Seconds to wait for Gemini before serving the template
+            (None for REPORT_LATENCY_BUDGET_SECONDS, 0 to wait however long it takes)
+
+    Returns:
+        Report dictionary (strengths, weaknesses, ..., dimensions)
+    """
+    budget = REPORT_LATENCY_BUDGET_SECONDS if latency_budget is None else latency_budget
+    if not os.getenv("GEMINI_API_KEY"):
+        logger.error("GEMINI_API_KEY not found")
+        return missing_key_report()
+
+    pcts = axis_percentages(scores)
+    key = report_cache_key(code, name, description, pcts, role)
+    cached = report_cache.get(key)
+    if cached is not None:
+        logger.debug("Report cache hit for %s", code)
+        return cached
+
+    async def generate() -> Dict[str, Any]:
+        prompt = build_report_prompt(code, name, description, pcts, role)
+        started = time.perf_counter()
+        try:
+            genai = await gemini_lib.get_async()
+            model = genai.GenerativeModel(GEMINI_MODEL)
+            call = timed_upstream("gemini")(model.generate_content)
+            response = await upstream_pool.run(
+                gemini_guard.call, None, lambda: call(prompt), timeout=GEMINI_CALL_TIMEOUT
+            )
+            text = response.text
+            logger.info("Gemini response for %s received in %.2fs", code, time.perf_counter() - started)
+        except Exception as e:
+            logger.error("Error calling Gemini API: %s", e)
+            raise
+
+        # Raw model output, for debugging prompt changes (LOG_LEVEL=DEBUG)
+        logger.debug("Gemini output for %s: %s", code, text)
+
+        report = parse_report_json(text)
+        if report is None:
+            logger.warning("Report JSON parsing failed for %s, returning fallback", code)
+            _template_stats["unparseable"] += 1
+            return fallback_report(code, pcts, role, text)
+
+        report_cache.set(key, report, REPORT_CACHE_TTL_SECONDS)
+        return report
+
+    # Shielded so a request that stops waiting (budget or disconnect) doesn't cancel the generation
+    flight = asyncio.ensure_future(report_flights.do(key, generate))
+    try:
+        return await asyncio.wait_for(asyncio.shield(flight), budget or None)
+    except asyncio.CancelledError:
+        _finish_in_background(flight, key, code)
+        raise
+    except Exception:
+        # Still running means over budget (a generation that hit its own timeout is done)
+        over_budget = not flight.done()
+        if over_budget:
+            _finish_in_background(flight, key, code)
+        stale = _last_known_report(key)
+        if stale is not None:
+            return stale
+        if over_budget:
+            logger.warning("No report from Gemini for %s within %.1fs, serving the template", code, budget)
+            _template_stats["overBudget"] += 1
+        else:
+            logger.warning("Gemini unavailable and no cached report for %s, serving the template", code)
+            _template_stats["failed"] += 1
+        return report_templates.get(code, pcts, role)
+
+
+def _last_known_report(key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+    """
+    An expired cached report for `key`, marked stale, to serve while Gemini is down
+    """
+    report = report_cache.peek(key)
+    if report is None:
+        return None
+    logger.warning("Gemini unavailable, serving stale report %s", key[1][:12])
+    return {**report, "stale": True}
+
+
+async def _stream_gemini(prompt: str) -> AsyncIterator[str]:
+    """
+    Yield text chunks from Gemini's streaming generation
+
+    The blocking stream is consumed on the upstream pool and handed back to
+    the event loop through a queue.
+    """
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue[Any]" = asyncio.Queue()
+    done = object()
+
+    def pump() -> None:
+        model = gemini_lib.get().GenerativeModel(GEMINI_MODEL)
+        with track_upstream("gemini_stream"):
+            for chunk in model.generate_content(prompt, stream=True):
+                loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+
+    # No retries: chunks already sent can't be taken back
+    task = asyncio.ensure_future(upstream_pool.run(gemini_guard.call, None, pump, attempts=1, timeout=GEMINI_CALL_TIMEOUT))
+    task.add_done_callback(lambda _: queue.put_nowait(done))
+    while True:
+        text = await queue.get()
+        if text is done:
+            break
+        yield text
+    # Surface pool saturation, timeouts and Gemini errors
+    await task
+
+
+async def stream_report(code: str, name: str, description: str, scores: Dict[str, float], role: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream an investor report as (event, data) pairs for server-sent events
+
+    Emits a "section" event for each top-level section and each dimensions
+    entry as soon as it is complete, then a "done" event carrying the full
+    report and timings. Cached reports are replayed immediately; freshly
+    generated ones are cached like generate_report's. If Gemini fails before
+    sending anything, an expired cached report is replayed with "stale": True,
+    or else the template report.
+    """
+    if not os.getenv("GEMINI_API_KEY"):
+        logger.error("GEMINI_API_KEY not found")
+        yield "done", {"report": missing_key_report()}
+        return
+
+    pcts = axis_percentages(scores)
+    key = report_cache_key(code, name, description, pcts, role)
+    cached = report_cache.get(key)
+    if cached is not None:
+        logger.debug("Report cache hit for %s", code)
+        for section, value in report_sections(cached):
+            yield "section", {"key": section, "value": value}
+        yield "done", {"report": cached, "cached": True}
+        return
+
+    prompt = build_report_prompt(code, name, description, pcts, role)
+    parser = ReportSectionParser()
+    chunks: List[str] = []
+    started = time.perf_counter()
+    first_content = None
+
+    logger.debug("Streaming report for %s from Gemini", code)
+    try:
+        async for text in _stream_gemini(prompt):
+            chunks.append(text)
+            for section, value in parser.feed(text):
+                if first_content is None:
+                    first_content = time.perf_counter() - started
+                yield "section", {"key": section, "value": value}
+    except Exception:
+        if chunks:
+            raise
+        stale = _last_known_report(key)
+        if stale is None:
+            logger.warning("Gemini unavailable and no cached report for %s, streaming the template", code)
+            _template_stats["failed"] += 1
+            stale = report_templates.get(code, pcts, role)
+        for section, value in report_sections(stale):
+            if section not in ("stale", "template"):
+                yield "section", {"key": section, "value": value}
+        yield "done", {"report": stale, "cached": True}
+        return
+
+    total = time.perf_counter() - started
+    ttfc = f"{first_content:.2f}s" if first_content is not None else "n/a"
+    logger.info("Report stream for %s finished: first section %s, total %.2fs", code, ttfc, total)
+
+    text = "".join(chunks)
+    report = parse_report_json(text)
+    if report is None:
+        logger.warning("Report JSON parsing failed for %s, returning fallback", code)
+        _template_stats["unparseable"] += 1
+        report = fallback_report(code, pcts, role, text)
+    else:
+        report_cache.set(key, report, REPORT_CACHE_TTL_SECONDS)
+
+    yield "done", {
+        "report": report,
+        "cached": False,
+        "timeToFirstSectionMs": round(first_content * 1000) if first_content is not None else None,
+        "totalMs": round(total * 1000),
+    }
+
+
+def get_report_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters for the report cache, Gemini call coalescing and template use
+    """
+    return {
+        **report_cache.stats(),
+        "promptVersion": REPORT_PROMPT_VERSION,
+        "flights": report_flights.stats(),
+        "latencyBudgetSeconds": REPORT_LATENCY_BUDGET_SECONDS,
+        "templates": {**report_templates.stats(), **_template_stats, "backgroundRunning": len(_background_reports)},
+    }
+
+
+def get_gemini_breaker_status() -> Dict[str, Any]:
+    """
+    Gemini circuit breaker state and retry budget
+    """
+    return gemini_guard.status()
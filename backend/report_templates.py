@@ -0,0 +1,284 @@
+"""
+Precomputed investor reports, served when Gemini is slow or unavailable
+
+There is one report per personality code, role and strength band on each
+axis (how far the axis percentage is from 50%), written from the phrase
+tables below with the same shape as a Gemini report. They're built in
+memory at startup (about 65ms), so they always match the phrase tables.
+"""
+from typing import Optional, Dict, List, Any, Tuple
+import copy
+import itertools
+import threading
+import time
+
+from observability import get_logger
+from quiz_scoring import CODE_LETTERS, PERSONALITY_TYPES, ROLES
+
+logger = get_logger("report_templates")
+
+# Report dimension for each axis percentage, in personality code order
+DIMENSIONS = (("timeHorizon", "time"), ("riskTolerance", "risk"), ("complexity", "complexity"), ("consistency", "strategy"))
+# Distance of an axis percentage from 50 at which each band starts
+BANDS = (("slight", 0), ("moderate", 15), ("strong", 30))
+INTENSITY = {
+    "slight": "You lean slightly toward",
+    "moderate": "You clearly favor",
+    "strong": "You strongly favor",
+}
+
+# For each dimension and code letter: the label, the preference (completing
+# an INTENSITY phrase), the rest of the description, list entries, and what
+# to add for a mild or a strong preference
+SIDES: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "timeHorizon": {
+        "L": {
+            "label": "Long-Term",
+            "preference": "long horizons over quick results",
+            "description": "You are willing to let investments compound for years and judge progress over full market cycles rather than months. Short-term swings matter less to you than where the plan ends up, which makes it easier to stay invested through downturns.",
+            "slight": "Because the preference is mild, you can still act on nearer-term goals when they matter.",
+            "strong": "Because the preference is strong, near-term needs such as cash reserves can get less attention than they deserve.",
+            "strengths": ["Patience to let compounding work", "Stays invested through market downturns", "Plans around goals years away"],
+            "weaknesses": ["May underfund near-term needs", "Can be slow to react when a holding's thesis breaks"],
+            "blindSpots": ["Assuming the long run always rescues a poor investment", "Overlooking liquidity for emergencies"],
+            "strategy": "Automate contributions to broad, low-cost index funds and review them yearly rather than daily",
+            "behavior": "Checks the portfolio infrequently and rarely trades on news",
+            "tips": {
+                "investor": "Keep a separate cash reserve so long-term holdings never have to be sold at a bad time",
+                "advisor": "Frame recommendations around multi-year milestones and remind clients of cash needs along the way",
+            },
+        },
+        "S": {
+            "label": "Short-Term",
+            "preference": "visible results in the near term",
+            "description": "You like to see progress within months and are motivated by goals that are close enough to track. You adjust quickly when circumstances change, which keeps your money aligned with what you need now.",
+            "slight": "Because the preference is mild, you can still commit to a longer plan when the payoff is clear.",
+            "strong": "Because the preference is strong, frequent changes can cost more in fees, taxes and missed recoveries than they gain.",
+            "strengths": ["Responds quickly to changing circumstances", "Keeps money matched to near-term goals", "Notices when something stops working"],
+            "weaknesses": ["Trading costs and taxes from frequent changes", "May sell during temporary declines"],
+            "blindSpots": ["Underestimating how much compounding adds over decades", "Mistaking short-term noise for a trend"],
+            "strategy": "Split money into a near-term bucket for upcoming goals and a long-term bucket that is left alone",
+            "behavior": "Tracks performance often and is drawn to acting on recent moves",
+            "tips": {
+                "investor": "Set rules in advance for when you will trade so decisions aren't driven by the latest move",
+                "advisor": "Show clients short-term progress markers while keeping part of the portfolio on a long-term path",
+            },
+        },
+    },
+    "riskTolerance": {
+        "R": {
+            "label": "Low Risk",
+            "preference": "stability and protecting what you have",
+            "description": "Avoiding losses matters more to you than chasing the highest return. You prefer investments whose range of outcomes is narrow and understandable, and you sleep better knowing the downside is limited.",
+            "slight": "Because the preference is mild, you can accept some volatility when the expected reward justifies it.",
+            "strong": "Because the preference is strong, holding too little growth can leave returns behind inflation.",
+            "strengths": ["Protects capital in downturns", "Avoids speculative losses", "Keeps a steady, calm approach"],
+            "weaknesses": ["Returns may trail inflation over long periods", "May miss growth opportunities"],
+            "blindSpots": ["Treating cash as risk-free despite inflation", "Underweighting the cost of being too conservative"],
+            "strategy": "Anchor the portfolio in diversified bond and dividend funds with a measured allocation to broad equities",
+            "behavior": "Prefers established funds and avoids concentrated or leveraged positions",
+            "tips": {
+                "investor": "Check that your mix still grows faster than inflation, not just that it avoids losses",
+                "advisor": "Quantify the long-run cost of excess caution so clients can choose their risk knowingly",
+            },
+        },
+        "H": {
+            "label": "High Risk",
+            "preference": "higher potential returns over stability",
+            "description": "You are comfortable with volatility when it comes with a chance of outsized gains. Uncertain or unproven opportunities interest you rather than worry you, and a temporary loss doesn't shake your conviction.",
+            "slight": "Because the preference is mild, you still balance bold positions with steadier holdings.",
+            "strong": "Because the preference is strong, a few large losses can set the whole plan back for years.",
+            "strengths": ["Comfortable holding volatile assets", "Open to emerging opportunities", "Can capture outsized gains"],
+            "weaknesses": ["Larger drawdowns in bad markets", "Concentrated bets can dominate outcomes"],
+            "blindSpots": ["Underestimating how hard a deep loss is to recover from", "Confusing a bull market with skill"],
+            "strategy": "Keep high-risk positions in a defined slice of the portfolio and hold a diversified core around it",
+            "behavior": "Seeks out growth, thematic or leveraged funds and tolerates large swings",
+            "tips": {
+                "investor": "Size each speculative position so that losing it entirely wouldn't derail your goals",
+                "advisor": "Agree on position limits and a rebalancing rule before volatility tests them",
+            },
+        },
+    },
+    "complexity": {
+        "C": {
+            "label": "Complex",
+            "preference": "detailed, sophisticated strategies",
+            "description": "You enjoy understanding how things work and are willing to dig into fine print, structures and data before deciding. A more involved strategy doesn't put you off if it offers an edge.",
+            "slight": "Because the preference is mild, you also appreciate a simple option when it does the job.",
+            "strong": "Because the preference is strong, complexity can creep in where it adds cost but not return.",
+            "strengths": ["Researches thoroughly before deciding", "Understands product structures and fees", "Can use specialized tools well"],
+            "weaknesses": ["Analysis can delay decisions", "Complex products often carry higher costs"],
+            "blindSpots": ["Assuming more complexity means better results", "Overfitting decisions to past data"],
+            "strategy": "Build a simple core portfolio and use a smaller satellite for factor, sector or options strategies",
+            "behavior": "Reads prospectuses and compares fund structures in detail",
+            "tips": {
+                "investor": "Ask what each added layer earns after fees before keeping it",
+                "advisor": "Engage with the detail clients want, then summarize the decision in one clear sentence",
+            },
+        },
+        "X": {
+            "label": "Clarity",
+            "preference": "simple, easy-to-understand approaches",
+            "description": "You want to know exactly what you own and why, without needing specialist knowledge. Clear, transparent choices give you the confidence to stick with them.",
+            "slight": "Because the preference is mild, you are open to a more involved option once it is explained well.",
+            "strong": "Because the preference is strong, useful tools can be dismissed only because they take effort to learn.",
+            "strengths": ["Keeps costs and holdings transparent", "Decides quickly and confidently", "Avoids products they don't understand"],
+            "weaknesses": ["May pass on useful but unfamiliar tools", "Can oversimplify tax or estate questions"],
+            "blindSpots": ["Equating simple with safe", "Missing details hidden in seemingly simple products"],
+            "strategy": "Use a small number of broad index or target-date funds that cover the whole market",
+            "behavior": "Chooses familiar, well-known funds and avoids jargon-heavy products",
+            "tips": {
+                "investor": "A one- or two-fund portfolio can be enough; spend the saved effort on saving more",
+                "advisor": "Lead with plain-language explanations and visuals, and keep the number of holdings small",
+            },
+        },
+    },
+    "consistency": {
+        "W": {
+            "label": "Lump Sum",
+            "preference": "fewer, larger moves aimed at a big outcome",
+            "description": "You are comfortable waiting through quiet periods for a larger payoff later, and you tend to invest in sizeable amounts when you see the right moment. Occasional breakthroughs motivate you more than small regular gains.",
+            "slight": "Because the preference is mild, you also see value in steady contributions.",
+            "strong": "Because the preference is strong, timing a few large decisions puts a lot riding on each one.",
+            "strengths": ["Acts decisively on conviction", "Tolerates long stretches without results", "Puts idle cash to work in one step"],
+            "weaknesses": ["Outcomes depend heavily on timing", "Can leave cash idle waiting for the right moment"],
+            "blindSpots": ["Overestimating the ability to time entries", "Underrating how steady contributions add up"],
+            "strategy": "Invest windfalls promptly but split very large sums over a few months to limit timing risk",
+            "behavior": "Makes occasional large investments rather than regular small ones",
+            "tips": {
+                "investor": "Write down why and when you will deploy large sums so timing isn't decided by mood",
+                "advisor": "Plan lump-sum deployment schedules with clients and pair them with a baseline of regular saving",
+            },
+        },
+        "C": {
+            "label": "Consistent Yield",
+            "preference": "steady, predictable progress",
+            "description": "Regular, visible wins keep you motivated, and you like a clear plan that unfolds step by step. Predictable income and routine contributions suit you better than waiting for one big result.",
+            "slight": "Because the preference is mild, you can still accept some irregular returns for a better outcome.",
+            "strong": "Because the preference is strong, chasing steady payouts can crowd out investments with better total returns.",
+            "strengths": ["Builds wealth through regular habits", "Smooths entry prices over time", "Sticks to a plan"],
+            "weaknesses": ["May overvalue income over total return", "Can be unsettled by irregular results"],
+            "blindSpots": ["Reaching for yield in riskier income products", "Feeling safe because payouts are regular"],
+            "strategy": "Automate monthly contributions and reinvest dividends from diversified income and growth funds",
+            "behavior": "Contributes on a schedule and tracks income or steady growth",
+            "tips": {
+                "investor": "Judge investments by total return, not only by how regular their payouts are",
+                "advisor": "Give clients a contribution calendar and progress markers that show steady advancement",
+            },
+        },
+    },
+}
+
+
+def band(pct: float) -> str:
+    """
+    Strength band of an axis percentage: how far it is from an even 50
+    """
+    distance = abs(pct - 50)
+    name = BANDS[0][0]
+    for candidate, start in BANDS:
+        if distance >= start:
+            name = candidate
+    return name
+
+
+def build_report(code: str, bands: Tuple[str, ...], role: str) -> Dict[str, Any]:
+    """
+    The template report for a personality code, per-axis bands and role
+
+    Args:
+        code: 4-letter personality code
+        bands: Band per dimension, in DIMENSIONS order (see band)
+        role: "investor" or "advisor"
+
+    Returns:
+        Report dictionary in the same shape as a Gemini report
+    """
+    sides = [SIDES[dimension][letter] for (dimension, _), letter in zip(DIMENSIONS, code)]
+    dimensions = {}
+    for (dimension, _), side, strength in zip(DIMENSIONS, sides, bands):
+        sentences = [f"{INTENSITY[strength]} {side['preference']}.", side["description"]]
+        if strength in ("slight", "strong"):
+            sentences.append(side[strength])
+        dimensions[dimension] = {
+            "dominantLabel": side["label"],
+            "description": " ".join(sentences),
+            "strengths": list(side["strengths"]),
+            "weaknesses": list(side["weaknesses"]),
+            "blindSpots": list(side["blindSpots"]),
+        }
+
+    # Overall lists lead with the most pronounced traits
+    rank = {name: i for i, (name, _) in enumerate(BANDS)}
+    ordered = [side for _, side in sorted(zip(bands, sides), key=lambda pair: -rank[pair[0]])]
+    return {
+        "strengths": [side["strengths"][0] for side in ordered],
+        "weaknesses": [side["weaknesses"][0] for side in ordered],
+        "strategies": [side["strategy"] for side in ordered],
+        "behaviors": [side["behavior"] for side in ordered],
+        "advisorTips": [side["tips"][role] for side in ordered],
+        "dimensions": dimensions,
+    }
+
+
+def template_key(code: str, bands: Tuple[str, ...], role: str) -> str:
+    return f"{code}:{role}:{'-'.join(bands)}"
+
+
+def build_library() -> Dict[str, Dict[str, Any]]:
+    """
+    Every template report, keyed by template_key
+    """
+    band_names = [name for name, _ in BANDS]
+    return {
+        template_key(code, bands, role): build_report(code, bands, role)
+        for code in PERSONALITY_TYPES
+        for role in ROLES
+        for bands in itertools.product(band_names, repeat=len(DIMENSIONS))
+    }
+
+
+class ReportTemplates:
+    """
+    The template library, held in memory
+
+    load() builds the reports; get() loads on first use if load() wasn't called.
+    """
+
+    def __init__(self):
+        self._reports: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        with self._lock:
+            if self._reports is not None:
+                return
+            started = time.perf_counter()
+            self._reports = build_library()
+            logger.info("Built %d report templates in %.0fms", len(self._reports), (time.perf_counter() - started) * 1000)
+
+    def get(self, code: str, pcts: Dict[str, int], role: str) -> Dict[str, Any]:
+        """
+        The template report for a code, axis percentages (see axis_percentages)
+        and role, marked with "template": True
+
+        Unknown codes fall back to the code implied by the percentages, and
+        unknown roles to "investor".
+        """
+        if self._reports is None:
+            self.load()
+        if len(code) != len(DIMENSIONS) or any(
+            letter not in pair for letter, pair in zip(code, CODE_LETTERS)
+        ):
+            code = "".join(pair[0] if pcts[axis] >= 50 else pair[1] for (_, axis), pair in zip(DIMENSIONS, CODE_LETTERS))
+        role = role.strip().lower()
+        if role not in ROLES:
+            role = ROLES[0]
+        bands = tuple(band(pcts[axis]) for _, axis in DIMENSIONS)
+        return {**copy.deepcopy(self._reports[template_key(code, bands, role)]), "template": True}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"loaded": self._reports is not None, "size": len(self._reports or ())}
+
+
+report_templates = ReportTemplates()
@@ -0,0 +1,300 @@
+from typing import Optional, Dict, Any, Callable, Tuple
+from collections import OrderedDict
+import os
+import random
+import threading
+import time
+
+from observability import get_logger, registry, Counter
+
+logger = get_logger("resilience")
+
+# Consecutive failures before an upstream's circuit opens
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+# Consecutive failures before a single key's (e.g. one ticker's) circuit opens
+CIRCUIT_KEY_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_KEY_FAILURE_THRESHOLD", "3"))
+# Seconds an open circuit fails fast before letting a trial call through
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+# Attempts per call for transient errors (1 disables retries)
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY_MS = float(os.getenv("RETRY_BASE_DELAY_MS", "200"))
+RETRY_MAX_DELAY_MS = float(os.getenv("RETRY_MAX_DELAY_MS", "2000"))
+# Retries allowed as a fraction of calls, so retries can't multiply load during an outage
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+
+# Per-key breakers kept per upstream; healthy ones are dropped first
+MAX_KEY_BREAKERS = 1024
+
+upstream_retries = registry.register(Counter(
+    "upstream_retries_total", "Upstream calls retried after a transient error", ("upstream",),
+))
+circuit_opened = registry.register(Counter(
+    "circuit_breaker_opened_total", "Times a circuit breaker opened", ("upstream", "scope"),
+))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated failures, then lets one trial call through
+
+    closed: calls run; `failure_threshold` consecutive failures open the circuit.
+    open: calls raise CircuitOpenError until `reset_seconds` have passed.
+    half_open: one trial call runs; success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def idle(self) -> bool:
+        """True if closed with no failures, i.e. safe to forget"""
+        return self._state == "closed" and self._failures == 0
+
+    def allow(self) -> bool:
+        """
+        Raise CircuitOpenError unless a call may run now; returns True for a trial call
+        """
+        with self._lock:
+            if self._state == "closed":
+                return False
+            retry_after = self._opened_at + self.reset_seconds - time.monotonic()
+            if self._state == "open" and retry_after <= 0:
+                self._state = "half_open"
+            if self._state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+        raise CircuitOpenError(f"Circuit open for {self.name}", max(retry_after, 1.0))
+
+    def release(self) -> None:
+        """
+        Give back a trial slot without a result (the call never ran)
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> bool:
+        """
+        Count a failure; returns True if this opened the circuit
+        """
+        with self._lock:
+            self._failures += 1
+            reopen = self._state == "half_open"
+            self._trial_running = False
+            if reopen or (self._state == "closed" and self._failures >= self.failure_threshold):
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            status: Dict[str, Any] = {"state": self._state, "failures": self._failures}
+            if self._state == "open":
+                status["retryInSeconds"] = round(max(0.0, self._opened_at + self.reset_seconds - time.monotonic()), 1)
+        return status
+
+
+class RetryBudget:
+    """
+    Token bucket capping retries at a fraction of recent calls
+
+    Every call deposits `ratio` tokens (up to `max_tokens`) and every retry
+    spends one, so during an outage retries add at most `ratio` extra load.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+        self._exhausted = 0
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self._exhausted += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tokens": round(self._tokens, 2), "ratio": self.ratio, "exhausted": self._exhausted}
+
+
+def backoff_delay(attempt: int, base_ms: float = RETRY_BASE_DELAY_MS, max_ms: float = RETRY_MAX_DELAY_MS) -> float:
+    """
+    Seconds to wait before retry number `attempt` (1-based): full-jitter exponential backoff
+    """
+    return random.uniform(0, min(max_ms, base_ms * 2 ** (attempt - 1))) / 1000
+
+
+def is_network_error(error: BaseException, transient_names: Tuple[str, ...] = ()) -> bool:
+    """
+    True for timeouts and connection failures (requests' errors are OSErrors),
+    or any exception whose class name is in `transient_names`
+    """
+    if isinstance(error, (OSError, TimeoutError)):
+        return True
+    return any(cls.__name__ in transient_names for cls in type(error).__mro__)
+
+
+class UpstreamGuard:
+    """
+    Circuit breakers and retries for one upstream
+
+    One breaker covers the whole upstream and trips on transient errors
+    (timeouts, connection failures). An optional breaker per key (e.g. per
+    ticker) trips on any error, so one bad ticker fails fast without taking
+    the rest down. Transient errors are retried with jittered backoff while
+    the shared retry budget allows.
+
+    Usage:
+        guard = UpstreamGuard("mstarpy")
+        guard.call("VOO", lambda: funds.nav(start, end))
+    """
+
+    def __init__(
+        self,
+        name: str,
+        transient: Callable[[BaseException], bool] = is_network_error,
+        attempts: int = RETRY_ATTEMPTS,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        key_failure_threshold: int = CIRCUIT_KEY_FAILURE_THRESHOLD,
+        reset_seconds: float = CIRCUIT_RESET_SECONDS,
+    ):
+        self.name = name
+        self.attempts = max(1, attempts)
+        self._transient = transient
+        self._key_failure_threshold = key_failure_threshold
+        self._reset_seconds = reset_seconds
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_seconds)
+        self.budget = RetryBudget()
+        self._keys: "OrderedDict[str, CircuitBreaker]" = OrderedDict()
+        self._keys_lock = threading.Lock()
+        self._timed_out_at = 0.0
+
+    def call(self, key: Optional[str], fn: Callable[[], Any], attempts: Optional[int] = None) -> Any:
+        """
+        Run fn() behind the breakers, retrying transient errors
+
+        Raises:
+            CircuitOpenError: if the upstream's or the key's circuit is open
+        """
+        key_breaker = self._key_breaker(key) if key is not None else None
+        trial = self.breaker.allow()
+        if key_breaker is not None:
+            try:
+                key_breaker.allow()
+            except CircuitOpenError:
+                if trial:
+                    self.breaker.release()
+                raise
+        self.budget.deposit()
+
+        attempts = self.attempts if attempts is None else max(1, attempts)
+        attempt = 1
+        started = time.monotonic()
+        while True:
+            try:
+                result = fn()
+            except Exception as e:
+                transient = self._transient(e)
+                if transient and attempt < attempts and self.budget.withdraw():
+                    upstream_retries.inc(self.name)
+                    time.sleep(backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                self._record_failure(key, key_breaker, transient)
+                raise
+            if started < self._timed_out_at:
+                # A caller gave up on a call while this one ran (see
+                # record_timeout); finishing late isn't evidence of health
+                self.breaker.release()
+                if key_breaker is not None:
+                    key_breaker.release()
+                return result
+            self.breaker.record_success()
+            if key_breaker is not None:
+                key_breaker.record_success()
+            return result
+
+    def record_timeout(self, key: Optional[str]) -> None:
+        """
+        Count a call its caller stopped waiting for as a transient failure
+
+        The abandoned call keeps running on its worker thread. Calls already
+        in flight don't reset the breakers if they finish later, so an
+        upstream that is merely slow still trips its circuit.
+        """
+        key_breaker = self._key_breaker(key) if key is not None else None
+        self._timed_out_at = time.monotonic()
+        self._record_failure(key, key_breaker, True)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Upstream breaker state, retry budget and every key that isn't healthy
+        """
+        with self._keys_lock:
+            keys = {key: b.status() for key, b in self._keys.items() if not b.idle}
+        return {**self.breaker.status(), "retryBudget": self.budget.stats(), "keys": keys}
+
+    def _record_failure(self, key: Optional[str], key_breaker: Optional[CircuitBreaker], transient: bool) -> None:
+        if transient:
+            if self.breaker.record_failure():
+                circuit_opened.inc(self.name, "upstream")
+                logger.warning("Circuit opened for %s", self.name)
+        else:
+            # The upstream answered; only this key is at fault
+            self.breaker.record_success()
+        if key_breaker is not None and key_breaker.record_failure():
+            circuit_opened.inc(self.name, "key")
+            logger.warning("Circuit opened for %s %s", self.name, key)
+
+    def _key_breaker(self, key: str) -> CircuitBreaker:
+        with self._keys_lock:
+            breaker = self._keys.get(key)
+            if breaker is None:
+                breaker = self._keys[key] = CircuitBreaker(f"{self.name}:{key}", self._key_failure_threshold, self._reset_seconds)
+                if len(self._keys) > MAX_KEY_BREAKERS:
+                    self._evict()
+            self._keys.move_to_end(key)
+            return breaker
+
+    def _evict(self) -> None:
+        for key, breaker in list(self._keys.items()):
+            if breaker.idle:
+                del self._keys[key]
+                if len(self._keys) <= MAX_KEY_BREAKERS:
+                    return
+        self._keys.popitem(last=False)
+
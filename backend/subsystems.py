@@ -0,0 +1,113 @@
+from typing import Optional, Dict, List, Any, Callable
+import asyncio
+import threading
+import time
+
+from observability import get_logger
+
+logger = get_logger("subsystems")
+
+# Import-heavy clients (Firestore, mstarpy/pandas, Gemini) are created on first
+# use or by a background task at startup, so the server can bind its port
+# without waiting for them.
+
+
+class LazySubsystem:
+    """
+    A client or module created once, on first use
+
+    `loader` returns the object, or None if the subsystem can't be used (e.g.
+    missing credentials). An ImportError also marks it unavailable; any other
+    exception marks it failed. Either way the outcome is remembered and get()
+    returns None from then on.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._state = "not_loaded"
+        self._value: Any = None
+        self._error: Optional[str] = None
+        self._load_ms: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._state == "ready"
+
+    def get(self) -> Any:
+        """
+        Return the loaded object, loading it first if needed (blocks while loading)
+        """
+        if self._state in ("ready", "unavailable", "failed"):
+            return self._value
+        with self._lock:
+            if self._state == "not_loaded":
+                self._load()
+        return self._value
+
+    async def get_async(self) -> Any:
+        """
+        Like get(), but loads on a worker thread instead of blocking the event loop
+        """
+        if self._state in ("ready", "unavailable", "failed"):
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+    def start(self) -> None:
+        """
+        Begin loading in a background thread if it hasn't started yet
+        """
+        if self._state == "not_loaded":
+            threading.Thread(target=self.get, name=f"load-{self.name}", daemon=True).start()
+
+    def override(self, value: Any) -> None:
+        """
+        Use `value` instead of loading (for benchmarks and local stand-ins)
+        """
+        with self._lock:
+            self._value = value
+            self._state = "ready" if value is not None else "unavailable"
+            self._error = None
+
+    def status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"state": self._state}
+        if self._load_ms is not None:
+            status["loadMs"] = round(self._load_ms, 1)
+        if self._error:
+            status["error"] = self._error
+        return status
+
+    def _load(self) -> None:
+        self._state = "loading"
+        started = time.perf_counter()
+        try:
+            value = self._loader()
+            self._value = value
+            if value is None:
+                self._state = "unavailable"
+            else:
+                self._state = "ready"
+        except ImportError as e:
+            self._error = str(e)
+            self._state = "unavailable"
+        except Exception as e:
+            logger.error("Loading %s failed: %s", self.name, e)
+            self._error = str(e)
+            self._state = "failed"
+        self._load_ms = (time.perf_counter() - started) * 1000
+
+
+def start_all(subsystems: List[LazySubsystem]) -> None:
+    """
+    Start loading every subsystem in the background
+    """
+    for subsystem in subsystems:
+        subsystem.start()
+
+
+def readiness(subsystems: List[LazySubsystem]) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-subsystem load state, for /health
+    """
+    return {subsystem.name: subsystem.status() for subsystem in subsystems}
@@ -0,0 +1,37 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep the app off disk, off the network and free of background work while under test
+os.environ.setdefault("REPORT_CACHE_DB_PATH", "")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("PREWARM_ENABLED", "false")
+os.environ.setdefault("RETRY_ATTEMPTS", "1")
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    """
+    Point the services at the in-process fakes from benchmark_fakes (no latency)
+
+    Tests can slow an upstream down by changing e.g. FakeFunds.profile. Each
+    test gets fresh circuit breakers, so one that trips them doesn't affect the next.
+    """
+    import benchmark_fakes
+    import fund_service
+    import report_service
+    from benchmark_fakes import UpstreamProfile, FakeFunds, FakeGenerativeModel
+    from resilience import UpstreamGuard
+
+    monkeypatch.setattr(fund_service, "mstarpy_guard", UpstreamGuard("mstarpy"))
+    gemini = report_service.gemini_guard
+    monkeypatch.setattr(report_service, "gemini_guard", UpstreamGuard("gemini", gemini._transient, gemini.attempts))
+
+    client = benchmark_fakes.install(UpstreamProfile(), UpstreamProfile(), UpstreamProfile())
+    yield client
+    FakeFunds.profile = UpstreamProfile()
+    FakeGenerativeModel.profile = UpstreamProfile()
@@ -0,0 +1,60 @@
+import json
+import subprocess
+import sys
+import time
+
+import firebase_service
+from benchmark_fakes import FakeFirestoreClient, UpstreamProfile
+from firebase_service import BatchedWriter
+
+
+SERVER_TIMESTAMP = object()  # stands in for firestore.SERVER_TIMESTAMP
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_failed_batch_is_spooled_and_replayed(tmp_path, monkeypatch):
+    monkeypatch.setattr(firebase_service, "FIRESTORE_COMMIT_ATTEMPTS", 1)
+    spool = tmp_path / "spool.ndjson"
+    client = FakeFirestoreClient(UpstreamProfile(failure_rate=1.0))
+    writer = BatchedWriter(
+        client, flush_interval_ms=10, spool_path=str(spool), spool_retry_seconds=0.2, server_timestamp=SERVER_TIMESTAMP
+    )
+
+    doc_id = writer.enqueue("quizResults", {"userId": "u1", "createdAt": SERVER_TIMESTAMP})
+    _wait_for(spool.exists)
+    entry = json.loads(spool.read_text())
+    assert entry["id"] == doc_id and entry["data"]["userId"] == "u1"
+    assert "$time" in entry["data"]["createdAt"]
+
+    client.profile = UpstreamProfile()
+    _wait_for(lambda: doc_id in client.docs)
+    writer.close(timeout=5)
+
+    assert client.docs[doc_id]["userId"] == "u1"
+    assert not list(tmp_path.iterdir())
+    assert writer.stats()["failed"] == 0
+    assert writer.stats()["replayed"] == 1
+
+
+def test_spool_left_mid_replay_is_replayed_on_start(tmp_path):
+    spool = tmp_path / "spool.ndjson"
+    # A worker that crashed after claiming the spool and before committing it
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    orphan = tmp_path / f"spool.ndjson.{int(dead.stdout)}.replay"
+    orphan.write_text(json.dumps({"collection": "quizResults", "id": "orphaned", "data": {"userId": "u2"}}) + "\n")
+    client = FakeFirestoreClient(UpstreamProfile())
+    writer = BatchedWriter(client, flush_interval_ms=10, spool_path=str(spool), spool_retry_seconds=0.2)
+
+    writer.enqueue("quizResults", {"userId": "u1"})
+    _wait_for(lambda: "orphaned" in client.docs)
+    writer.close(timeout=5)
+
+    assert client.docs["orphaned"]["userId"] == "u2"
+    assert not list(tmp_path.iterdir())
+    assert writer.stats()["replayed"] == 1
@@ -0,0 +1,25 @@
+import argparse
+import os
+
+import pytest
+
+import bulk_pipeline
+from benchmark_fakes import FakeFunds, UpstreamProfile
+
+
+def _export_args(out):
+    return argparse.Namespace(
+        out=str(out), tickers="TSTH", days=30, format="ndjson", holdings_limit=10, restart=False, partitions=1,
+    )
+
+
+def test_fund_export_retries_ticker_after_upstream_failure(fakes, tmp_path):
+    FakeFunds.profile = UpstreamProfile(failure_rate=1.0)
+    with pytest.raises(SystemExit):
+        bulk_pipeline.export_funds(_export_args(tmp_path))
+    assert not os.path.exists(tmp_path / "fund_nav" / "TSTH.ndjson.gz")
+
+    FakeFunds.profile = UpstreamProfile()
+    bulk_pipeline.export_funds(_export_args(tmp_path))
+    assert os.path.getsize(tmp_path / "fund_nav" / "TSTH.ndjson.gz") > 0
+    assert os.path.getsize(tmp_path / "fund_holdings" / "TSTH.ndjson.gz") > 0
@@ -0,0 +1,25 @@
+import asyncio
+
+import fund_service
+from benchmark_fakes import FakeFunds, UpstreamProfile
+
+
+def _analytics(tickers):
+    return asyncio.run(fund_service.get_fund_analytics_async(tickers, days=90))
+
+
+def test_analytics_recover_after_outage(fakes):
+    FakeFunds.profile = UpstreamProfile(failure_rate=1.0)
+    during = _analytics(["TSTE", "TSTF"])
+    assert all("error" in metrics for metrics in during["tickers"].values())
+
+    FakeFunds.profile = UpstreamProfile()
+    after = _analytics(["TSTE", "TSTF"])
+    assert not any("error" in metrics for metrics in after["tickers"].values())
+    assert after["correlation"]
+
+
+def test_complete_analytics_are_cached(fakes):
+    first = _analytics(["TSTG"])
+    fund_service.nav_store.clear("TSTG")
+    assert _analytics(["TSTG"]) == first
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import fund_service
+from benchmark_fakes import FakeFunds, UpstreamProfile
+from fund_service import fund_cache
+from upstream_pool import upstream_pool, UpstreamTimeoutError
+
+
+@pytest.fixture
+def slow_mstarpy(fakes, monkeypatch):
+    """Morningstar slower than the pool will wait for (mstarpy itself never times out)"""
+    monkeypatch.setattr(upstream_pool, "timeout", 0.2)
+    FakeFunds.profile = UpstreamProfile(latency_ms=1000, jitter=0)
+    yield
+    FakeFunds.profile = UpstreamProfile()
+
+
+def _expire(key):
+    # Past its TTL and the stale-while-revalidate window, so the next read goes upstream
+    fund_cache.set(key, fund_cache.peek(key), -fund_cache.stale_seconds - 1)
+
+
+def _failures(ticker):
+    return fund_service.mstarpy_guard.status()["keys"].get(ticker, {}).get("failures", 0)
+
+
+def test_holdings_timeout_serves_stale_cached_holdings(fakes, monkeypatch):
+    client = TestClient(main.app)
+    fresh = client.get("/api/fund/TSTA/holdings").json()
+    assert fresh["holdings"] and "stale" not in fresh
+    _expire(("TSTA", "holdings", 10))
+
+    monkeypatch.setattr(upstream_pool, "timeout", 0.2)
+    FakeFunds.profile = UpstreamProfile(latency_ms=1000, jitter=0)
+    response = client.get("/api/fund/TSTA/holdings")
+
+    assert response.status_code == 200
+    assert response.json()["stale"] is True
+    assert response.json()["holdings"] == fresh["holdings"]
+    assert _failures("TSTA") == 1
+
+
+def test_nav_timeout_serves_stored_history(fakes, slow_mstarpy):
+    # The store holds an older stretch of the window; the recent days must come from upstream
+    start, end = fund_service._nav_window(30)
+    stored_end = end - timedelta(days=10)
+    stored = [{"date": (start + timedelta(days=i)).isoformat(), "nav": 10.0, "totalReturn": 10.5} for i in range((stored_end - start).days + 1)]
+    fund_service.nav_store.import_points("TSTB", start, stored_end, stored)
+
+    nav_data, stale = asyncio.run(fund_service.get_fund_nav_status_async("TSTB", 30))
+
+    assert stale is True
+    assert [p["date"] for p in nav_data] == [p["date"] for p in stored]
+    assert _failures("TSTB") == 1
+
+
+def test_timeout_without_fallback_still_fails(fakes, slow_mstarpy):
+    with pytest.raises(UpstreamTimeoutError):
+        asyncio.run(fund_service.get_fund_holdings_status_async("TSTC", 10))
+    assert _failures("TSTC") == 1
+
+
+def test_late_success_does_not_reset_breaker(fakes, slow_mstarpy):
+    with pytest.raises(UpstreamTimeoutError):
+        asyncio.run(fund_service.get_fund_holdings_status_async("TSTD", 10))
+    # Let the abandoned call finish on its worker thread
+    time.sleep(1.2)
+    assert _failures("TSTD") == 1
@@ -0,0 +1,73 @@
+from match_service import MatchIndex, AXES
+from quiz_scoring import axis_limits, get_scorers
+
+
+def _scores(values):
+    return dict(zip(AXES, values))
+
+
+def test_axis_limits_follow_question_table():
+    investor = get_scorers()["investor"]
+    span = max(investor.high - investor.neutral, investor.neutral - investor.low)
+    time_horizon = [q for q in investor.questions if q["axis"] == "timeHorizon"]
+    assert axis_limits()[0] >= len(time_horizon) * span
+
+
+def test_opposite_users_match_zero_percent():
+    index = MatchIndex()
+    limits = axis_limits()
+    index.upsert("high", "investor", _scores(limits))
+    index.upsert("low", "investor", _scores(-limits))
+
+    match = index.query(_scores(limits), exclude_user_id="high")["matches"][0]
+
+    assert match["userId"] == "low"
+    assert match["matchPercentage"] == 0
+
+
+def test_match_percentage_stays_within_bounds():
+    # Scores beyond the table's range, e.g. stored before a question was removed
+    index = MatchIndex()
+    limits = axis_limits()
+    index.upsert("far", "investor", _scores(-2 * limits))
+    index.upsert("same", "investor", _scores(limits))
+
+    matches = index.query(_scores(limits))["matches"]
+
+    assert [m["matchPercentage"] for m in matches] == [100, 0]
+
+
+def test_bulk_load_keeps_latest_result_and_live_upserts(fakes, monkeypatch):
+    import match_service
+    from firebase_service import iter_quiz_result_scores
+
+    def stored(doc_id, user_id, created, value):
+        fakes.docs[doc_id] = {"userId": user_id, "role": "investor", "createdAt": created, "personalityScores": _scores([value] * 4)}
+
+    # Document IDs don't follow save order
+    stored("a", "u1", 2.0, 5)
+    stored("b", "u1", 1.0, -5)
+    stored("c", "u2", 1.0, -3)
+    index = MatchIndex()
+    monkeypatch.setattr(match_service, "match_index", index)
+    index.upsert("u2", "investor", _scores([7] * 4))  # saved while the load runs
+
+    assert match_service.load_match_index(iter_quiz_result_scores()) == 1
+    assert index.get("u1")["scores"] == _scores([5.0] * 4)
+    assert index.get("u2")["scores"] == _scores([7.0] * 4)
+
+
+def test_find_matches_indexes_users_saved_elsewhere(fakes, monkeypatch):
+    import match_service
+
+    # Saved through another worker: in Firestore but not in this worker's index
+    fakes.docs["d1"] = {"userId": "u3", "role": "investor", "createdAt": 1.0, "personalityScores": _scores([4] * 4)}
+    index = MatchIndex()
+    index.upsert("u4", "investor", _scores([3] * 4))
+    monkeypatch.setattr(match_service, "match_index", index)
+
+    result = match_service.find_matches("u3")
+
+    assert [m["userId"] for m in result["matches"]] == ["u4"]
+    assert index.get("u3") is not None
+    assert match_service.find_matches("nobody") is None
@@ -0,0 +1,25 @@
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_backend_imports_without_question_table(tmp_path):
+    script = (
+        "import main, quiz_scoring\n"
+        "try:\n"
+        "    quiz_scoring.get_scorer('investor')\n"
+        "except quiz_scoring.QuizTableError:\n"
+        "    print('unavailable')\n"
+    )
+    env = {
+        "PATH": "/usr/bin:/bin",
+        "QUIZ_TABLE_PATH": str(tmp_path / "missing.json"),
+        "REPORT_CACHE_DB_PATH": "",
+        "RATE_LIMIT_ENABLED": "false",
+        "PREWARM_ENABLED": "false",
+    }
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "unavailable"
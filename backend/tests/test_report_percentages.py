@@ -0,0 +1,23 @@
+import numpy as np
+
+from quiz_scoring import AXES, get_scorers, percent_full_scale, percentages_matrix
+from report_service import axis_percentages
+
+
+def test_percentages_are_clamped():
+    pcts = percentages_matrix([[21, -21, 2 * percent_full_scale(), 0]])[0].tolist()
+    assert pcts == [100, 0, 100, 51]
+
+
+def test_report_percentages_match_results_page():
+    # Out-of-range scores reach the prompt as 0-100, not e.g. "120%"
+    pcts = axis_percentages(dict(zip(AXES, [21, -21, 3, 0])))
+    assert pcts == {"time": 100, "risk": 0, "complexity": 60, "strategy": 51}
+
+
+def test_every_reachable_score_stays_in_range():
+    for scorer in get_scorers().values():
+        extremes = np.stack([scorer.axis_limits, -scorer.axis_limits])
+        for row in extremes:
+            pcts = axis_percentages(dict(zip(AXES, row.tolist())))
+            assert all(0 <= value <= 100 for value in pcts.values())
@@ -0,0 +1,25 @@
+import asyncio
+
+import report_service
+import warm_report_cache
+from benchmark_fakes import FakeGenerativeModel, UpstreamProfile
+
+
+def test_warm_waits_past_latency_budget(fakes, monkeypatch, capsys):
+    monkeypatch.setattr(report_service, "REPORT_LATENCY_BUDGET_SECONDS", 0.05)
+    report_service.report_cache.clear()
+    FakeGenerativeModel.profile = UpstreamProfile(latency_ms=200, jitter=0)
+
+    asyncio.run(warm_report_cache.warm([8], ["investor"], concurrency=4))
+
+    assert "16/16 (0 failed)" in capsys.readouterr().out
+    assert report_service.report_cache.stats()["size"] == 16
+
+
+def test_warm_counts_templates_as_failures(fakes, capsys):
+    report_service.report_cache.clear()
+    FakeGenerativeModel.profile = UpstreamProfile(failure_rate=1.0)
+
+    asyncio.run(warm_report_cache.warm([9], ["advisor"], concurrency=4))
+
+    assert "16/16 (16 failed)" in capsys.readouterr().out
@@ -0,0 +1,116 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Dict, Any, Callable
+import os
+import threading
+
+# Threads available for blocking upstream calls (mstarpy, Gemini)
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "8"))
+# Calls allowed to wait for a free thread before new callers are turned away
+UPSTREAM_QUEUE_LIMIT = int(os.getenv("UPSTREAM_QUEUE_LIMIT", "32"))
+# Seconds a caller waits for an upstream call before giving up
+UPSTREAM_CALL_TIMEOUT = float(os.getenv("UPSTREAM_CALL_TIMEOUT", "20"))
+
+
+class UpstreamPoolError(Exception):
+    """Base class for errors raised instead of running an upstream call"""
+
+
+class PoolSaturatedError(UpstreamPoolError):
+    """Raised when every worker is busy and the wait queue is full"""
+
+
+class UpstreamTimeoutError(UpstreamPoolError):
+    """Raised when an upstream call doesn't finish within its timeout"""
+
+
+class UpstreamPool:
+    """
+    Bounded thread pool for blocking upstream calls
+
+    At most `size` calls run at once and at most `queue_limit` more wait for a
+    thread. Anything beyond that is rejected immediately with
+    PoolSaturatedError so callers can return 503 instead of piling up.
+    """
+
+    def __init__(self, size: int = 8, queue_limit: int = 32, timeout: float = 20.0):
+        self.size = size
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="upstream")
+        self._slots = threading.BoundedSemaphore(size + queue_limit)
+        self._lock = threading.Lock()
+        self._stats = {"pending": 0, "completed": 0, "rejected": 0, "timeouts": 0}
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Run fn(*args, **kwargs) on the pool without blocking the event loop
+
+        Raises:
+            PoolSaturatedError: if the pool and its queue are full
+            UpstreamTimeoutError: if the call takes longer than `timeout` seconds
+        """
+        future = self._submit(fn, *args, **kwargs)
+        if future is None:
+            raise PoolSaturatedError(f"Upstream pool saturated ({self.size} running, {self.queue_limit} queued)")
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            # The thread keeps running and holds its slot until it finishes
+            self._count("timeouts")
+            raise UpstreamTimeoutError(f"Upstream call {getattr(fn, '__name__', fn)} timed out after {timeout}s")
+
+    def try_submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Optional[Future]:
+        """
+        Submit a fire-and-forget call from synchronous code
+
+        Returns None instead of raising when the pool is saturated.
+        """
+        return self._submit(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["size"] = self.size
+        stats["queueLimit"] = self.queue_limit
+        stats["timeoutSeconds"] = self.timeout
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    # --- internals ---
+
+    def _count(self, name: str, delta: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += delta
+
+    def _submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Optional[Future]:
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            return None
+
+        self._count("pending")
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future: Optional[Future]) -> None:
+        with self._lock:
+            self._stats["pending"] -= 1
+            if _future is not None:
+                self._stats["completed"] += 1
+        self._slots.release()
+
+
+upstream_pool = UpstreamPool(
+    size=UPSTREAM_POOL_SIZE,
+    queue_limit=UPSTREAM_QUEUE_LIMIT,
+    timeout=UPSTREAM_CALL_TIMEOUT,
+)
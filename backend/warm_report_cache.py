@@ -0,0 +1,88 @@
+"""
+Pre-generate investor reports for every personality code, role and common
+score bucket so most users get a cached report instead of waiting on Gemini.
+
+Usage:
+    cd backend
+    python warm_report_cache.py                  # 16 codes x 2 roles at |score| = 8
+    python warm_report_cache.py --levels 4,8,12  # 3^4 score combinations per code
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import time
+
+from dotenv import load_dotenv
+
+AXES = ("shortTermVsLongTerm", "highRiskVsLowRisk", "clarityVsComplexity", "consistentVsLumpSum")
+# Letter that a positive score produces on each axis (see personality_code)
+POSITIVE_LETTERS = ("L", "R", "C", "W")
+
+
+def score_sets(code: str, levels):
+    """
+    Yield raw axis scores that produce `code`, one per combination of levels
+    """
+    signs = [1 if letter == positive else -1 for letter, positive in zip(code, POSITIVE_LETTERS)]
+    for magnitudes in itertools.product(levels, repeat=len(AXES)):
+        yield {axis: sign * magnitude for axis, sign, magnitude in zip(AXES, signs, magnitudes)}
+
+
+async def warm(levels, roles, concurrency: int) -> None:
+    # Imported after load_dotenv so env overrides (cache path, bucket) apply
+    import report_service
+    from quiz_scoring import PERSONALITY_TYPES
+
+    jobs = [
+        (code, scores, role)
+        for code in PERSONALITY_TYPES
+        for scores in score_sets(code, levels)
+        for role in roles
+    ]
+    print(f"Warming {len(jobs)} reports (prompt {report_service.REPORT_PROMPT_VERSION})...")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+    failed = 0
+    started = time.perf_counter()
+
+    async def run(code, scores, role):
+        nonlocal done, failed
+        name, description = PERSONALITY_TYPES[code]
+        async with semaphore:
+            try:
+                # No latency budget: wait for Gemini itself rather than get a template
+                # back while the generation runs on outside the semaphore
+                report = await report_service.generate_report(code, name, description, scores, role, latency_budget=0)
+                if report.get("template") or report.get("stale"):
+                    raise RuntimeError("Gemini failed; no new report was cached")
+            except Exception as e:
+                failed += 1
+                print(f"  {code} {role} {scores}: {e}")
+            done += 1
+            if done % 10 == 0 or done == len(jobs):
+                print(f"  {done}/{len(jobs)} ({failed} failed)")
+
+    await asyncio.gather(*(run(*job) for job in jobs))
+    print(f"Done in {time.perf_counter() - started:.1f}s. Cache: {report_service.get_report_cache_stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="8", help="comma-separated |score| levels per axis (1-15)")
+    parser.add_argument("--roles", default="investor,advisor", help="comma-separated roles")
+    parser.add_argument("--concurrency", type=int, default=4, help="Gemini calls in flight at once")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if not os.getenv("GEMINI_API_KEY"):
+        raise SystemExit("GEMINI_API_KEY is not set")
+
+    levels = [int(level) for level in args.levels.split(",")]
+    roles = [role.strip() for role in args.roles.split(",") if role.strip()]
+    asyncio.run(warm(levels, roles, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Run the backend with several worker processes sharing one set of caches
+
+Usage:
+    python workers.py                       # one worker per core on :8000
+    python workers.py --workers 4 --port 8000 --host 0.0.0.0
+
+Fund data, NAV history, reports and rate limits live in SQLite files (WAL)
+under SHARED_STATE_DIR, so a result fetched by one worker is served by all
+of them. One worker at a time is the leader: it runs the pre-warmer and
+the stale-while-revalidate refreshes the other workers hand to it, so
+upstream traffic stays roughly what a single process would make.
+
+Some state is still per worker:
+- The match index (match_service) is loaded from Firestore at startup and
+  updated by the worker that handles /save_quiz_result. Another worker adds
+  a user it doesn't know on their first /api/matches request, but keeps a
+  user's earlier scores after a retake until it restarts.
+- Quiz result pages (firebase_service.quiz_results_cache) are only
+  invalidated on the worker that saved, so other workers can serve a page
+  up to QUIZ_RESULTS_CACHE_TTL_SECONDS old.
+"""
+from typing import Optional, Dict, List, Any, Callable, Tuple
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): every worker refreshes for itself
+    fcntl = None
+
+from observability import get_logger
+
+logger = get_logger("workers")
+
+# Worker processes serving the app; set by `python workers.py`, and needed
+# (with the same SHARED_STATE_DIR) when running under gunicorn instead
+BACKEND_WORKERS = int(os.getenv("BACKEND_WORKERS", "1"))
+# SQLite files and the leader lock shared by the workers
+SHARED_STATE_DIR = os.getenv("SHARED_STATE_DIR", str(Path(__file__).parent / "shared_state"))
+# How often followers try to become leader, and the leader picks up refresh requests
+LEADER_POLL_SECONDS = float(os.getenv("LEADER_POLL_SECONDS", "1"))
+# A follower asks for the same key's refresh at most this often
+REFRESH_REQUEST_INTERVAL_SECONDS = 30
+# Refresh requests the leader starts per poll
+REFRESH_BATCH_SIZE = 32
+
+
+class WorkerCoordinator:
+    """
+    Leader election and refresh hand-off between worker processes
+
+    The leader is whichever process holds an exclusive flock on
+    SHARED_STATE_DIR/leader.lock; if it exits, the lock is released and
+    another worker takes over on its next poll. Followers queue refreshes in
+    a shared SQLite table instead of calling upstream, and the leader runs
+    them with the handler registered for each cache. With a single worker
+    (or no flock) the process is its own leader and nothing is queued.
+    """
+
+    def __init__(self, state_dir: str = SHARED_STATE_DIR, workers: int = BACKEND_WORKERS):
+        self.state_dir = state_dir
+        self.shared = workers > 1 and fcntl is not None
+        if workers > 1 and fcntl is None:
+            logger.warning("flock isn't available; each of the %d workers will refresh its own caches", workers)
+        self._leader = not self.shared
+        self._lock_file = None
+        self._handlers: Dict[str, Callable[[Tuple], None]] = {}
+        self._on_elected: List[Callable[[], Any]] = []
+        self._requested: Dict[Tuple[str, Tuple], float] = {}
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._elected_at: Optional[float] = None
+        self._stats = {"delegated": 0, "handled": 0, "failed": 0}
+        self.db_path = os.path.join(state_dir, "coordination.sqlite3")
+        if self.shared:
+            os.makedirs(state_dir, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS refresh_requests ("
+                    "cache TEXT NOT NULL, key TEXT NOT NULL, requested_at REAL NOT NULL, "
+                    "PRIMARY KEY (cache, key))"
+                )
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader
+
+    def register(self, cache: str, handler: Callable[[Tuple], None]) -> None:
+        """
+        Have the leader call handler(key) for refreshes queued for `cache`
+
+        The handler should only schedule the refresh (e.g. TieredCache.refresh).
+        """
+        self._handlers[cache] = handler
+
+    def delegate(self, cache: str) -> Callable[[Tuple], bool]:
+        """
+        A TieredCache `delegate` hook: on followers it queues the refresh for the
+        leader and returns True; on the leader it returns False (refresh here)
+        """
+        def hand_off(key: Tuple) -> bool:
+            if self._leader:
+                return False
+            now = time.time()
+            last = self._requested.get((cache, key))
+            if last is None or now - last >= REFRESH_REQUEST_INTERVAL_SECONDS:
+                if len(self._requested) >= 4096:
+                    self._requested = {k: t for k, t in self._requested.items() if now - t < REFRESH_REQUEST_INTERVAL_SECONDS}
+                self._requested[(cache, key)] = now
+                try:
+                    with self._connect() as conn:
+                        conn.execute(
+                            "INSERT OR IGNORE INTO refresh_requests (cache, key, requested_at) VALUES (?, ?, ?)",
+                            (cache, json.dumps(list(key)), now),
+                        )
+                except sqlite3.Error as e:
+                    # Serving stale data a little longer beats a duplicate upstream call
+                    logger.warning("Couldn't queue refresh of %s for the leader: %s", key, e)
+                self._stats["delegated"] += 1
+            return True
+        return hand_off
+
+    def on_elected(self, callback: Callable[[], Any]) -> None:
+        """
+        Call `callback` once this process becomes leader (at start in single-worker mode)
+        """
+        self._on_elected.append(callback)
+
+    def start(self) -> None:
+        """
+        Start competing for leadership on the running event loop
+        """
+        if not self.shared:
+            self._become_leader()
+        elif self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            self._leader = False
+
+    def status(self) -> Dict[str, Any]:
+        """
+        This worker's role and hand-off counters, for /health
+        """
+        status = {
+            "mode": "shared" if self.shared else "single",
+            "pid": os.getpid(),
+            "leader": self._leader,
+            "leaderSince": round(time.time() - self._elected_at) if self._elected_at else None,
+            **self._stats,
+        }
+        if self.shared:
+            status["leaderPid"] = self._leader_pid()
+            try:
+                with self._connect() as conn:
+                    status["pendingRefreshes"] = conn.execute("SELECT COUNT(*) FROM refresh_requests").fetchone()[0]
+            except sqlite3.Error:
+                status["pendingRefreshes"] = None
+        return status
+
+    # --- internals ---
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                if not self._leader and self._try_lock():
+                    self._become_leader()
+                if self._leader:
+                    self._run_requests()
+            except Exception as e:
+                logger.exception("Worker coordination failed: %s", e)
+            await asyncio.sleep(LEADER_POLL_SECONDS)
+
+    def _try_lock(self) -> bool:
+        lock_file = open(os.path.join(self.state_dir, "leader.lock"), "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        # Held (and the lock with it) for the life of the process
+        self._lock_file = lock_file
+        return True
+
+    def _leader_pid(self) -> Optional[int]:
+        try:
+            with open(os.path.join(self.state_dir, "leader.lock")) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def _become_leader(self) -> None:
+        self._leader = True
+        self._elected_at = time.time()
+        if self.shared:
+            logger.info("Worker %d is now the leader; it owns upstream refreshes", os.getpid())
+        for callback in self._on_elected:
+            try:
+                callback()
+            except Exception as e:
+                logger.exception("Leader start-up callback failed: %s", e)
+
+    def _run_requests(self) -> None:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT cache, key FROM refresh_requests ORDER BY requested_at LIMIT ?", (REFRESH_BATCH_SIZE,)
+            ).fetchall()
+            conn.executemany("DELETE FROM refresh_requests WHERE cache = ? AND key = ?", rows)
+        for cache, key in rows:
+            handler = self._handlers.get(cache)
+            if handler is None:
+                continue
+            try:
+                handler(tuple(json.loads(key)))
+                self._stats["handled"] += 1
+            except Exception as e:
+                logger.warning("Refresh of %s %s failed: %s", cache, key, e)
+                self._stats["failed"] += 1
+
+
+coordinator = WorkerCoordinator()
+
+
+def shared_state_env(state_dir: str, workers: int) -> Dict[str, str]:
+    """
+    Environment for workers sharing `state_dir`; file settings already in the
+    environment win, so any of them can be moved elsewhere
+    """
+    defaults = {
+        "FUND_CACHE_DB_PATH": os.path.join(state_dir, "fund_cache.sqlite3"),
+        "NAV_STORE_DB_PATH": os.path.join(state_dir, "nav_history.sqlite3"),
+        "REPORT_CACHE_DB_PATH": os.path.join(state_dir, "report_cache.sqlite3"),
+        "RATE_LIMIT_BACKEND": "sqlite",
+        "RATE_LIMIT_DB_PATH": os.path.join(state_dir, "rate_limits.sqlite3"),
+    }
+    env = {name: os.environ.get(name, value) for name, value in defaults.items()}
+    env.update({"BACKEND_WORKERS": str(workers), "SHARED_STATE_DIR": state_dir})
+    return env
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the backend with several worker processes")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--state-dir", default=SHARED_STATE_DIR)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    os.makedirs(args.state_dir, exist_ok=True)
+    # Workers are fresh interpreters that inherit this environment
+    os.environ.update(shared_state_env(os.path.abspath(args.state_dir), args.workers))
+    logger.info("Starting %d workers on %s:%d (shared state in %s)", args.workers, args.host, args.port, args.state_dir)
+
+    import uvicorn
+    uvicorn.run(
+        "main:app", app_dir=str(Path(__file__).parent),
+        host=args.host, port=args.port, workers=args.workers, log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ import { Badge } from "@/components/ui/badge";
 import { ETF } from "@/types/personality";
 import { TrendingUp } from "lucide-react";
 import { useState, useEffect } from "react";
-import { getFundInfo, FundInfo } from "@/services/fundService";
+import { getFundSnapshot, FundInfo } from "@/services/fundService";
 
 interface ETFCardProps {
   etf: ETF;
@@ -15,7 +15,7 @@ const ETFCard = ({ etf, onClick }: ETFCardProps) => {
 
   // Fetch live NAV data for the card
   useEffect(() => {
-    getFundInfo(etf.ticker)
+    getFundSnapshot(etf.ticker)
       .then((data) => {
         setFundInfo(data);
       })
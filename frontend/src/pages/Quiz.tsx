@@ -48,7 +48,7 @@ const Quiz = () => {
 			value,
 		}));
 
-		const scores = calculatePersonalityScores(allAnswers);
+		const scores = calculatePersonalityScores(allAnswers, questions);
 		const type = getPersonalityType(scores);
 
 		setPersonalityScores(scores);
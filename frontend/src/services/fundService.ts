@@ -26,16 +26,101 @@ export interface FundInfo {
   error?: string;
 }
 
+interface NavColumns {
+  dates: string[];
+  nav: number[];
+  totalReturn: number[];
+}
+
+function columnsToPoints(columns: NavColumns): FundNavData[] {
+  return columns.dates.map((date, i) => ({ date, nav: columns.nav[i], totalReturn: columns.totalReturn[i] }));
+}
+
+const pad2 = (n: number) => (n < 10 ? '0' : '') + n;
+
+// YYYY-MM-DD for a count of days since 1970-01-01 (civil-from-days), much faster than Date.toISOString
+function epochDayToIso(days: number): string {
+  const z = days + 719468;
+  const era = Math.floor(z / 146097);
+  const doe = z - era * 146097;
+  const yoe = Math.floor((doe - Math.floor(doe / 1460) + Math.floor(doe / 36524) - Math.floor(doe / 146096)) / 365);
+  const doy = doe - (365 * yoe + Math.floor(yoe / 4) - Math.floor(yoe / 100));
+  const mp = Math.floor((5 * doy + 2) / 153);
+  const day = doy - Math.floor((153 * mp + 2) / 5) + 1;
+  const month = mp < 10 ? mp + 3 : mp - 9;
+  const year = yoe + era * 400 + (month <= 2 ? 1 : 0);
+  return `${year}-${pad2(month)}-${pad2(day)}`;
+}
+
+/**
+ * Decode the backend's packed NAV format (see backend/nav_encoding.py pack_nav_series):
+ * a small header, delta-coded epoch-day dates, then byte-stream-split float32 columns.
+ */
+export function decodeNavSeries(buffer: ArrayBuffer): FundNavData[] {
+  const view = new DataView(buffer);
+  const bytes = new Uint8Array(buffer);
+  if (String.fromCharCode(...bytes.subarray(0, 4)) !== 'NAV1') {
+    throw new Error('Not a NAV series');
+  }
+  const count = view.getUint32(4, true);
+  const fieldCount = view.getUint8(8);
+  let offset = 9;
+  const fields: string[] = [];
+  for (let i = 0; i < fieldCount; i++) {
+    const length = view.getUint8(offset);
+    fields.push(new TextDecoder().decode(bytes.subarray(offset + 1, offset + 1 + length)));
+    offset += 1 + length;
+  }
+  offset += (4 - (offset % 4)) % 4;
+
+  const dates: string[] = new Array(count);
+  let day = 0;
+  for (let i = 0; i < count; i++) {
+    day += view.getInt32(offset + i * 4, true);
+    dates[i] = epochDayToIso(day);
+  }
+  offset += count * 4;
+
+  const columns: Record<string, Float32Array> = {};
+  for (const field of fields) {
+    // Re-interleave the split bytes into little-endian float32s
+    const joined = new Uint8Array(count * 4);
+    for (let b = 0; b < 4; b++) {
+      const plane = bytes.subarray(offset + b * count, offset + (b + 1) * count);
+      for (let i = 0; i < count; i++) joined[i * 4 + b] = plane[i];
+    }
+    columns[field] = new Float32Array(joined.buffer);
+    offset += count * 4;
+  }
+
+  // float32 keeps ~7 significant digits; round back to the 4 decimals NAVs are quoted in
+  const missing = new Float32Array(count).fill(NaN);
+  const nav = columns.nav || missing;
+  const totalReturn = columns.totalReturn || missing;
+  const points: FundNavData[] = new Array(count);
+  for (let i = 0; i < count; i++) {
+    points[i] = {
+      date: dates[i],
+      nav: Math.round(nav[i] * 1e4) / 1e4,
+      totalReturn: Math.round(totalReturn[i] * 1e4) / 1e4,
+    };
+  }
+  return points;
+}
+
 /**
  * Get comprehensive fund information
  */
 export async function getFundInfo(ticker: string): Promise<FundInfo> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/fund/${ticker}`);
+    // Columnar historicalNav is smaller and faster to parse than one object per point
+    const response = await fetch(`${API_BASE_URL}/api/fund/${ticker}?format=columns`);
     if (!response.ok) {
       throw new Error(`Failed to fetch fund info: ${response.status}`);
     }
-    return await response.json();
+    const info = await response.json();
+    const historicalNav = info.historicalNav?.dates ? columnsToPoints(info.historicalNav) : info.historicalNav || [];
+    return { ...info, historicalNav };
   } catch (error) {
     console.error(`Error fetching fund info for ${ticker}:`, error);
     throw error;
@@ -47,19 +132,56 @@ export async function getFundInfo(ticker: string): Promise<FundInfo> {
  */
 export async function getFundNav(ticker: string, days: number = 30): Promise<FundNavData[]> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/fund/${ticker}/nav?days=${days}`);
+    const response = await fetch(`${API_BASE_URL}/api/fund/${ticker}/nav?days=${days}&format=binary`);
     if (!response.ok) {
       throw new Error(`Failed to fetch NAV data: ${response.status}`);
     }
-    const data = await response.json();
-    // Backend returns {ticker, navData: [...]}
-    return data.navData || [];
+    // Errors come back as JSON ({error, navData: []}) rather than the binary series
+    if (response.headers.get('Content-Type')?.startsWith('application/json')) {
+      const data = await response.json();
+      return data.navData || [];
+    }
+    return decodeNavSeries(await response.arrayBuffer());
   } catch (error) {
     console.error(`Error fetching NAV data for ${ticker}:`, error);
     return [];
   }
 }
 
+/**
+ * Stream historical NAV data for long windows, calling onPoints as each chunk arrives.
+ * Pass period ("week" | "month") for OHLC bars or every=N to keep every Nth point.
+ */
+export async function streamFundNav(
+  ticker: string,
+  days: number,
+  onPoints: (points: FundNavData[]) => void,
+  options: { every?: number; period?: 'week' | 'month' } = {}
+): Promise<void> {
+  const params = new URLSearchParams({ days: String(days) });
+  if (options.every) params.set('every', String(options.every));
+  if (options.period) params.set('period', options.period);
+
+  const response = await fetch(`${API_BASE_URL}/api/fund/${ticker}/nav/stream?${params}`);
+  if (!response.ok || !response.body) {
+    throw new Error(`Failed to stream NAV data: ${response.status}`);
+  }
+
+  // Backend sends NDJSON: one point per line
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value, { stream: !done });
+    const lines = buffered.split('\n');
+    buffered = done ? '' : lines.pop() || '';
+    const points = lines.filter((line) => line.trim()).map((line) => JSON.parse(line));
+    if (points.length) onPoints(points);
+    if (done) return;
+  }
+}
+
 /**
  * Get top holdings of a fund
  */
@@ -77,3 +199,69 @@ export async function getFundHoldings(ticker: string, limit: number = 10): Promi
   }
 }
 
+/**
+ * Get snapshots for several funds in one request
+ */
+export async function getFundsBatch(
+  tickers: string[],
+  fields?: (keyof FundInfo)[]
+): Promise<Record<string, FundInfo>> {
+  const response = await fetch(`${API_BASE_URL}/api/funds`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ tickers, fields }),
+  });
+  if (!response.ok) {
+    throw new Error(`Failed to fetch funds: ${response.status}`);
+  }
+  const data = await response.json();
+  // Backend returns {funds: {TICKER: {...}}}
+  return data.funds || {};
+}
+
+const CARD_FIELDS: (keyof FundInfo)[] = ['nav', 'totalReturn', 'lastUpdated'];
+// Most tickers the backend accepts per batch (FUND_BATCH_MAX_TICKERS)
+const MAX_BATCH_TICKERS = 50;
+type PendingSnapshot = { resolve: (info: FundInfo) => void; reject: (error: unknown) => void };
+let pendingSnapshots = new Map<string, PendingSnapshot[]>();
+
+/**
+ * Get the latest NAV snapshot for a fund card.
+ * Lookups made in the same tick (e.g. a page of ETF cards mounting) are sent as one batch request.
+ */
+export function getFundSnapshot(ticker: string): Promise<FundInfo> {
+  return new Promise((resolve, reject) => {
+    const key = ticker.toUpperCase();
+    if (pendingSnapshots.size === 0) {
+      setTimeout(flushFundSnapshots, 0);
+    }
+    const waiters = pendingSnapshots.get(key) || [];
+    waiters.push({ resolve, reject });
+    pendingSnapshots.set(key, waiters);
+  });
+}
+
+function flushFundSnapshots() {
+  const pending = [...pendingSnapshots];
+  pendingSnapshots = new Map();
+  // Larger batches get a 400, so send them in chunks side by side
+  for (let i = 0; i < pending.length; i += MAX_BATCH_TICKERS) {
+    fetchSnapshotChunk(new Map(pending.slice(i, i + MAX_BATCH_TICKERS)));
+  }
+}
+
+async function fetchSnapshotChunk(batch: Map<string, PendingSnapshot[]>) {
+  try {
+    const funds = await getFundsBatch([...batch.keys()], CARD_FIELDS);
+    batch.forEach((waiters, ticker) => {
+      const info = funds[ticker];
+      waiters.forEach(({ resolve, reject }) =>
+        info && !info.error ? resolve(info) : reject(new Error(info?.error || `No data for ${ticker}`))
+      );
+    });
+  } catch (error) {
+    console.error('Error fetching fund snapshots:', error);
+    batch.forEach((waiters) => waiters.forEach(({ reject }) => reject(error)));
+  }
+}
+
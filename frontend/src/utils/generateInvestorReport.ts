@@ -83,3 +83,66 @@ export async function generateInvestorReport(
     throw error;
   }
 }
+
+/**
+ * Stream an investor report over server-sent events.
+ * onSection is called with each finished section ("strengths", "dimensions.riskTolerance", ...)
+ * so the page can render progressively; the promise resolves with the full report.
+ */
+export async function streamInvestorReport(
+  personality: PersonalityType,
+  scores: PersonalityScores,
+  role: string,
+  onSection: (key: string, value: unknown) => void
+): Promise<InvestorReport> {
+  const res = await fetch(`${API_BASE_URL}/generate_investor_report/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      personality,
+      scores,
+      role,
+    }),
+  });
+
+  if (!res.ok || !res.body) {
+    throw new Error(`Backend error (${res.status}): ${res.statusText}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value, { stream: !done });
+
+    // SSE events are separated by a blank line
+    const events = buffered.split("\n\n");
+    buffered = done ? "" : events.pop() || "";
+
+    for (const raw of events) {
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = raw.match(/^data: (.*)$/m)?.[1];
+      if (!event || !data) continue;
+      const payload = JSON.parse(data);
+
+      if (event === "section") {
+        onSection(payload.key, payload.value);
+      } else if (event === "done") {
+        if (payload.report?.error) {
+          throw new Error("Gemini JSON error: " + payload.report.error);
+        }
+        return payload.report as InvestorReport;
+      } else if (event === "error") {
+        throw new Error(payload.error);
+      }
+    }
+
+    if (done) {
+      throw new Error("Report stream ended before completion");
+    }
+  }
+}
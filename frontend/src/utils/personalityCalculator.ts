@@ -1,7 +1,11 @@
 import { QuizAnswer, PersonalityScores, PersonalityType } from "@/types/personality";
-import { quizQuestions } from "@/data/quizQuestions";
+import { QuizQuestion, quizQuestions, answerScale, percentFullScale } from "@/data/quizQuestions";
 
-export function calculatePersonalityScores(answers: QuizAnswer[]): PersonalityScores {
+// Mirrored by backend/quiz_scoring.py, which scores submissions server-side
+export function calculatePersonalityScores(
+	answers: QuizAnswer[],
+	questions: QuizQuestion[] = quizQuestions
+): PersonalityScores {
 	const scores = {
 		shortTermVsLongTerm: 0,
 		highRiskVsLowRisk: 0,
@@ -10,9 +14,12 @@ export function calculatePersonalityScores(answers: QuizAnswer[]): PersonalitySc
 	};
 
 	answers.forEach((answer) => {
-		const question = quizQuestions[answer.questionIndex];
+		const question = questions[answer.questionIndex];
+		if (!question) {
+			return;
+		}
 		// Convert 1-7 scale to -3 to +3
-		let score = answer.value - 4;
+		let score = answer.value - answerScale.neutral;
 
 		// Reverse if needed
 		if (question.reverse) {
@@ -182,10 +189,12 @@ export function getPersonalityType(scores: PersonalityScores): PersonalityType {
 
 export function getPercentages(scores: PersonalityScores) {
 	// Convert scores to percentages (0-100)
-	const maxPossible = 15; // 5 questions per axis * 3 max points
+	const maxPossible = percentFullScale;
 
 	const calculatePercentage = (score: number) => {
 		let percentage = Math.round(((score + maxPossible) / (maxPossible * 2)) * 100);
+		// Axes with more questions can score past the full scale
+		percentage = Math.min(100, Math.max(0, percentage));
 		// Prevent exactly 50% - tip it to 51%
 		if (percentage === 50) {
 			percentage = 51;